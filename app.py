@@ -1,17 +1,38 @@
-# app.py
-from dash import Dash, html
-import dash
-from layouts.main_layout import layout
-
-app = Dash(__name__, suppress_callback_exceptions=True)
-
-# register callbacks
-import callbacks.navigation_callbacks
-import callbacks.map_callbacks
-import callbacks.mismatch_callbacks
-import callbacks.compare_domain_callbacks
-
-# set layout on import
-app.layout = layout
-server = app.server
-
+# app.py
+import logging
+import os
+
+from dash import Dash, html
+import dash
+from werkzeug.middleware.proxy_fix import ProxyFix
+from layouts.main_layout import layout
+
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+
+app = Dash(__name__, suppress_callback_exceptions=True)
+server = app.server
+
+# behind a proxy that terminates TLS (azure app service) the scheme and client
+# come from X-Forwarded-Proto/-For, so absolute urls (the tile urls) keep
+# https. PPFI_PROXY_HOPS is the number of proxies in front; the default 0
+# trusts no forwarded headers (the Dockerfile sets 1 for app service)
+_proxy_hops = int(os.environ.get('PPFI_PROXY_HOPS', '0'))
+if _proxy_hops:
+    server.wsgi_app = ProxyFix(server.wsgi_app, x_for=_proxy_hops, x_proto=_proxy_hops)
+
+# register callbacks
+import callbacks.navigation_callbacks
+import callbacks.map_callbacks
+import callbacks.mismatch_callbacks
+import callbacks.compare_domain_callbacks
+import callbacks.release_callbacks
+
+# register server routes
+import routes.diagnostics_routes
+import routes.admin_routes
+import routes.geometry_routes
+import routes.tile_routes
+import routes.compression_routes
+
+# set layout on import
+app.layout = layout
@@ -0,0 +1,126 @@
+// assets/topojson.js
+//
+// decodes the quantised topojson served from /_geometry/*.topojson (see
+// encode_topojson in utils/geometry_build.py) into the geojson plotly draws.
+// map callbacks write their figure to <map id>_figure (a dcc.Store); the
+// clientside callback resolveTopojson (callbacks/map_callbacks.py) fetches
+// and decodes any topojson url a trace points at, puts the FeatureCollection
+// on the trace and hands the figure to the graph. plotly fetches plain
+// geojson urls itself.
+(function () {
+    "use strict";
+
+    function decodeArcs(topology) {
+        var scale = topology.transform.scale;
+        var translate = topology.transform.translate;
+        return topology.arcs.map(function (arc) {
+            var x = 0, y = 0;
+            return arc.map(function (delta) {
+                x += delta[0];
+                y += delta[1];
+                return [x * scale[0] + translate[0], y * scale[1] + translate[1]];
+            });
+        });
+    }
+
+    function ring(refs, arcs) {
+        var points = [];
+        refs.forEach(function (k) {
+            var arc = k < 0 ? arcs[~k].slice().reverse() : arcs[k];
+            for (var i = points.length ? 1 : 0; i < arc.length; i++) {
+                points.push(arc[i]);
+            }
+        });
+        return points;
+    }
+
+    function toGeoJSON(topology) {
+        var arcs = decodeArcs(topology);
+        var features = [];
+        Object.keys(topology.objects).forEach(function (name) {
+            topology.objects[name].geometries.forEach(function (g) {
+                var coordinates = g.type === "Polygon"
+                    ? g.arcs.map(function (r) { return ring(r, arcs); })
+                    : g.arcs.map(function (p) { return p.map(function (r) { return ring(r, arcs); }); });
+                features.push({
+                    type: "Feature",
+                    properties: g.properties,
+                    geometry: {type: g.type, coordinates: coordinates}
+                });
+            });
+        });
+        return {type: "FeatureCollection", features: features};
+    }
+
+    var TOPOJSON_URL = /\.topojson$/;
+    // decoded collections by url; urls are content-addressed, so an entry
+    // never goes stale, only unused
+    var MAX_DECODED = 16;
+    var decoded = new Map();
+    // latest render per graph, so a slow fetch can't overwrite a newer figure
+    var latest = {};
+
+    function load(url) {
+        var entry = decoded.get(url);
+        if (entry) {
+            decoded.delete(url);
+            decoded.set(url, entry);
+            return entry;
+        }
+        entry = fetch(url)
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status + " " + url);
+                }
+                return response.json();
+            })
+            .then(toGeoJSON)
+            .catch(function (err) {
+                // forget the failure, so the next render tries again
+                decoded.delete(url);
+                throw err;
+            });
+        decoded.set(url, entry);
+        if (decoded.size > MAX_DECODED) {
+            decoded.delete(decoded.keys().next().value);
+        }
+        return entry;
+    }
+
+    function resolveTopojson(figure) {
+        var dc = window.dash_clientside;
+        if (!figure) {
+            return dc.no_update;
+        }
+        var traces = figure.data || [];
+        if (!traces.some(function (t) { return typeof t.geojson === "string" && TOPOJSON_URL.test(t.geojson); })) {
+            return figure;
+        }
+        var output = JSON.stringify(dc.callback_context.outputs_list.id);
+        var render = latest[output] = {};
+        return Promise.all(traces.map(function (trace) {
+            if (typeof trace.geojson !== "string" || !TOPOJSON_URL.test(trace.geojson)) {
+                return trace;
+            }
+            return load(trace.geojson)
+                .catch(function (err) {
+                    console.error("could not load map geometry", err);
+                    return {type: "FeatureCollection", features: []};
+                })
+                .then(function (geojson) {
+                    return Object.assign({}, trace, {geojson: geojson});
+                });
+        })).then(function (data) {
+            if (latest[output] !== render) {
+                throw dc.PreventUpdate;
+            }
+            return Object.assign({}, figure, {data: data});
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        ppfi: Object.assign({}, (window.dash_clientside || {}).ppfi, {resolveTopojson: resolveTopojson})
+    });
+
+    window.ppfiTopojson = {toGeoJSON: toGeoJSON};
+})();
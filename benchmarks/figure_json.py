@@ -0,0 +1,53 @@
+# benchmarks/figure_json.py
+#
+#   python -m benchmarks.figure_json [--repeat 20]
+#
+# prints encode time and response bytes of the default map and both compare
+# maps of the current artifact, as plotly figures through the stock encoder
+# and as typed-array dicts. tests/test_figure_json.py checks both decode to
+# the same figure.
+
+import argparse
+import gzip
+import time
+
+from utils.figure_json import encode_figure
+
+
+def _bench(label, fn, repeat):
+    body = fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    seconds = (time.perf_counter() - started) / repeat
+    raw = body.encode()
+    print(f'  {label:<28} {seconds * 1000:>8.1f} ms  {len(raw):>12,} bytes  {len(gzip.compress(raw)):>10,} gzipped')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark map figure response encoding.')
+    parser.add_argument('--repeat', type=int, default=20, help='encodes per measurement (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    from plotly.io.json import to_json_plotly
+    import app  # noqa: F401 (registers the callbacks)
+    from callbacks.map_callbacks import _compare_maps, _single_map
+
+    maps = {
+        'map_single lsoa': _single_map('lsoa', 'ppfi', 'combined', [], 100, None, None, None)[0],
+        'map_single lad': _single_map('lad', 'ppfi', 'combined', [], 100, None, None, None)[0],
+    }
+    compare = _compare_maps('lsoa', 'combined', 'combined', [], 100, None, None, None)
+    maps['map_compare_left lsoa'] = compare['ppfi'][0]
+    maps['map_compare_right lsoa'] = compare['imd'][0]
+
+    for name, fig in maps.items():
+        print(name)
+        _bench('figure, json engine', lambda: to_json_plotly({'figure': fig}, engine='json'), args.repeat)
+        _bench('figure, orjson engine', lambda: to_json_plotly({'figure': fig}, engine='orjson'), args.repeat)
+        _bench('typed arrays, orjson engine',
+               lambda: to_json_plotly({'figure': encode_figure(fig)}, engine='orjson'), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
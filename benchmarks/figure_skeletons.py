@@ -0,0 +1,87 @@
+# benchmarks/figure_skeletons.py
+#
+#   python -m benchmarks.figure_skeletons [--repeat 10]
+#
+# renders the maps of each view of the current artifact through plotly
+# express and from skeletons, and prints the build times.
+# tests/test_figure_skeletons.py checks the figures are the same.
+
+import argparse
+import os
+import time
+
+
+def _views():
+    # (label, callable returning the figures of one view); the env flags of
+    # the alternative renderings are set around the call
+    from callbacks.map_callbacks import _compare_maps, _single_map
+    from utils.data import get_frame, has_wards
+
+    lad = get_frame('lad')
+    lad_id = str(lad['id'].iat[0]) if 'id' in lad.columns and len(lad) else None
+    drill = {'lad_id': lad_id, 'lad_name': lad_id} if lad_id else None
+
+    def single(geography, domain='combined', dataset='ppfi', deciles=(), selected=None):
+        return lambda: [_single_map(geography, dataset, domain, list(deciles), 100, selected, None, None)[0]]
+
+    def compare(geography, selected=None):
+        def run():
+            maps = _compare_maps(geography, 'combined', 'combined', [], 100, selected, None, None)
+            return [maps['ppfi'][0], maps['imd'][0]]
+        return run
+
+    views = [
+        ('lsoa', single('lsoa'), {}),
+        ('lsoa deciles 1-2, imd income', single('lsoa', 'income', 'imd', (1, 2)), {}),
+        ('lsoa drilldown', single('lsoa', selected=drill), {}),
+        ('lsoa dots', single('lsoa'), {'PPFI_MAP_POINTS': '1'}),
+        ('lsoa tiles', single('lsoa'), {'PPFI_MAP_TILES': '1'}),
+        ('lad', single('lad'), {}),
+        ('lad imd health', single('lad', 'health', 'imd'), {}),
+        ('hex', single('hex'), {}),
+        ('compare lsoa', compare('lsoa'), {}),
+        ('compare lad', compare('lad'), {}),
+    ]
+    if has_wards():
+        views.append(('ward drilldown', single('ward', selected=drill), {}))
+    return views
+
+
+def _run(fn, env):
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        return fn()
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def _timed(fn, env, repeat):
+    # the first render builds the skeleton, so it is left out
+    _run(fn, env)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        _run(fn, env)
+    return (time.perf_counter() - started) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time map figures built from skeletons.')
+    parser.add_argument('--repeat', type=int, default=10, help='renders per measurement (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    import app  # noqa: F401 (registers the callbacks)
+
+    print(f"{'view':<32} {'px':>9} {'skeleton':>9}")
+    for label, fn, env in _views():
+        px_s = _timed(fn, {**env, 'PPFI_FIGURE_SKELETONS': '0'}, args.repeat)
+        skeleton_s = _timed(fn, {**env, 'PPFI_FIGURE_SKELETONS': '1'}, args.repeat)
+        print(f'{label:<32} {px_s * 1000:>6.1f} ms {skeleton_s * 1000:>6.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# benchmarks/narratives.py
+#
+#   python -m benchmarks.narratives [--geography lsoa]
+#
+# words every area of a layer of the current artifact row by row (as make_map
+# once did) and with layer_narratives, and prints both timings.
+# tests/test_narratives.py checks the text is the same.
+
+import argparse
+import time
+
+from utils.constants import PPFI_LSOA_DOMAIN_LABELS, IMD_LSOA_DOMAIN_LABELS
+from utils.narratives import COMBINED_COLUMNS, hover_narrative, layer_narratives
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the layer-wide hover narratives.')
+    parser.add_argument('--geography', choices=sorted(COMBINED_COLUMNS), default='lsoa')
+    args = parser.parse_args(argv)
+
+    from utils.data import get_matrix
+    matrix = get_matrix(args.geography)
+    n_lad = len(matrix) if args.geography == 'lad' else 0
+    ppfi_col, imd_col = COMBINED_COLUMNS[args.geography]
+    columns = [ppfi_col, imd_col] + [c for c, _ in PPFI_LSOA_DOMAIN_LABELS + IMD_LSOA_DOMAIN_LABELS]
+    frame = matrix.frame(columns if args.geography == 'lsoa' else columns[:2])
+    frame = frame.rename(columns={ppfi_col: 'ppfi_combined', imd_col: 'imd_combined'})
+    frame['diff'] = frame['ppfi_combined'] - frame['imd_combined']
+
+    started = time.perf_counter()
+    frame.apply(lambda r: hover_narrative(r.dropna().to_dict(), args.geography, n_lad), axis=1)
+    rowwise = time.perf_counter() - started
+    started = time.perf_counter()
+    got = layer_narratives(matrix, args.geography)
+    vectorised = time.perf_counter() - started
+
+    print(f'{args.geography}: {len(matrix):,} areas, {len(set(got)):,} distinct narratives')
+    print(f'  row by row  {rowwise * 1000:9.1f} ms')
+    print(f'  layer-wide  {vectorised * 1000:9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,285 +1,681 @@
-# callbacks/map_callbacks.py
-import math
-import dash
-from dash import no_update
-from dash.exceptions import PreventUpdate
-from dash.dependencies import Input, Output
-
-from app import app
-
-from utils.data import gdf_lsoa, geojson_lsoa, gdf_lad, geojson_lad
-from utils.figures import (
-    make_map,
-    get_domains_for_single,
-    get_domains_for_compare,
-)
-from utils.constants import (
-    PPFI_DOMAINS_LAD,
-    IMD_DOMAINS_LAD,
-    PPFI_DOMAINS_LSOA,
-    IMD_DOMAINS_LSOA,
-)
-
-# helpers
-def _to_int_list(v):
-    if v is None or v == '' or v == 'All':
-        return []
-    if isinstance(v, (list, tuple, set)):
-        out = []
-        for item in v:
-            try:
-                out.append(int(item))
-            except Exception:
-                pass
-        return out
-    try:
-        return [int(v)]
-    except Exception:
-        return []
-
-
-def _filter_lsoa_by_deciles(gdf, dataset: str, domain: str, deciles_value):
-    deciles = _to_int_list(deciles_value)
-    if not deciles:
-        return gdf
-    col = (PPFI_DOMAINS_LSOA[domain] if dataset == 'ppfi' else IMD_DOMAINS_LSOA[domain])
-    if col not in gdf.columns:
-        return gdf
-    return gdf[gdf[col].isin(deciles)]
-
-
-def _filter_lad_by_percent(gdf, dataset: str, domain: str, lad_percent):
-    if lad_percent is None:
-        return gdf
-    rank_col = (PPFI_DOMAINS_LAD[domain] if dataset == 'ppfi' else IMD_DOMAINS_LAD[domain])
-    if rank_col not in gdf.columns:
-        return gdf
-    max_rank_val = gdf[rank_col].max()
-    if max_rank_val is None:
-        return gdf
-    max_rank = int((lad_percent / 100) * max_rank_val)
-    return gdf[gdf[rank_col] <= max_rank]
-
-
-def _filter_lsoa_to_selected_lad(gdf, selected_lad):
-    if not selected_lad or not isinstance(selected_lad, dict):
-        return gdf
-    lad_id = selected_lad.get('lad_id')
-    if not lad_id:
-        return gdf
-    if 'lad_cd' not in gdf.columns:
-        return gdf
-    return gdf[gdf['lad_cd'] == lad_id]
-
-
-def _center_zoom_from_bounds(bounds):
-    minx, miny, maxx, maxy = bounds
-    center = {'lon': (minx + maxx) / 2, 'lat': (miny + maxy) / 2}
-    span = max(maxx - minx, maxy - miny)
-    if span <= 0:
-        zoom = 9.5
-    else:
-        zoom = 8.5 - math.log(span + 1e-9, 2)
-    zoom = max(5.3, min(10.5, zoom))
-    return center, zoom
-
-
-def _extract_lad_from_click(clickData):
-    if not clickData or not clickData.get('points'):
-        return None, None
-    pt = clickData['points'][0]
-    lad_id = pt.get('location') or pt.get('id')
-    lad_name = None
-    cd = pt.get('customdata')
-    if isinstance(cd, (list, tuple)) and len(cd) > 0:
-        lad_name = cd[0]
-    return lad_id, lad_name
-
-
-# drilldown
-@app.callback(
-    Output('selected_lad_store', 'data'),
-    Output('geography_selector', 'value'),
-    Input('map_single', 'clickData'),
-    Input('map_compare_left', 'clickData'),
-    Input('map_compare_right', 'clickData'),
-    Input('geography_selector', 'value'),
-    Input('view_selector', 'value'),
-    prevent_initial_call=True,
-)
-def drilldown_lad_to_lsoa(click_single, click_left, click_right, geography, view):
-    triggered = (
-        dash.callback_context.triggered[0]['prop_id'].split('.')[0]
-        if dash.callback_context.triggered
-        else None
-    )
-
-    if triggered == 'geography_selector' and geography == 'lad':
-        return None, no_update
-
-    if geography != 'lad':
-        raise PreventUpdate
-
-    if view == 'map' and triggered == 'map_single':
-        lad_id, lad_name = _extract_lad_from_click(click_single)
-        if lad_id:
-            return {'lad_id': lad_id, 'lad_name': lad_name}, 'lsoa'
-        raise PreventUpdate
-
-    if view == 'compare' and triggered in ('map_compare_left', 'map_compare_right'):
-        clickData = click_left if triggered == 'map_compare_left' else click_right
-        lad_id, lad_name = _extract_lad_from_click(clickData)
-        if lad_id:
-            return {'lad_id': lad_id, 'lad_name': lad_name}, 'lsoa'
-        raise PreventUpdate
-
-    raise PreventUpdate
-
-
-# domain opts
-@app.callback(
-    Output('domain_selector', 'options'),
-    Output('domain_selector', 'value'),
-    Input('view_selector', 'value'),
-    Input('geography_selector', 'value'),
-    Input('dataset_selector', 'value'),
-    Input('domain_selector', 'value'),
-)
-def update_domain_options(view, geo, dataset, current_domain):
-    domains = get_domains_for_compare(geo) if view == 'compare' else get_domains_for_single(geo, dataset)
-    opts = [{'label': k.replace('_', ' ').title(), 'value': k} for k in domains.keys()]
-    if current_domain not in domains:
-        current_domain = 'combined'
-    return opts, current_domain
-
-
-# single map
-@app.callback(
-    Output('map_single', 'figure'),
-    Input('geography_selector', 'value'),
-    Input('dataset_selector', 'value'),
-    Input('domain_selector', 'value'),
-    Input('view_selector', 'value'),
-    Input('lsoa_decile_filter', 'value'),
-    Input('lad_rank_filter', 'value'),
-    Input('selected_lad_store', 'data'),
-)
-def update_map(geography, dataset, domain, view, lsoa_decile, lad_percent, selected_lad):
-    filtered_lsoa = gdf_lsoa.copy()
-    filtered_lad = gdf_lad.copy()
-
-    if geography == 'lsoa':
-        filtered_lsoa = _filter_lsoa_by_deciles(filtered_lsoa, dataset, domain, lsoa_decile)
-        filtered_lsoa = _filter_lsoa_to_selected_lad(filtered_lsoa, selected_lad)
-
-    if geography == 'lad':
-        filtered_lad = _filter_lad_by_percent(filtered_lad, dataset, domain, lad_percent)
-
-    fig = make_map(
-        geography,
-        dataset,
-        domain,
-        filtered_lsoa,
-        geojson_lsoa,
-        filtered_lad,
-        geojson_lad,
-        selected_lad=selected_lad,  
-    )
-
-    if geography == 'lsoa' and selected_lad and hasattr(filtered_lsoa, 'empty') and not filtered_lsoa.empty:
-        try:
-            minx, miny, maxx, maxy = filtered_lsoa.total_bounds
-            center, zoom = _center_zoom_from_bounds((minx, miny, maxx, maxy))
-            fig.update_layout(mapbox_center=center, mapbox_zoom=zoom)
-
-            lad_label = selected_lad.get('lad_name') or selected_lad.get('lad_id')
-            if lad_label:
-                fig.update_layout(
-                    title={'text': f'{dataset.upper()} – {domain.replace("_"," ").title()} (LSOA) within {lad_label}', 'x': 0.5}
-                )
-        except Exception:
-            pass
-
-    return fig
-
-
-# compare maps
-@app.callback(
-    Output('map_compare_left', 'figure'),
-    Output('map_compare_right', 'figure'),
-    Input('geography_selector', 'value'),
-    Input('domain_selector_ppfi', 'value'),
-    Input('domain_selector_imd', 'value'),
-    Input('lsoa_decile_filter', 'value'),
-    Input('lad_rank_filter', 'value'),
-    Input('view_selector', 'value'),
-    Input('selected_lad_store', 'data'),
-)
-def update_compare_maps(geography, domain_ppfi, domain_imd, lsoa_decile, lad_percent, view, selected_lad):
-    lsoa_base = gdf_lsoa.copy()
-    lad_base = gdf_lad.copy()
-
-    if geography == 'lsoa':
-        filtered_lsoa_left = _filter_lsoa_by_deciles(lsoa_base, 'ppfi', domain_ppfi, lsoa_decile)
-        filtered_lsoa_right = _filter_lsoa_by_deciles(lsoa_base, 'imd', domain_imd, lsoa_decile)
-
-        filtered_lsoa_left = _filter_lsoa_to_selected_lad(filtered_lsoa_left, selected_lad)
-        filtered_lsoa_right = _filter_lsoa_to_selected_lad(filtered_lsoa_right, selected_lad)
-
-        filtered_lad_left = lad_base
-        filtered_lad_right = lad_base
-    else:
-        filtered_lsoa_left = lsoa_base
-        filtered_lsoa_right = lsoa_base
-
-        filtered_lad_left = _filter_lad_by_percent(lad_base, 'ppfi', domain_ppfi, lad_percent)
-        filtered_lad_right = _filter_lad_by_percent(lad_base, 'imd', domain_imd, lad_percent)
-
-    left_fig = make_map(
-        geography,
-        'ppfi',
-        domain_ppfi,
-        filtered_lsoa_left,
-        geojson_lsoa,
-        filtered_lad_left,
-        geojson_lad,
-        compact_hover=True,
-        selected_lad=selected_lad,  
-    )
-
-    right_fig = make_map(
-        geography,
-        'imd',
-        domain_imd,
-        filtered_lsoa_right,
-        geojson_lsoa,
-        filtered_lad_right,
-        geojson_lad,
-        compact_hover=True,
-        selected_lad=selected_lad, 
-    )
-
-    if geography == 'lsoa' and selected_lad:
-        bounds_gdf = filtered_lsoa_left if hasattr(filtered_lsoa_left, 'empty') and not filtered_lsoa_left.empty else filtered_lsoa_right
-        if bounds_gdf is not None and hasattr(bounds_gdf, 'empty') and not bounds_gdf.empty:
-            try:
-                minx, miny, maxx, maxy = bounds_gdf.total_bounds
-                center, zoom = _center_zoom_from_bounds((minx, miny, maxx, maxy))
-                left_fig.update_layout(mapbox_center=center, mapbox_zoom=zoom)
-                right_fig.update_layout(mapbox_center=center, mapbox_zoom=zoom)
-            except Exception:
-                pass
-
-    pretty_ppfi = domain_ppfi.replace("_"," ").title()
-    pretty_imd  = domain_imd.replace("_"," ").title()
-    geo_label   = geography.upper()
-
-    if not selected_lad:
-        left_fig.update_layout(title={"text": f"PPFI – {pretty_ppfi} ({geo_label})", "x": 0.5})
-        right_fig.update_layout(title={"text": f"IMD – {pretty_imd} ({geo_label})", "x": 0.5})
-        return left_fig, right_fig
-
-    lad_label = selected_lad.get("lad_name") or selected_lad.get("lad_id")
-    left_fig.update_layout(title={"text": f"PPFI – {pretty_ppfi} ({geo_label}) within {lad_label}", "x": 0.5})
-    right_fig.update_layout(title={"text": f"IMD – {pretty_imd} ({geo_label}) within {lad_label}", "x": 0.5})
-    return left_fig, right_fig
+# callbacks/map_callbacks.py
+import os
+
+import dash
+import numpy as np
+from dash import Patch, html, no_update
+from dash.exceptions import PreventUpdate
+from dash.dependencies import ClientsideFunction, Input, Output, State
+
+from app import app
+
+from utils.data import (
+    get_frame, get_lsoa_matrix, get_lad_matrix, get_lad_partitions, get_lsoa_index, get_groups, get_group_values,
+    get_hover_narrative, has_wards,
+)
+from utils.figure_json import encode_figure
+from utils.releases import use_release
+from utils.tiles import tiles_enabled
+from utils.hexgrid import hex_resolution
+from routes.geometry_routes import geometry_url
+from utils.geometry import center_zoom_from_bounds, subset_bounds, pyramid_level, encode_rows, decode_rows
+from utils.figures import (
+    make_map,
+    make_group_map,
+    uses_tiles,
+    get_domains_for_single,
+    get_domains_for_compare,
+)
+from utils.constants import (
+    LAD_NAME,
+    PPFI_DOMAINS_LAD,
+    IMD_DOMAINS_LAD,
+    PPFI_DOMAINS_LSOA,
+    IMD_DOMAINS_LSOA,
+)
+
+# share of the visible width/height drawn beyond each edge of a culled map,
+# so small pans need no re-render
+VIEWPORT_MARGIN = 0.5
+
+# zoom from which the national dot view switches to polygons
+POINTS_MAX_ZOOM = 7.5
+
+
+# helpers
+def _to_int_list(v):
+    if v is None or v == '' or v == 'All':
+        return []
+    if isinstance(v, (list, tuple, set)):
+        out = []
+        for item in v:
+            try:
+                out.append(int(item))
+            except Exception:
+                pass
+        return out
+    try:
+        return [int(v)]
+    except Exception:
+        return []
+
+
+def _filter_lsoa_by_deciles(gdf, dataset: str, domain: str, deciles_value):
+    deciles = _to_int_list(deciles_value)
+    if not deciles:
+        return gdf
+    col = (PPFI_DOMAINS_LSOA[domain] if dataset == 'ppfi' else IMD_DOMAINS_LSOA[domain])
+    matrix = get_lsoa_matrix()
+    if col not in matrix:
+        return gdf
+    return gdf[matrix.isin(col, deciles, rows=gdf.index.to_numpy())]
+
+
+def _filter_lad_by_percent(gdf, dataset: str, domain: str, lad_percent):
+    if lad_percent is None:
+        return gdf
+    rank_col = (PPFI_DOMAINS_LAD[domain] if dataset == 'ppfi' else IMD_DOMAINS_LAD[domain])
+    matrix = get_lad_matrix()
+    if rank_col not in matrix:
+        return gdf
+    rows = gdf.index.to_numpy()
+    max_rank_val = matrix.max(rank_col, rows=rows)
+    if max_rank_val is None:
+        return gdf
+    max_rank = int((lad_percent / 100) * max_rank_val)
+    return gdf[matrix.at_most(rank_col, max_rank, rows=rows)]
+
+
+def _filter_lsoa_to_selected_lad(gdf, selected_lad):
+    # gdf is the full lsoa frame: the LAD's rows come from its partition (a
+    # ward's from the ward groups), so a drilldown never scans all of England
+    if not selected_lad or not isinstance(selected_lad, dict):
+        return gdf
+    ward_id = selected_lad.get('ward_id')
+    if ward_id and has_wards():
+        k = _ward_position(ward_id)
+        return gdf.iloc[get_groups('ward').rows(k)] if k is not None else gdf.iloc[:0]
+    lad_id = selected_lad.get('lad_id')
+    if not lad_id:
+        return gdf
+    if 'lad_cd' not in gdf.columns:
+        return gdf
+    rows = get_lad_partitions().rows(lad_id)
+    return gdf.iloc[rows] if rows is not None else gdf.iloc[:0]
+
+
+def _ward_position(ward_id):
+    hits = np.flatnonzero(get_frame('ward')['id'].to_numpy() == ward_id)
+    return int(hits[0]) if hits.size else None
+
+
+def _selection_label(selected_lad):
+    # "Ward, LAD" once a ward is picked, else the LAD
+    if not selected_lad:
+        return None
+    return selected_lad.get('ward_name') or selected_lad.get('lad_name') or selected_lad.get('lad_id')
+
+
+def _drilldown_center_zoom(filtered, selected_lad):
+    lad_id = selected_lad.get('lad_id')
+    partitions = get_lad_partitions()
+    if lad_id in partitions and len(filtered) == len(partitions.rows(lad_id)):
+        return partitions.center_zoom(lad_id)
+    return center_zoom_from_bounds(subset_bounds(filtered))
+
+
+def _relayout_zoom(relayout):
+    # zoom the user last left the map at; uirevision keeps it across updates
+    if isinstance(relayout, dict) and isinstance(relayout.get('mapbox.zoom'), (int, float)):
+        return relayout['mapbox.zoom']
+    return None
+
+
+def _geometry_state(geography, rows, level, release):
+    if rows is None:
+        return None
+    return {
+        'geography': geography,
+        'rows': encode_rows(np.asarray(rows)),
+        'level': level,
+        'release': release,
+    }
+
+
+def _national_tiles(geography, selected_lad):
+    # PPFI_MAP_TILES draws the LSOA layer from vector tiles until a LAD is
+    # picked; tiles have no hover, the drilldown keeps polygons with hover
+    return tiles_enabled() and geography == 'lsoa' and not selected_lad
+
+
+def _viewport_culling():
+    return os.environ.get('PPFI_VIEWPORT_CULLING', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def _map_points():
+    return os.environ.get('PPFI_MAP_POINTS', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def _rerender_eligible(geography, selected_lad):
+    # the national LSOA map is re-rendered from its inputs as the view moves
+    # when it is culled to the viewport or drawn as dots; a drilldown is one
+    # LAD, drawn whole as polygons
+    return geography == 'lsoa' and not selected_lad and not _national_tiles(geography, selected_lad) \
+        and (_viewport_culling() or _map_points())
+
+
+def _cull_eligible(geography, selected_lad):
+    # PPFI_VIEWPORT_CULLING draws only the LSOAs in and around the viewport,
+    # re-rendering as the user pans
+    return _viewport_culling() and geography == 'lsoa' and _rerender_eligible(geography, selected_lad)
+
+
+def _national_points(geography, selected_lad, zoom):
+    # PPFI_MAP_POINTS draws LSOAs as dots, which are sub-pixel polygons at
+    # national scale anyway, until the user zooms in or picks a LAD
+    return _map_points() and geography == 'lsoa' and _rerender_eligible(geography, selected_lad) \
+        and (zoom is None or zoom < POINTS_MAX_ZOOM)
+
+
+def _relayout_viewport(relayout):
+    # (minx, miny, maxx, maxy) of the visible map, from the corner
+    # coordinates plotly reports with every mapbox move
+    try:
+        corners = np.asarray(relayout['mapbox._derived']['coordinates'], dtype=float)
+    except (TypeError, KeyError, ValueError):
+        return None
+    if corners.shape != (4, 2) or not np.isfinite(corners).all():
+        return None
+    return (*corners.min(axis=0).tolist(), *corners.max(axis=0).tolist())
+
+
+def _current_viewport(relayout, state):
+    # relayoutData is the last pan/zoom; it still describes the view only
+    # while the map has been culled since (a drilldown moves the map itself)
+    if not state or not state.get('box'):
+        return None
+    return _relayout_viewport(relayout)
+
+
+def _cull_box(viewport):
+    minx, miny, maxx, maxy = viewport
+    dx, dy = (maxx - minx) * VIEWPORT_MARGIN, (maxy - miny) * VIEWPORT_MARGIN
+    return [minx - dx, miny - dy, maxx + dx, maxy + dy]
+
+
+def _covers(box, viewport):
+    return box[0] <= viewport[0] and box[1] <= viewport[1] and box[2] >= viewport[2] and box[3] >= viewport[3]
+
+
+def _visible_rows(rows, box):
+    return np.intersect1d(np.asarray(rows), get_lsoa_index().query(box))
+
+
+def _ward_selection(ward_id, label):
+    # the ward and the LAD it lies in, for the LSOA drilldown
+    wards = get_frame('ward')
+    k = _ward_position(ward_id)
+    lad_id = wards['lad_cd'].iat[k] if k is not None else None
+    lad_id = lad_id if isinstance(lad_id, str) else None
+    lad_name = None
+    lad = get_frame('lad')
+    if lad_id is not None and LAD_NAME in lad.columns:
+        match = lad.loc[lad['id'] == lad_id, LAD_NAME]
+        lad_name = str(match.iat[0]) if len(match) else None
+    if not label and k is not None:
+        label = wards['ward_name'].iat[k]
+    return {'lad_id': lad_id, 'lad_name': lad_name, 'ward_id': ward_id, 'ward_name': label}
+
+
+def _extract_area(event):
+    # (id, name) of the area a click or hover event is on
+    if not event or not event.get('points'):
+        return None, None
+    pt = event['points'][0]
+    lad_id = pt.get('location') or pt.get('id')
+    lad_name = None
+    cd = pt.get('customdata')
+    if isinstance(cd, (list, tuple)) and len(cd) > 0:
+        lad_name = cd[0]
+    return lad_id, lad_name
+
+
+# drilldown: LAD -> its wards (when the data has them) -> a ward's LSOAs
+@app.callback(
+    Output('selected_lad_store', 'data'),
+    Output('geography_selector', 'value'),
+    Input('map_single', 'clickData'),
+    Input('map_compare_left', 'clickData'),
+    Input('map_compare_right', 'clickData'),
+    Input('geography_selector', 'value'),
+    Input('view_selector', 'value'),
+    State('release_selector', 'value'),
+    prevent_initial_call=True,
+)
+def drilldown_lad_to_lsoa(click_single, click_left, click_right, geography, view, release=None):
+    triggered = (
+        dash.callback_context.triggered[0]['prop_id'].split('.')[0]
+        if dash.callback_context.triggered
+        else None
+    )
+
+    if triggered == 'geography_selector' and geography == 'lad':
+        return None, no_update
+
+    if geography not in ('lad', 'ward'):
+        raise PreventUpdate
+
+    if view == 'map' and triggered == 'map_single':
+        clickData = click_single
+    elif view == 'compare' and triggered in ('map_compare_left', 'map_compare_right'):
+        clickData = click_left if triggered == 'map_compare_left' else click_right
+    else:
+        raise PreventUpdate
+
+    area_id, area_name = _extract_area(clickData)
+    if not area_id:
+        raise PreventUpdate
+    use_release(release)
+    if geography == 'ward':
+        return _ward_selection(area_id, area_name), 'lsoa'
+    return {'lad_id': area_id, 'lad_name': area_name}, 'ward' if has_wards() else 'lsoa'
+
+
+# domain opts
+@app.callback(
+    Output('domain_selector', 'options'),
+    Output('domain_selector', 'value'),
+    Input('view_selector', 'value'),
+    Input('geography_selector', 'value'),
+    Input('dataset_selector', 'value'),
+    Input('domain_selector', 'value'),
+)
+def update_domain_options(view, geo, dataset, current_domain):
+    domains = get_domains_for_compare(geo) if view == 'compare' else get_domains_for_single(geo, dataset)
+    opts = [{'label': k.replace('_', ' ').title(), 'value': k} for k in domains.keys()]
+    if current_domain not in domains:
+        current_domain = 'combined'
+    return opts, current_domain
+
+
+# single map
+@app.callback(
+    Output('map_single_figure', 'data'),
+    Output('map_single_geometry', 'data'),
+    Input('geography_selector', 'value'),
+    Input('dataset_selector', 'value'),
+    Input('domain_selector', 'value'),
+    Input('view_selector', 'value'),
+    Input('lsoa_decile_filter', 'value'),
+    Input('lad_rank_filter', 'value'),
+    Input('selected_lad_store', 'data'),
+    Input('release_selector', 'value'),
+    State('map_single', 'relayoutData'),
+    State('map_single_geometry', 'data'),
+)
+def update_map(geography, dataset, domain, view, lsoa_decile, lad_percent, selected_lad, release=None, relayout=None,
+               geometry=None):
+    use_release(release)
+    fig, state = _single_map(
+        geography, dataset, domain, lsoa_decile, lad_percent, selected_lad, release,
+        _relayout_zoom(relayout), _current_viewport(relayout, geometry),
+    )
+    return encode_figure(fig), state
+
+
+def _single_map(geography, dataset, domain, lsoa_decile, lad_percent, selected_lad, release, zoom, viewport=None):
+    if geography == 'hex':
+        return _hex_map(dataset, domain, lsoa_decile, release, zoom,
+                        {'map': 'single', 'args': [geography, dataset, domain, lsoa_decile, lad_percent]})
+    if geography == 'ward':
+        return _ward_map(dataset, domain, lsoa_decile, selected_lad, release, zoom)
+
+    # only materialise the geography being drawn; its geometry goes to the
+    # browser by url (cached there), only for the features that are drawn and
+    # simplified for the zoom it is drawn at
+    filtered_lsoa, geojson_lsoa, drawn_lsoa = None, None, None
+    filtered_lad, geojson_lad = None, None
+    rows, drilldown, box = None, None, None
+    cull = _cull_eligible(geography, selected_lad)
+    points = _national_points(geography, selected_lad, zoom)
+
+    if geography == 'lsoa':
+        gdf_lsoa = get_frame('lsoa')
+        filtered_lsoa = _filter_lsoa_to_selected_lad(gdf_lsoa, selected_lad)
+        filtered_lsoa = _filter_lsoa_by_deciles(filtered_lsoa, dataset, domain, lsoa_decile)
+        if selected_lad and not filtered_lsoa.empty:
+            try:
+                drilldown = _drilldown_center_zoom(filtered_lsoa, selected_lad)
+                zoom = drilldown[1]
+            except Exception:
+                pass
+        rows, drawn_lsoa = filtered_lsoa.index, filtered_lsoa
+        if cull and viewport is not None:
+            box = _cull_box(viewport)
+            rows = _visible_rows(rows, box)
+            drawn_lsoa = filtered_lsoa[filtered_lsoa.index.isin(rows)]
+        if not points:
+            geojson_lsoa = geometry_url('lsoa', rows=rows, level=pyramid_level(zoom))
+
+    if geography == 'lad':
+        gdf_lad = get_frame('lad')
+        filtered_lad = _filter_lad_by_percent(gdf_lad, dataset, domain, lad_percent)
+        rows = filtered_lad.index
+        geojson_lad = geometry_url('lad', rows=rows, level=pyramid_level(zoom))
+
+    fig = make_map(
+        geography,
+        dataset,
+        domain,
+        drawn_lsoa,
+        geojson_lsoa,
+        filtered_lad,
+        geojson_lad,
+        selected_lad=selected_lad,  
+        vector_tiles=_national_tiles(geography, selected_lad),
+        outline_gdf=filtered_lsoa,
+        points=points,
+    )
+
+    if drilldown is not None:
+        try:
+            center, zoom = drilldown
+            fig.update_layout(mapbox_center=center, mapbox_zoom=zoom)
+
+            lad_label = _selection_label(selected_lad)
+            if lad_label:
+                fig.update_layout(
+                    title={'text': f'{dataset.upper()} – {domain.replace("_"," ").title()} (LSOA) within {lad_label}', 'x': 0.5}
+                )
+        except Exception:
+            pass
+
+    # tiles bring their own detail per zoom, no geometry level to switch
+    state = None if uses_tiles(fig) else _geometry_state(geography, rows, pyramid_level(zoom), release)
+    if state and _rerender_eligible(geography, selected_lad):
+        state.update(view={'map': 'single', 'args': [geography, dataset, domain, lsoa_decile, lad_percent]},
+                     box=box, points=points)
+    return fig, state
+
+
+# hover detail: the narrative of the area under the cursor (or last
+# clicked), looked up by id, so the figure only carries the short tooltip
+@app.callback(
+    Output('map_hover_detail', 'style'),
+    Output('map_hover_detail', 'children'),
+    Input('map_single', 'hoverData'),
+    Input('map_single', 'clickData'),
+    Input('geography_selector', 'value'),
+    State('release_selector', 'value'),
+)
+def update_hover_detail(hover, click, geography, release=None):
+    if geography not in ('lsoa', 'lad'):
+        return {'display': 'none'}, None
+    triggered = dash.callback_context.triggered[0]['prop_id'] if dash.callback_context.triggered else ''
+    event = click if triggered == 'map_single.clickData' else hover
+    area_id, area_name = _extract_area(event) if not triggered.startswith('geography_selector') else (None, None)
+    if not area_id:
+        return {'display': 'block'}, html.P('Hover over an area for how PPFI and IMD compare there.',
+                                            className='hover-detail-hint')
+    use_release(release)
+    customdata = event['points'][0].get('customdata') or []
+    metric = 'decile' if geography == 'lsoa' else 'rank'
+    values = [
+        html.Div(f'{label} combined {metric}: {value}')
+        for label, value in zip(('PPFI', 'IMD'), customdata[1:3]) if value is not None
+    ]
+    narrative = get_hover_narrative(geography, area_id)
+    return {'display': 'block'}, [
+        html.H4(area_name or area_id),
+        html.Div(values, className='hover-detail-values'),
+        *[html.P(sentence) for sentence in narrative.split('<br>') if sentence],
+    ]
+
+
+# compare maps
+@app.callback(
+    Output('map_compare_left_figure', 'data'),
+    Output('map_compare_right_figure', 'data'),
+    Output('map_compare_left_geometry', 'data'),
+    Output('map_compare_right_geometry', 'data'),
+    Input('geography_selector', 'value'),
+    Input('domain_selector_ppfi', 'value'),
+    Input('domain_selector_imd', 'value'),
+    Input('lsoa_decile_filter', 'value'),
+    Input('lad_rank_filter', 'value'),
+    Input('view_selector', 'value'),
+    Input('selected_lad_store', 'data'),
+    Input('release_selector', 'value'),
+    State('map_compare_left', 'relayoutData'),
+    State('map_compare_right', 'relayoutData'),
+    State('map_compare_left_geometry', 'data'),
+    State('map_compare_right_geometry', 'data'),
+)
+def update_compare_maps(geography, domain_ppfi, domain_imd, lsoa_decile, lad_percent, view, selected_lad,
+                        release=None, relayout=None, relayout_right=None, geometry=None, geometry_right=None):
+    use_release(release)
+    maps = _compare_maps(
+        geography, domain_ppfi, domain_imd, lsoa_decile, lad_percent, selected_lad, release,
+        _relayout_zoom(relayout),
+        {'ppfi': _current_viewport(relayout, geometry), 'imd': _current_viewport(relayout_right, geometry_right)},
+    )
+    (left_fig, left_state), (right_fig, right_state) = maps['ppfi'], maps['imd']
+    return encode_figure(left_fig), encode_figure(right_fig), left_state, right_state
+
+
+def _compare_maps(geography, domain_ppfi, domain_imd, lsoa_decile, lad_percent, selected_lad, release, zoom,
+                  viewports=None, sides=('ppfi', 'imd')):
+    # {dataset: (figure, geometry state)} for the compare maps in `sides`
+    viewports = viewports or {}
+    domains = {'ppfi': domain_ppfi, 'imd': domain_imd}
+    if geography == 'hex':
+        args = [geography, domain_ppfi, domain_imd, lsoa_decile, lad_percent]
+        return {d: _hex_map(d, domains[d], lsoa_decile, release, zoom, {'map': 'compare', 'side': d, 'args': args})
+                for d in sides}
+    if geography == 'ward':
+        return {d: _ward_map(d, domains[d], lsoa_decile, selected_lad, release, zoom) for d in sides}
+    drilldown = None
+
+    if geography == 'lsoa':
+        lsoa_base = _filter_lsoa_to_selected_lad(get_frame('lsoa'), selected_lad)
+        filtered = {d: _filter_lsoa_by_deciles(lsoa_base, d, domains[d], lsoa_decile) for d in domains}
+        if selected_lad:
+            bounds_gdf = filtered['ppfi'] if not filtered['ppfi'].empty else filtered['imd']
+            if not bounds_gdf.empty:
+                try:
+                    drilldown = _drilldown_center_zoom(bounds_gdf, selected_lad)
+                    zoom = drilldown[1]
+                except Exception:
+                    pass
+    else:
+        lad_base = get_frame('lad')
+        filtered = {d: _filter_lad_by_percent(lad_base, d, domains[d], lad_percent) for d in domains}
+
+    # both maps draw the same features at the same level, so the browser
+    # fetches the geometry once (unless their viewports cut it differently)
+    rows = filtered['ppfi'].index.union(filtered['imd'].index)
+    level = pyramid_level(zoom)
+    cull = _cull_eligible(geography, selected_lad)
+    points = _national_points(geography, selected_lad, zoom)
+    geo_label = geography.upper()
+    lad_label = _selection_label(selected_lad)
+
+    out = {}
+    for dataset in sides:
+        drawn_rows, drawn, box = rows, filtered[dataset], None
+        if cull and viewports.get(dataset) is not None:
+            box = _cull_box(viewports[dataset])
+            drawn_rows = _visible_rows(rows, box)
+            drawn = drawn[drawn.index.isin(drawn_rows)]
+        geojson = None if points else geometry_url(geography, rows=drawn_rows, level=level)
+        layers = (drawn, geojson, None, None) if geography == 'lsoa' else (None, None, drawn, geojson)
+
+        fig = make_map(
+            geography,
+            dataset,
+            domains[dataset],
+            *layers,
+            compact_hover=True,
+            selected_lad=selected_lad,  
+            vector_tiles=_national_tiles(geography, selected_lad),
+            outline_gdf=filtered[dataset],
+            points=points,
+        )
+        if drilldown is not None:
+            center, drill_zoom = drilldown
+            fig.update_layout(mapbox_center=center, mapbox_zoom=drill_zoom)
+
+        title = f"{dataset.upper()} – {domains[dataset].replace('_', ' ').title()} ({geo_label})"
+        if lad_label is not None:
+            title += f" within {lad_label}"
+        fig.update_layout(title={"text": title, "x": 0.5})
+
+        state = None if uses_tiles(fig) else _geometry_state(geography, drawn_rows, level, release)
+        if state and _rerender_eligible(geography, selected_lad):
+            state.update(view={'map': 'compare', 'side': dataset,
+                               'args': [geography, domain_ppfi, domain_imd, lsoa_decile, lad_percent]},
+                         box=box, points=points)
+        out[dataset] = (fig, state)
+    return out
+
+
+def _filter_groups_by_deciles(geography, level, dataset, domain, lsoa_decile, cells=None):
+    # the decile filter keeps the hexes/wards whose most common decile it selects
+    deciles = _to_int_list(lsoa_decile)
+    col = (PPFI_DOMAINS_LSOA if dataset == 'ppfi' else IMD_DOMAINS_LSOA).get(domain)
+    if not deciles or col not in get_lsoa_matrix():
+        return cells
+    _, mode = get_group_values(geography, level, col)
+    keep = np.flatnonzero(np.isin(mode, deciles))
+    return keep if cells is None else np.intersect1d(cells, keep)
+
+
+def _hex_map(dataset, domain, lsoa_decile, release, zoom, view):
+    # hexes are sized for the zoom (utils.hexgrid.hex_resolution)
+    resolution = hex_resolution(zoom)
+    cells = _filter_groups_by_deciles('hex', resolution, dataset, domain, lsoa_decile)
+    geojson = geometry_url('hex', rows=cells, level=resolution)
+    fig = make_group_map('hex', dataset, domain, resolution, geojson, cells)
+    rows = np.arange(len(get_groups('hex', resolution))) if cells is None else cells
+    return fig, {**_geometry_state('hex', rows, resolution, release), 'view': view}
+
+
+def _ward_map(dataset, domain, lsoa_decile, selected_lad, release, zoom):
+    # wards of the selected LAD (all of England without one), drawn like the
+    # lsoa and lad layers: pyramid geometry, switched by _switch_geometry_level
+    if not has_wards():
+        raise PreventUpdate
+    cells, drilldown = None, None
+    lad_id = selected_lad.get('lad_id') if isinstance(selected_lad, dict) else None
+    if lad_id:
+        cells = np.flatnonzero(get_frame('ward')['lad_cd'].to_numpy() == lad_id)
+        partitions = get_lad_partitions()
+        if lad_id in partitions:
+            drilldown = partitions.center_zoom(lad_id)
+            zoom = drilldown[1]
+    cells = _filter_groups_by_deciles('ward', 0, dataset, domain, lsoa_decile, cells)
+    level = pyramid_level(zoom)
+    fig = make_group_map('ward', dataset, domain, 0, geometry_url('ward', rows=cells, level=level), cells,
+                         selected_lad=selected_lad if drilldown is not None else None)
+    if drilldown is not None:
+        center, drill_zoom = drilldown
+        fig.update_layout(mapbox_center=center, mapbox_zoom=drill_zoom)
+        label = selected_lad.get('lad_name') or lad_id
+        fig.update_layout(
+            title={'text': f'{dataset.upper()} – {domain.replace("_", " ").title()} (WARD) within {label}', 'x': 0.5}
+        )
+    rows = np.arange(len(get_groups('ward'))) if cells is None else cells
+    return fig, _geometry_state('ward', rows, level, release)
+
+
+# pan/zoom. hexes are redrawn at the resolution for the new zoom; a map drawn as dots becomes polygons past POINTS_MAX_ZOOM (and
+# back); a culled map is re-rendered for the new viewport once it leaves the
+# area drawn last; otherwise the choropleth's geometry is swapped for the
+# pyramid level that suits the new zoom, leaving values, hover and layout in
+# the browser untouched
+def _on_relayout(relayout, state):
+    if not state:
+        raise PreventUpdate
+    viewport = _relayout_viewport(relayout)
+    if state.get('geography') == 'hex':
+        # another resolution is a different set of hexes, values included
+        zoom = _relayout_zoom(relayout)
+        if zoom is None or hex_resolution(zoom) == state.get('level'):
+            raise PreventUpdate
+        use_release(state.get('release'))
+        return _render_view(state, zoom, None)
+    if state.get('view'):
+        zoom = _relayout_zoom(relayout)
+        if zoom is not None and _map_points() and (zoom < POINTS_MAX_ZOOM) != bool(state.get('points')):
+            use_release(state.get('release'))
+            return _render_view(state, zoom, viewport if _viewport_culling() else None)
+        if _viewport_culling() and viewport is not None:
+            return _cull_to_viewport(relayout, state, viewport)
+    if state.get('points'):
+        raise PreventUpdate
+    return _switch_geometry_level(relayout, state)
+
+
+def _cull_to_viewport(relayout, state, viewport):
+    zoom = _relayout_zoom(relayout)
+    # dots have no geometry level
+    level = pyramid_level(zoom) if zoom is not None and not state.get('points') else state.get('level')
+    box = state.get('box')
+    if box and level == state.get('level') and _covers(box, viewport):
+        raise PreventUpdate
+    use_release(state.get('release'))
+    if box is None and level == state.get('level'):
+        # drawn uncut so far: nothing to do while everything drawn is in view
+        try:
+            rows = decode_rows(state['rows'])
+        except (KeyError, ValueError):
+            raise PreventUpdate
+        new_box = _cull_box(viewport)
+        if len(_visible_rows(rows, new_box)) == len(rows):
+            return no_update, {**state, 'box': new_box}
+    return _render_view(state, zoom, viewport)
+
+
+def _render_view(state, zoom, viewport):
+    # (figure, state) of the map in `state`, drawn again for a new view
+    view = state['view']
+    if view['map'] == 'single':
+        fig, state = _single_map(*view['args'], None, state.get('release'), zoom, viewport)
+    else:
+        fig, state = _compare_maps(*view['args'], None, state.get('release'), zoom,
+                                   {view['side']: viewport}, sides=(view['side'],))[view['side']]
+    return encode_figure(fig), state
+
+
+def _switch_geometry_level(relayout, state):
+    zoom = _relayout_zoom(relayout)
+    if zoom is None:
+        raise PreventUpdate
+    level = pyramid_level(zoom)
+    if level == state.get('level'):
+        raise PreventUpdate
+    use_release(state.get('release'))
+    try:
+        rows = decode_rows(state['rows'])
+    except (KeyError, ValueError):
+        raise PreventUpdate
+    fig = Patch()
+    fig['data'][0]['geojson'] = geometry_url(state['geography'], rows=rows, level=level)
+    return fig, {**state, 'level': level}
+
+
+for _map_id in ('map_single', 'map_compare_left', 'map_compare_right'):
+    # figures reach the graph through the browser, which decodes topojson
+    # geometry first (assets/topojson.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='ppfi', function_name='resolveTopojson'),
+        Output(_map_id, 'figure'),
+        Input(f'{_map_id}_figure', 'data'),
+    )
+    app.callback(
+        Output(f'{_map_id}_figure', 'data', allow_duplicate=True),
+        Output(f'{_map_id}_geometry', 'data', allow_duplicate=True),
+        Input(_map_id, 'relayoutData'),
+        State(f'{_map_id}_geometry', 'data'),
+        prevent_initial_call=True,
+    )(_on_relayout)
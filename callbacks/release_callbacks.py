@@ -0,0 +1,18 @@
+# callbacks/release_callbacks.py
+from dash.dependencies import Input, Output
+
+from app import app
+from utils.releases import registry
+
+
+@app.callback(
+    Output('release_selector', 'options'),
+    Output('release_block', 'style'),
+    Input('view_selector', 'value'),
+)
+def populate_release_options(view):
+    releases = registry.available()
+    opts = [{'label': label, 'value': name} for name, label in releases]
+    # nothing to choose between with a single release
+    style = {'display': 'block'} if len(releases) > 1 and view != 'about' else {'display': 'none'}
+    return opts, style
@@ -0,0 +1,9 @@
+# gunicorn.conf.py -- picked up automatically from the working directory
+
+
+def post_worker_init(worker):
+    # the SIGUSR2 data reload from utils/data.py, installed in each worker
+    # after gunicorn sets up its signals (send it to a worker, not the
+    # master, which treats USR2 as a binary upgrade)
+    from utils.data import install_reload_signal
+    install_reload_signal()
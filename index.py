@@ -1,5 +1,7 @@
-# index.py
-from app import app
-
-if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000, debug=False)
+# index.py
+from app import app
+
+if __name__ == "__main__":
+    from utils.data import install_reload_signal
+    install_reload_signal()
+    app.run(host="0.0.0.0", port=8000, debug=False)
@@ -0,0 +1,48 @@
+# routes/admin_routes.py
+import hmac
+import os
+
+from flask import abort, jsonify, request
+
+from app import server
+from utils.data import reload_data, reload_status, reload_signal_installed, RELOAD_SIGNAL
+from utils.profiling import child_pids
+from utils.releases import registry
+
+
+def _check_token():
+    # disabled unless PPFI_ADMIN_TOKEN is set
+    token = os.environ.get('PPFI_ADMIN_TOKEN')
+    if not token:
+        abort(404)
+    given = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(given.encode(), token.encode()):
+        abort(403)
+
+
+def _signal_sibling_workers():
+    # only the worker that got the request reloads by itself; under gunicorn
+    # (with gunicorn.conf.py installing the handler) pass it on to the others
+    if not request.environ.get('SERVER_SOFTWARE', '').startswith('gunicorn') or not reload_signal_installed():
+        return []
+    siblings = [pid for pid in child_pids(os.getppid()) if pid != os.getpid()]
+    for pid in siblings:
+        try:
+            os.kill(pid, RELOAD_SIGNAL)
+        except ProcessLookupError:
+            pass
+    return siblings
+
+
+@server.route('/_admin/reload', methods=['POST'])
+def admin_reload():
+    _check_token()
+    started = reload_data()
+    siblings = _signal_sibling_workers() if started else []
+    return jsonify({'started': started, 'signalled': siblings, **reload_status()}), 202
+
+
+@server.route('/_admin/data')
+def admin_data():
+    _check_token()
+    return jsonify({**reload_status(), 'releases': registry.status()})
@@ -0,0 +1,123 @@
+# routes/compression_routes.py
+#
+# response compression and conditional requests for everything the geometry
+# and tile routes don't handle themselves (see utils/compression.py).
+# callback and page responses are compressed per request and GETs get a
+# content-hash ETag, so a repeat fetch is a 304. /assets/ is served from
+# memory, precompressed, with a content-hash ETag; urls carrying a version
+# (dash's ?m=, or ?v= for the fonts styles.css points at) are immutable.
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response, abort, request
+from werkzeug.security import safe_join
+
+from app import app, server
+from utils.compression import MIN_BYTES, cached_compressed, compress, compressible, negotiate
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# url("x") / url('x') / url(x), relative names only
+CSS_URL = re.compile(r'''url\(\s*(["']?)([^"')?#:]+)\1\s*\)''')
+
+
+class _Asset:
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self._variants = {}
+
+    def variant(self, encoding):
+        # assets are small, so the best level is cheap
+        if encoding is None:
+            return self.body
+        if encoding not in self._variants:
+            self._variants[encoding] = compress(self.body, encoding, best=True)
+        return self._variants[encoding]
+
+
+_assets = {}
+_assets_lock = threading.Lock()
+
+
+def _load_asset(path, seen=()):
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    asset = _assets.get(path)
+    if asset is not None and asset[0] == key:
+        return asset[1]
+    with open(path, 'rb') as fh:
+        body = fh.read()
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if mimetype == 'text/css':
+        body = _version_css_urls(body, os.path.dirname(path), seen + (path,))
+    loaded = _Asset(body, mimetype)
+    with _assets_lock:
+        _assets[path] = (key, loaded)
+    return loaded
+
+
+def _version_css_urls(body, folder, seen):
+    # fonts and images a stylesheet points at get ?v=<content hash>, so
+    # they can be cached for good like the stylesheet itself
+    def versioned(match):
+        quote, name = match.groups()
+        target = safe_join(folder, name)
+        if target is None or target in seen or not os.path.isfile(target):
+            return match.group(0)
+        return f'url({quote}{name}?v={_load_asset(target, seen).etag}{quote})'
+    return CSS_URL.sub(versioned, body.decode('utf-8')).encode('utf-8')
+
+
+def serve_asset(filename):
+    path = safe_join(app.config.assets_folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    asset = _load_asset(path)
+    encoding = None
+    if compressible(asset.mimetype) and len(asset.body) >= MIN_BYTES:
+        encoding = negotiate(request.accept_encodings)
+    response = Response(asset.variant(encoding), mimetype=asset.mimetype)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(asset.etag if encoding is None else f'{asset.etag}-{encoding}')
+    response.headers['Cache-Control'] = IMMUTABLE if request.args.get('m') or request.args.get('v') else 'no-cache'
+    return response.make_conditional(request)
+
+
+for rule in server.url_map.iter_rules():
+    if rule.endpoint.endswith('_dash_assets.static'):
+        server.view_functions[rule.endpoint] = serve_asset
+
+
+@server.after_request
+def compress_response(response):
+    if (request.method == 'HEAD' or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or 'Content-Encoding' in response.headers
+            or not compressible(response.mimetype)):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = negotiate(request.accept_encodings) if len(body) >= MIN_BYTES else None
+
+    if request.method == 'GET' and 'ETag' not in response.headers:
+        tag = hashlib.sha256(body).hexdigest()[:16]
+        response.set_etag(tag if encoding is None else f'{tag}-{encoding}')
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    if encoding is not None:
+        if response.cache_control.max_age:
+            # long-lived bodies (dash's component bundles) are compressed once
+            compressed = cached_compressed(hashlib.sha256(body).hexdigest(), encoding, lambda: body)
+        else:
+            compressed = compress(body, encoding)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,17 @@
+# routes/diagnostics_routes.py
+from flask import jsonify
+
+from app import server
+from utils.profiling import startup_report, process_memory
+
+
+@server.route('/_startup')
+def startup_timings():
+    # per-phase wall/cpu/rss for the data load, see utils/profiling.py
+    return jsonify(startup_report())
+
+
+@server.route('/_memory')
+def worker_memory():
+    # answered by whichever worker gets the request; see `python -m utils.profiling`
+    return jsonify(process_memory())
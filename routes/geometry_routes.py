@@ -0,0 +1,193 @@
+# routes/geometry_routes.py
+#
+# map geometry is served once from a content-addressed url and cached by the
+# browser for good; figures reference the url instead of embedding the
+# FeatureCollection, so callback responses only carry ids, values and hover.
+# a filtered view gets a url for just its features: the row set is encoded in
+# the url and the subset is cut from the pre-serialised bytes on request.
+# each level of the simplification pyramid (utils.geometry.pyramid_level) has
+# its own url, so zooming in swaps the trace to a finer file. where a level
+# has quantised topojson and it is smaller than the geojson the view needs,
+# the url points at that instead; assets/topojson.js decodes it for plotly.
+# hex grids (utils/hexgrid.py) are served the same way, one "level" per
+# grid resolution; wards like the lsoa and lad layers. bodies go out brotli or
+# gzip compressed when the client accepts it (utils/compression.py).
+import threading
+from collections import OrderedDict
+
+import dash
+import numpy as np
+from flask import Response, abort, request
+
+from app import server
+from utils.compression import cached_compressed, compress, negotiate, precompressed
+from utils.data import DataSnapshot, get_geometry, get_topology, pyramid_levels
+from utils.data_loader import ArtifactError
+from utils.geometry import MAX_ROWS_TOKEN, encode_rows, decode_rows
+from utils.releases import registry
+
+GEOMETRY_PATH = '/_geometry/{geography}.z{level}.{fingerprint}.geojson'
+SUBSET_PATH   = '/_geometry/{geography}.z{level}.{fingerprint}/{rows}.geojson'
+TOPOJSON_PATH = '/_geometry/{geography}.z{level}.{fingerprint}.topojson'
+CHUNK_BYTES = 1 << 20
+
+# past MAX_ROWS_TOKEN, or when most features are drawn anyway, the full
+# (probably cached) collection is used
+MAX_SUBSET_SHARE = 0.5
+
+# compressed subset bodies. the row token comes from the client, so these
+# stay in memory under a byte cap instead of going to the disk cache
+SUBSET_CACHE_BYTES = 32 << 20
+
+_subsets = OrderedDict()
+_subsets_lock = threading.Lock()
+_subsets_bytes = 0
+
+
+def geometry_url(geography, rows=None, level=0):
+    """Immutable url of the current request's geojson for this geography at
+    a pyramid level, cut down to `rows` (positions in the layer) when that is
+    worthwhile."""
+    # without a pyramid every level is the same file, keep one url for it
+    level = min(level, pyramid_levels(geography) - 1)
+    geojson = get_geometry(geography, level)
+    where = {'geography': geography, 'level': level, 'fingerprint': geojson.fingerprint}
+    path, size = GEOMETRY_PATH.format(**where), len(geojson)
+    if rows is not None and geojson.spans is not None and len(rows) <= MAX_SUBSET_SHARE * len(geojson.spans):
+        rows = np.asarray(rows)
+        token = encode_rows(rows)
+        if len(token) <= MAX_ROWS_TOKEN:
+            path = SUBSET_PATH.format(rows=token, **where)
+            size = int(np.diff(geojson.spans[rows], axis=1).sum())
+    topology = get_topology(geography, level)
+    if topology is not None and len(topology) <= size:
+        path = TOPOJSON_PATH.format(geography=geography, level=level, fingerprint=topology.fingerprint)
+    return dash.get_relative_path(path)
+
+
+def _listed_fingerprint(manifest, kind, geography, level):
+    # the fingerprint a release's manifest gives the file, or None when it
+    # gives none (source data, hex grids, artifacts built before they were listed)
+    levels = ((manifest or {}).get('pyramid') or {}).get(geography) or ()
+    entry = next((e for e in levels if e.get('level') == level), None)
+    return (entry or {}).get('fingerprint' if kind == 'geometry' else 'topojson_fingerprint')
+
+
+def _geometry_of(snap, kind, geography, level, load):
+    get = snap.get if load else snap.peek
+    found = get(f'{kind}_{geography}@{level}')
+    if found is None and kind == 'geometry':
+        layer = get(geography)
+        found = layer[1] if layer is not None else None
+    return found
+
+
+def _find_geometry(kind, geography, level, fingerprint):
+    # the url may have been built by another worker or for another release.
+    # geometry already in memory is tried first; past that only a release
+    # whose manifest lists the fingerprint is loaded, so a made-up url loads
+    # nothing. without a listing, only releases in memory are searched
+    resident = registry.resident()
+    for snap in resident.values():
+        found = _geometry_of(snap, kind, geography, level, load=False)
+        if found is not None and found.fingerprint == fingerprint:
+            return found
+    manifests = registry.manifests()
+    candidates = [name for name, manifest in manifests.items()
+                  if _listed_fingerprint(manifest, kind, geography, level) == fingerprint]
+    candidates += [name for name in resident
+                   if _listed_fingerprint(manifests.get(name), kind, geography, level) is None]
+    for name in candidates:
+        try:
+            snap = registry.get(name) if name not in resident else resident[name]
+            found = _geometry_of(snap, kind, geography, level, load=True)
+        except (KeyError, ArtifactError):
+            continue
+        if found is not None and found.fingerprint == fingerprint:
+            return found
+    return None
+
+
+def _chunks(raw):
+    for start in range(0, len(raw), CHUNK_BYTES):
+        yield bytes(raw[start:start + CHUNK_BYTES])
+
+
+def _compressed_subset(tag, encoding, body):
+    global _subsets_bytes
+    with _subsets_lock:
+        hit = _subsets.get(tag)
+        if hit is not None:
+            _subsets.move_to_end(tag)
+            return hit
+    compressed = compress(bytes(body), encoding)
+    with _subsets_lock:
+        if tag not in _subsets:
+            _subsets[tag] = compressed
+            _subsets_bytes += len(compressed)
+            while _subsets_bytes > SUBSET_CACHE_BYTES and _subsets:
+                _subsets_bytes -= len(_subsets.popitem(last=False)[1])
+    return compressed
+
+
+def _immutable(etag, source_fn, subset=False):
+    # source_fn gives the mapped geometry (whose build-time .br/.gz are used
+    # when present) or the bytes of a subset. the route has already found and
+    # checked it, so a url that would 404 never gets a 304. each coding is
+    # its own representation with its own etag. only fingerprinted bodies go
+    # to the disk cache, subsets are compressed in memory (_compressed_subset)
+    encoding = negotiate(request.accept_encodings)
+    tag = etag if encoding is None else f'{etag}-{encoding}'
+    headers = {
+        'Cache-Control': 'public, max-age=31536000, immutable',
+        'ETag': f'"{tag}"',
+        'Vary': 'Accept-Encoding',
+    }
+    if request.if_none_match.contains(tag):
+        return Response(status=304, headers=headers)
+    source = source_fn()
+    body = getattr(source, 'raw', source)
+    if encoding is not None:
+        if subset:
+            body = _compressed_subset(tag, encoding, body)
+        else:
+            compressed = precompressed(source, encoding)
+            if compressed is None:
+                compressed = cached_compressed(tag, encoding, lambda: bytes(body))
+            body = compressed
+        headers['Content-Encoding'] = encoding
+    headers['Content-Length'] = str(len(body))
+    return Response(_chunks(body), mimetype='application/json', headers=headers)
+
+
+def _lookup(geography, level, fingerprint, kind='geometry'):
+    if geography not in ('lsoa', 'lad', 'ward', 'hex') or f'{kind}_{geography}@{level}' not in DataSnapshot.NAMES:
+        abort(404)
+    found = _find_geometry(kind, geography, level, fingerprint)
+    if found is None:
+        abort(404)
+    return found
+
+
+@server.route('/_geometry/<geography>.z<int:level>.<fingerprint>.geojson')
+def serve_geometry(geography, level, fingerprint):
+    found = _lookup(geography, level, fingerprint)
+    return _immutable(fingerprint, lambda: found)
+
+
+@server.route('/_geometry/<geography>.z<int:level>.<fingerprint>/<rows>.geojson')
+def serve_geometry_subset(geography, level, fingerprint, rows):
+    geojson = _lookup(geography, level, fingerprint)
+    try:
+        picked = decode_rows(rows)
+    except ValueError:
+        abort(404)
+    if geojson.spans is None or (picked.size and picked[-1] >= len(geojson.spans)):
+        abort(404)
+    return _immutable(f'{fingerprint}.{rows}', lambda: memoryview(geojson.subset(picked)), subset=True)
+
+
+@server.route('/_geometry/<geography>.z<int:level>.<fingerprint>.topojson')
+def serve_topology(geography, level, fingerprint):
+    found = _lookup(geography, level, fingerprint, kind='topojson')
+    return _immutable(fingerprint, lambda: found)
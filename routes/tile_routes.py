@@ -0,0 +1,89 @@
+# routes/tile_routes.py
+#
+# vector tiles for the map layers (see utils/tiles.py). the url names the
+# data version, the indicator column with its colour range and the rows to
+# draw, so a tile never changes and is cached by the browser for good. only
+# colour ranges the maps use are served, and only whole-layer tiles are
+# kept on disk: a row token is the client's choice, so those are rendered
+# per request.
+import numpy as np
+from flask import Response, abort
+
+from app import server
+from utils.constants import IMD_DOMAINS_LAD, IMD_DOMAINS_LSOA, PPFI_DOMAINS_LAD, PPFI_DOMAINS_LSOA
+from utils.data import get_matrix
+from utils.figures import map_range
+from utils.geometry import decode_rows
+from utils.releases import registry, use_release
+from utils.tiles import MAX_ZOOM, TILE_CLASSES, cached_tile, class_values, render_tile
+
+
+DOMAINS = {
+    'lsoa': (PPFI_DOMAINS_LSOA, IMD_DOMAINS_LSOA),
+    'lad': (PPFI_DOMAINS_LAD, IMD_DOMAINS_LAD),
+}
+
+
+def _release_for(version):
+    # the version may belong to another release than this worker's default;
+    # matched against manifests and releases in memory, so a made-up version
+    # loads nothing and tile requests never reorder the release lru
+    for name, snap in registry.resident().items():
+        if snap.version == version:
+            return name
+    for name, manifest in registry.manifests().items():
+        if manifest is not None and manifest.get('version') == version:
+            return name
+    return None
+
+
+def _colour_ranges(geography, column):
+    # the ranges make_map draws this column with, as they appear in the url
+    ranges = set()
+    for domains in DOMAINS[geography]:
+        for domain, col in domains.items():
+            if col == column:
+                lo_hi = map_range(geography, domain)
+                if lo_hi is not None:
+                    ranges.add('{:g}_{:g}'.format(*lo_hi))
+    return ranges
+
+
+@server.route('/_tiles/<version>/<geography>/<column>/<colour_range>/<rows>/<int:z>/<int:x>/<int:y>.mvt')
+def serve_tile(version, geography, column, colour_range, rows, z, x, y):
+    if geography not in TILE_CLASSES or not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        abort(404)
+    release = _release_for(version)
+    if release is None:
+        abort(404)
+    snap = use_release(release)
+    matrix = get_matrix(geography)
+    if column not in matrix or colour_range not in _colour_ranges(geography, column):
+        abort(404)
+    lo, hi = (float(v) for v in colour_range.split('_'))
+
+    def render():
+        classes = class_values(matrix.column(column), (lo, hi), TILE_CLASSES[geography])
+        if rows != 'all':
+            try:
+                picked = decode_rows(rows)
+            except ValueError:
+                abort(404)
+            if picked.size and picked[-1] >= len(classes):
+                abort(404)
+            drawn = np.full_like(classes, -1)
+            drawn[picked] = classes[picked]
+            classes = drawn
+        return render_tile(geography, z, x, y, classes)
+
+    if snap.pinned is None:
+        # source-file versions are numbered per process, not safe to keep on disk
+        body = render()
+        return Response(body, mimetype='application/vnd.mapbox-vector-tile', headers={'Cache-Control': 'no-cache'})
+    if rows == 'all':
+        body = cached_tile((version, geography, column, colour_range, rows, str(z), str(x), f'{y}.mvt'), render)
+    else:
+        body = render()
+    return Response(body, mimetype='application/vnd.mapbox-vector-tile', headers={
+        'Cache-Control': 'public, max-age=31536000, immutable',
+    })
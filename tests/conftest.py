@@ -0,0 +1,89 @@
+# tests/conftest.py
+#
+# a small synthetic release (4 LADs of 36 square LSOAs, 4 wards each) built
+# into an artifact with utils.build_data. the data modules read their
+# directories from the environment at import, so these are pointed at a
+# scratch directory before any test imports them.
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.constants import LAD_ID, LAD_NAME, LSOA_ID, LSOA_NAME
+from utils.indicators import LAD_INDICATORS, LSOA_INDICATORS
+
+_ROOT = tempfile.mkdtemp(prefix='ppfi-tests-')
+os.environ.update(
+    PPFI_ARTIFACT_DIR=os.path.join(_ROOT, 'build'),
+    PPFI_RELEASES_DIR=os.path.join(_ROOT, 'releases'),
+    PPFI_COMPRESS_CACHE=os.path.join(_ROOT, 'compressed'),
+    PPFI_TILE_CACHE=os.path.join(_ROOT, 'tiles'),
+)
+
+N_LAD, SIDE = 4, 6
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_ROOT, ignore_errors=True)
+
+
+def write_sources(source_dir, seed=0):
+    """The four source files of a synthetic release, in EPSG:27700 like the real ones."""
+    gpd = pytest.importorskip('geopandas')
+    from shapely.geometry import box
+
+    rng = np.random.default_rng(seed)
+    rows, lads = [], []
+    for lad in range(N_LAD):
+        x0, y0 = 400000 + lad % 2 * SIDE * 1000, 300000 + lad // 2 * SIDE * 1000
+        lads.append({LAD_ID: f'E06{lad:06d}', LAD_NAME: f'District {lad}',
+                     'geometry': box(x0, y0, x0 + SIDE * 1000, y0 + SIDE * 1000)})
+        for i in range(SIDE * SIDE):
+            x, y = x0 + i % SIDE * 1000, y0 + i // SIDE * 1000
+            row = {LSOA_ID: f'E01{len(rows):06d}', LSOA_NAME: f'Area {len(rows)}',
+                   'geometry': box(x, y, x + 1000, y + 1000), '_lad': lad, '_ward': lad * 4 + i % SIDE // 3 * 2 + i // SIDE // 3}
+            row.update({c: int(rng.integers(1, 11)) for c in LSOA_INDICATORS})
+            rows.append(row)
+    lsoa = gpd.GeoDataFrame(rows, crs=27700)
+    # a few gaps, as in the real deciles
+    lsoa.loc[rng.choice(len(lsoa), 5, replace=False), 'imd_health_decile'] = np.nan
+
+    os.makedirs(source_dir, exist_ok=True)
+    lsoa.drop(columns=['_lad', '_ward']).to_file(os.path.join(source_dir, 'ppfi_imd_lsoa_england.geojson'))
+    lad = gpd.GeoDataFrame(lads, crs=27700)
+    for c in LAD_INDICATORS:
+        lad[c] = rng.permutation(N_LAD) + 1
+    lad.to_file(os.path.join(source_dir, 'ppfi_imd_lad_england.geojson'))
+
+    mismatch = pd.DataFrame({
+        'lsoa21cd': lsoa[LSOA_ID], 'lsoa21nm': lsoa[LSOA_NAME],
+        'lad24cd': [f'E06{k:06d}' for k in lsoa['_lad']], 'lad24nm': [f'District {k}' for k in lsoa['_lad']],
+        'pp_dec_combined': lsoa['pp_dec_combined'], 'imd_decile': lsoa['imd_decile'],
+    })
+    mismatch['ppfi_imd_diff'] = mismatch['pp_dec_combined'] - mismatch['imd_decile']
+    mismatch.to_csv(os.path.join(source_dir, 'imd_ppfi_mismatch.csv'), index=False)
+    pd.DataFrame({
+        'LSOA21CD': lsoa[LSOA_ID],
+        'WD24CD': [f'E05{k:06d}' for k in lsoa['_ward']], 'WD24NM': [f'Ward {k}' for k in lsoa['_ward']],
+    }).to_csv(os.path.join(source_dir, 'lsoa21_ward_lookup.csv'), index=False)
+
+
+@pytest.fixture(scope='session')
+def artifact():
+    """Artifact directory the app serves from, built once per session."""
+    from utils.build_data import build_artifact
+
+    out_dir = os.environ['PPFI_ARTIFACT_DIR']
+    write_sources(os.path.join(_ROOT, 'src'))
+    build_artifact(out_dir, source_dir=os.path.join(_ROOT, 'src'))
+    return out_dir
+
+
+@pytest.fixture(scope='session')
+def app(artifact):
+    import app  # registers the callbacks; loads the artifact on first use
+    return app
@@ -0,0 +1,82 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+from plotly.io.json import to_json_plotly
+
+from utils.figure_json import typed_array
+
+
+def _decode(value):
+    # typed array specs back to the plain lists plotly's json engine writes
+    if isinstance(value, dict):
+        if {'dtype', 'bdata'} <= set(value):
+            array = np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype']).newbyteorder('<'))
+            if 'shape' in value:
+                array = array.reshape([int(n) for n in value['shape'].split(',')])
+            return json.loads(to_json_plotly(array, engine='json'))
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+@pytest.mark.parametrize('values, dtype', [
+    (np.array([1, 5, 10], dtype=np.int64), 'i1'),
+    (np.array([-300, 2, 40000], dtype=np.int64), 'i4'),
+    (np.array([0, 70000], dtype=np.uint32), 'u4'),
+    (np.array([True, False, True]), 'u1'),
+    (np.array([0.5, np.nan, -2.25]), 'f8'),
+    (np.array([1.5, 2.5], dtype=np.float32), 'f4'),
+    (np.arange(6, dtype=np.int16).reshape(3, 2), 'i2'),
+])
+def test_typed_array_round_trip(values, dtype):
+    spec = typed_array(values)
+    assert spec['dtype'] == dtype
+    assert _decode(spec) == json.loads(to_json_plotly(values, engine='json'))
+
+
+def test_int64_out_of_int32_range_becomes_float64():
+    spec = typed_array(np.array([0, 2**40], dtype=np.int64))
+    assert spec['dtype'] == 'f8'
+    assert _decode(spec) == [0, 2**40]
+
+
+MAPS = {
+    'lsoa': ('lsoa', 'ppfi', 'combined', 'map', [], 100, None),
+    'lsoa deciles, imd income': ('lsoa', 'imd', 'income', 'map', [1, 2], 100, None),
+    'lad': ('lad', 'imd', 'health', 'map', [], 40, None),
+    'hex': ('hex', 'ppfi', 'combined', 'map', [], 100, None),
+    'ward': ('ward', 'ppfi', 'combined', 'map', [3], 100, None),
+}
+
+
+def _response(fig):
+    return json.loads(to_json_plotly(fig, engine='orjson'))
+
+
+@pytest.mark.parametrize('points', ['0', '1'])
+@pytest.mark.parametrize('case', MAPS)
+def test_map_response_matches_plotly_figure(app, monkeypatch, case, points):
+    from callbacks.map_callbacks import update_map
+
+    monkeypatch.setenv('PPFI_MAP_POINTS', points)
+    monkeypatch.setenv('PPFI_TYPED_ARRAYS', '0')
+    expected = json.loads(to_json_plotly(update_map(*MAPS[case])[0], engine='json'))
+    monkeypatch.setenv('PPFI_TYPED_ARRAYS', '1')
+    encoded = update_map(*MAPS[case])[0]
+    assert '"bdata"' in json.dumps(_response(encoded))
+    assert _decode(_response(encoded)) == expected
+
+
+def test_compare_map_responses_match_plotly_figures(app, monkeypatch):
+    from callbacks.map_callbacks import update_compare_maps
+
+    args = ('lsoa', 'combined', 'income', [3], 100, 'compare', None)
+    monkeypatch.setenv('PPFI_TYPED_ARRAYS', '0')
+    expected = [json.loads(to_json_plotly(fig, engine='json')) for fig in update_compare_maps(*args)[:2]]
+    monkeypatch.setenv('PPFI_TYPED_ARRAYS', '1')
+    responses = [_response(fig) for fig in update_compare_maps(*args)[:2]]
+    assert all('"bdata"' in json.dumps(r) for r in responses)
+    assert [_decode(r) for r in responses] == expected
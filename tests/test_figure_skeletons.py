@@ -0,0 +1,76 @@
+import json
+
+import plotly.graph_objects as go
+import plotly.io as pio
+import pytest
+
+from utils.figure_skeletons import from_skeleton
+
+VIEWS = {
+    # id: (geography, dataset, domain, deciles, drilldown, env)
+    'lsoa': ('lsoa', 'ppfi', 'combined', [], False, {}),
+    'lsoa deciles, imd income': ('lsoa', 'imd', 'income', [1, 2], False, {}),
+    'lsoa drilldown': ('lsoa', 'ppfi', 'combined', [], True, {}),
+    'lsoa dots': ('lsoa', 'ppfi', 'combined', [], False, {'PPFI_MAP_POINTS': '1'}),
+    'lsoa tiles': ('lsoa', 'ppfi', 'combined', [], False, {'PPFI_MAP_TILES': '1'}),
+    'lad': ('lad', 'ppfi', 'combined', [], False, {}),
+    'lad imd health': ('lad', 'imd', 'health', [], False, {}),
+    'hex': ('hex', 'ppfi', 'combined', [], False, {}),
+    'ward drilldown': ('ward', 'ppfi', 'combined', [], True, {}),
+}
+
+
+def _canonical(fig):
+    return json.dumps(json.loads(pio.to_json(fig, validate=False)), sort_keys=True)
+
+
+def _drilldown():
+    from utils.data import get_frame
+    lad_id = str(get_frame('lad')['id'].iat[0])
+    return {'lad_id': lad_id, 'lad_name': lad_id}
+
+
+def _both_ways(monkeypatch, render):
+    figures = {}
+    for flag in ('0', '1'):
+        monkeypatch.setenv('PPFI_FIGURE_SKELETONS', flag)
+        figures[flag] = [_canonical(fig) for fig in render()]
+    return figures['0'], figures['1']
+
+
+@pytest.mark.parametrize('view', VIEWS)
+def test_single_map_matches_plotly_express(app, monkeypatch, view):
+    from callbacks.map_callbacks import _single_map
+
+    geography, dataset, domain, deciles, drilldown, env = VIEWS[view]
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    selected = _drilldown() if drilldown else None
+    expected, got = _both_ways(monkeypatch, lambda: [
+        _single_map(geography, dataset, domain, deciles, 100, selected, None, None)[0],
+    ])
+    assert got == expected
+
+
+@pytest.mark.parametrize('geography', ['lsoa', 'lad'])
+def test_compare_maps_match_plotly_express(app, monkeypatch, geography):
+    from callbacks.map_callbacks import _compare_maps
+
+    def render():
+        maps = _compare_maps(geography, 'combined', 'combined', [], 100, None, None, None)
+        return [maps['ppfi'][0], maps['imd'][0]]
+
+    expected, got = _both_ways(monkeypatch, render)
+    assert got == expected
+
+
+def test_skeleton_is_not_modified_by_renders():
+    def build():
+        return go.Figure(go.Scatter(x=[1, 2], y=[3, 4]), layout={'title': {'text': 'base'}})
+
+    first = from_skeleton(('test', 'scatter'), build)
+    first.update_layout(title_text='changed')
+    first.data[0].update(y=[5, 6])
+    second = from_skeleton(('test', 'scatter'), build)
+    assert second.layout.title.text == 'base'
+    assert list(second.data[0].y) == [3, 4]
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from utils.constants import IMD_LSOA_DOMAIN_LABELS, PPFI_LSOA_DOMAIN_LABELS
+from utils.indicators import LAD_INDICATORS, LSOA_INDICATORS, MISSING, IndicatorMatrix
+from utils.narratives import COMBINED_COLUMNS, hover_narrative, layer_narratives
+
+
+def _matrix(geography, n, seed=0):
+    rng = np.random.default_rng(seed)
+    if geography == 'lsoa':
+        columns = LSOA_INDICATORS
+        values = rng.integers(1, 11, size=(n, len(columns)))
+        # gaps in the domains; every area has both combined deciles
+        gaps = rng.random(values.shape) < 0.05
+        gaps[:, [columns.index(c) for c in COMBINED_COLUMNS['lsoa']]] = False
+        values[gaps] = MISSING
+    else:
+        columns = LAD_INDICATORS
+        values = np.column_stack([rng.permutation(n) + 1 for _ in columns])
+    return IndicatorMatrix(values.astype(np.int16), columns, [f'A{i:05d}' for i in range(n)])
+
+
+def _rowwise(matrix, geography):
+    # the hover text worded one row dict at a time. missing deciles are left
+    # out of the dict, as layer_narratives does; a nan would sort as a domain
+    n_lad = len(matrix) if geography == 'lad' else 0
+    ppfi_col, imd_col = COMBINED_COLUMNS[geography]
+    columns = [ppfi_col, imd_col] + [c for c, _ in PPFI_LSOA_DOMAIN_LABELS + IMD_LSOA_DOMAIN_LABELS]
+    frame = matrix.frame(columns if geography == 'lsoa' else columns[:2])
+    frame = frame.rename(columns={ppfi_col: 'ppfi_combined', imd_col: 'imd_combined'})
+    frame['diff'] = frame['ppfi_combined'] - frame['imd_combined']
+    return frame.apply(lambda r: hover_narrative(r.dropna().to_dict(), geography, n_lad), axis=1).to_numpy()
+
+
+@pytest.mark.parametrize('geography, n', [('lsoa', 3000), ('lad', 300)])
+def test_layer_narratives_match_rowwise(geography, n):
+    matrix = _matrix(geography, n)
+    got = layer_narratives(matrix, geography)
+    assert len(got) == n
+    assert list(got) == list(_rowwise(matrix, geography))
+
+
+def test_layer_narratives_of_artifact(artifact):
+    from utils.data import get_matrix
+
+    for geography in COMBINED_COLUMNS:
+        matrix = get_matrix(geography)
+        assert list(layer_narratives(matrix, geography)) == list(_rowwise(matrix, geography))
+
+
+def test_missing_combined_decile_has_no_narrative():
+    values = _matrix('lsoa', 50).values.copy()
+    values[3, LSOA_INDICATORS.index('imd_decile')] = MISSING
+    matrix = IndicatorMatrix(values, LSOA_INDICATORS, [f'A{i:05d}' for i in range(50)])
+    got = layer_narratives(matrix, 'lsoa')
+    assert got[3] == ''
+    assert all(got[np.arange(50) != 3])
@@ -0,0 +1,256 @@
+# utils/build_data.py
+#
+# one-off build step: run the full source transform (read, reproject, key
+# normalisation, numeric coercion, geojson serialisation, sanity checks, ward
+# join), precompute the geometric products (bounds, centre/zoom, shared-edge
+# outlines) and write the result as a versioned artifact the app can load
+# directly, with best-level .br/.gz copies of the served geometry next to it.
+# needs requirements-build.txt; the app itself does not.
+#
+#   python -m utils.build_data [--out data/build]
+#
+# another release (e.g. IMD 2025) is built from a directory holding the same
+# source file names, into its own folder under data/releases/:
+#
+#   python -m utils.build_data --source-dir data/imd2025 --out data/releases/imd2025 --release "IMD 2025"
+
+import argparse
+import datetime as dt
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+import shapely
+import shapely.geometry
+import pyarrow.feather as feather
+
+from utils.compression import precompress_file
+from utils.data_loader import (
+    ARTIFACT_DIR, ARTIFACT_FORMAT, ARTIFACT_FILES, MANIFEST_NAME, EDGE_ARRAYS,
+    file_sha256, prepare_source_data, prepare_wards, source_paths,
+)
+from utils.geometry import PYRAMID_TOLERANCES, LadPartitions, decode_topojson, union_outline
+from utils.geometry_build import (
+    TOPOJSON_STEP, build_arcs, build_edge_topology, encode_topojson, geometry_fingerprint,
+    polygons_from_arcs, simplify_arcs,
+)
+from utils.indicators import LSOA_INDICATORS, LAD_INDICATORS, split_indicators
+from utils.shared_data import content_fingerprint, encode_feature_collection
+
+
+def _write_geojson(collection, out_dir, key):
+    # the bytes match json.dump(compact); the spans let the app cut subsets out of them
+    raw, spans = encode_feature_collection(collection)
+    with open(os.path.join(out_dir, ARTIFACT_FILES[key]), 'wb') as fh:
+        fh.write(raw)
+    np.save(os.path.join(out_dir, ARTIFACT_FILES[f'{key}.spans']), spans)
+
+
+def _write_pyramid(gdf, out_dir, geography):
+    # map geometry at every simplification level, as geojson and as quantised
+    # topojson. neighbours share simplified arcs, so no level opens gaps
+    # between areas; properties are cut down to the id plotly joins on
+    topology = build_arcs(gdf.geometry.values)
+    ids = gdf['id'].astype(str).tolist()
+    sizes = []
+    for level, tolerance in enumerate((0, *PYRAMID_TOLERANCES)):
+        arc_coords = simplify_arcs(topology, tolerance)
+        geoms = polygons_from_arcs(topology, arc_coords) if tolerance else gdf.geometry.values
+        collection = {
+            'type': 'FeatureCollection',
+            'features': [
+                {'type': 'Feature', 'properties': {'id': fid}, 'geometry': json.loads(shapely.to_geojson(geom))}
+                for fid, geom in zip(ids, geoms)
+            ],
+        }
+        key = f'geometry_{geography}@{level}'
+        _write_geojson(collection, out_dir, key)
+
+        step = tolerance / 10 if tolerance else TOPOJSON_STEP
+        topo = encode_topojson(topology, arc_coords, ids, geography, step)
+        with open(os.path.join(out_dir, ARTIFACT_FILES[f'topojson_{geography}@{level}']), 'wb') as fh:
+            fh.write(topo)
+        with open(os.path.join(out_dir, ARTIFACT_FILES[key]), 'rb') as fh:
+            raw = fh.read()
+        # the geometry routes serve these as they are to clients that accept br/gzip
+        compressed = {
+            'geojson': precompress_file(os.path.join(out_dir, ARTIFACT_FILES[key])),
+            'topojson': precompress_file(os.path.join(out_dir, ARTIFACT_FILES[f'topojson_{geography}@{level}'])),
+        }
+        sizes.append({
+            'level': level,
+            'tolerance': tolerance,
+            'vertices': int(shapely.get_num_coordinates(np.asarray(geoms)).sum()),
+            'bytes': len(raw),
+            'gzip_bytes': len(gzip.compress(raw)),
+            'topojson_step': step,
+            'topojson_bytes': len(topo),
+            'topojson_gzip_bytes': len(gzip.compress(topo)),
+            'compressed_bytes': compressed,
+            # the geometry routes find a url's file by these
+            'fingerprint': content_fingerprint(raw),
+            'topojson_fingerprint': content_fingerprint(topo),
+            **_topojson_fidelity(topo, raw, ids, geoms, step),
+        })
+    return sizes
+
+
+def _topojson_fidelity(topo, raw, ids, geoms, step):
+    # decode the topojson back and hold it against the geometry it encodes;
+    # snapping moves a vertex by at most half a grid cell diagonally
+    started = time.perf_counter()
+    decoded = decode_topojson(topo)
+    decode_s = time.perf_counter() - started
+    started = time.perf_counter()
+    json.loads(raw)
+    parse_s = time.perf_counter() - started
+
+    shapes = np.asarray([shapely.geometry.shape(decoded[fid]) for fid in ids])
+    error = float(shapely.hausdorff_distance(shapes, np.asarray(geoms)).max()) if len(ids) else 0.0
+    if error > step:
+        raise ValueError(f'topojson drifts {error:.3g} degrees from the source, more than its grid step {step:.3g}')
+    return {'topojson_max_error': error, 'geojson_parse_s': round(parse_s, 4), 'topojson_decode_s': round(decode_s, 4)}
+
+
+def build_artifact(out_dir=ARTIFACT_DIR, *, source_dir=None, release=None):
+    gdf_lsoa, geojson_lsoa, gdf_lad, geojson_lad, df_mismatch = prepare_source_data(source_dir=source_dir)
+    gdf_ward, geojson_ward = prepare_wards(gdf_lsoa, source_dir=source_dir)
+
+    # write into a scratch dir next to the target, then swap it in
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.build-', dir=parent)
+
+    try:
+        gdf_lsoa.to_parquet(os.path.join(tmp_dir, ARTIFACT_FILES['lsoa']))
+        gdf_lad.to_parquet(os.path.join(tmp_dir, ARTIFACT_FILES['lad']))
+        # uncompressed arrow ipc so the app can memory-map it
+        feather.write_feather(
+            pa.Table.from_pandas(df_mismatch.reset_index(drop=True), preserve_index=False),
+            os.path.join(tmp_dir, ARTIFACT_FILES['mismatch']),
+            compression='uncompressed',
+        )
+        _write_geojson(geojson_lsoa, tmp_dir, 'geojson_lsoa')
+        _write_geojson(geojson_lad, tmp_dir, 'geojson_lad')
+
+        pyramid = {
+            'lsoa': _write_pyramid(gdf_lsoa, tmp_dir, 'lsoa'),
+            'lad': _write_pyramid(gdf_lad, tmp_dir, 'lad'),
+        }
+        rows = {'lsoa': len(gdf_lsoa), 'lad': len(gdf_lad), 'mismatch': len(df_mismatch)}
+
+        # wards are dissolved from the lsoas, so they only exist when the
+        # lookup carries ward codes; they have no indicators of their own
+        if gdf_ward is not None:
+            gdf_ward.to_parquet(os.path.join(tmp_dir, ARTIFACT_FILES['ward']))
+            _write_geojson(geojson_ward, tmp_dir, 'geojson_ward')
+            pyramid['ward'] = _write_pyramid(gdf_ward, tmp_dir, 'ward')
+            rows['ward'] = len(gdf_ward)
+
+        # shapely-derived products, so serving never needs geopandas
+        edges = build_edge_topology(gdf_lsoa.geometry.values)
+        for k in EDGE_ARRAYS:
+            np.save(os.path.join(tmp_dir, ARTIFACT_FILES[f'lsoa_edges.{k}']), edges[k])
+
+        # LAD boundaries for drilldown outlines and the highlight layer
+        partitions = LadPartitions(gdf_lsoa)
+        _write_geojson({
+            'type': 'FeatureCollection',
+            'features': [
+                {'type': 'Feature', 'properties': {'id': lad_id},
+                 'geometry': union_outline(edges, partitions.rows(lad_id))}
+                for lad_id in partitions.ids.tolist()
+            ],
+        }, tmp_dir, 'lad_outlines')
+
+        # indicator matrices as raw .npy, mapped read-only by every worker
+        indicators, geometry = {}, {}
+        for geography, gdf, columns in (('lsoa', gdf_lsoa, LSOA_INDICATORS),
+                                        ('lad', gdf_lad, LAD_INDICATORS)):
+            frame, matrix = split_indicators(gdf, columns)
+            np.save(os.path.join(tmp_dir, ARTIFACT_FILES[f'{geography}_indicators']), matrix.values)
+            frame_columns = [c for c in frame.columns if c != 'geometry']
+            indicators[geography] = {
+                'columns': list(matrix.columns),
+                'float_columns': matrix.float_columns,
+                'dtype': str(matrix.values.dtype),
+                'frame_columns': frame_columns,
+            }
+            geometry[geography] = geometry_fingerprint(frame[frame_columns], gdf.geometry.values)
+        if gdf_ward is not None:
+            geometry['ward'] = geometry_fingerprint(
+                gdf_ward.drop(columns='geometry'), gdf_ward.geometry.values,
+            )
+
+        files = {}
+        for fname in sorted(ARTIFACT_FILES.values()):
+            path = os.path.join(tmp_dir, fname)
+            if os.path.exists(path):
+                files[fname] = {'sha256': file_sha256(path), 'bytes': os.path.getsize(path)}
+
+        sources = {}
+        for path in source_paths(source_dir):
+            if os.path.exists(path):
+                sources[path] = file_sha256(path)
+
+        # data version changes whenever any output byte changes
+        version = hashlib.sha256(
+            ''.join(files[f]['sha256'] for f in sorted(files)).encode()
+        ).hexdigest()[:12]
+
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'version': version,
+            'release': release,
+            'built_at': dt.datetime.now(dt.timezone.utc).isoformat(timespec='seconds'),
+            'rows': rows,
+            'indicators': indicators,
+            # releases on the same boundaries share geometry at serve time
+            'geometry': geometry,
+            'pyramid': pyramid,
+            'sources': sources,
+            'files': files,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(tmp_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the prebuilt data artifact for the app.')
+    parser.add_argument('--out', default=ARTIFACT_DIR, help='output directory (default: %(default)s)')
+    parser.add_argument('--source-dir', default=None,
+                        help='directory with the source files of another release (default: data/)')
+    parser.add_argument('--release', default=None, help='release label shown in the app, e.g. "IMD 2025"')
+    args = parser.parse_args(argv)
+
+    manifest = build_artifact(args.out, source_dir=args.source_dir, release=args.release)
+    print(f"built artifact {manifest['version']} in {args.out}")
+    for fname, entry in manifest['files'].items():
+        print(f"  {fname:<26} {entry['bytes']:>12,} bytes  {entry['sha256'][:12]}")
+    print('map geometry payload per level (bytes, gzipped bytes, parse/decode seconds):')
+    for geography, levels in manifest['pyramid'].items():
+        for entry in levels:
+            print(f"  {geography:<4} z{entry['level']}  tolerance {entry['tolerance']:<7} "
+                  f"{entry['vertices']:>10,} vertices  "
+                  f"geojson {entry['bytes']:>11,} {entry['gzip_bytes']:>10,} {entry['geojson_parse_s']:.3f}s  "
+                  f"topojson {entry['topojson_bytes']:>10,} {entry['topojson_gzip_bytes']:>9,} "
+                  f"{entry['topojson_decode_s']:.3f}s  max error {entry['topojson_max_error']:.2g}")
+
+
+if __name__ == '__main__':
+    main()
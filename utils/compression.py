@@ -0,0 +1,178 @@
+# utils/compression.py
+#
+# http compression, negotiated per request from Accept-Encoding: brotli when
+# the client takes it and the optional `brotli` package is installed, else
+# gzip. callback responses are compressed on the fly at a fast level; map
+# geometry is compressed once at the best level when the artifact is built
+# (<file>.br / <file>.gz next to it, see utils/build_data.py), and anything
+# else immutable is compressed on first request and kept on disk under
+# PPFI_COMPRESS_CACHE, so every worker and restart reuses it.
+
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from utils.shared_data import MappedFile
+
+COMPRESS_CACHE_DIR = os.environ.get('PPFI_COMPRESS_CACHE', 'data/compressed')
+
+# below this a compressed body saves next to nothing
+MIN_BYTES = 1024
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/vnd.mapbox-vector-tile',
+    'image/svg+xml', 'font/ttf', 'font/otf',
+)
+
+# (on the fly, once) levels; brotli 11 is ~100x slower than 4, fine for a build step only
+LEVELS = {'br': (4, 11), 'gzip': (6, 9)}
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+_mapped = {}
+_mapped_lock = threading.Lock()
+
+# bytes written to each capped cache folder since it was last pruned
+_written = {}
+_written_lock = threading.Lock()
+
+
+def encodings():
+    """Supported content codings, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encodings):
+    """Best coding the request accepts (a werkzeug Accept), or None for identity."""
+    for encoding in encodings():
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body, encoding, best=False):
+    level = LEVELS[encoding][best]
+    if encoding == 'br':
+        return brotli.compress(bytes(body), quality=level)
+    # mtime=0 keeps the output a pure function of the input
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def precompress_file(path):
+    """Write the best-level <path>.br / <path>.gz next to a file; returns
+    {encoding: bytes written}."""
+    with open(path, 'rb') as fh:
+        raw = fh.read()
+    sizes = {}
+    for encoding in encodings():
+        body = compress(raw, encoding, best=True)
+        with open(path + SUFFIXES[encoding], 'wb') as fh:
+            fh.write(body)
+        sizes[encoding] = len(body)
+    return sizes
+
+
+def precompressed(mapped, encoding):
+    """Build-time compressed bytes of a memory-mapped file (MappedFile), also
+    memory-mapped, or None when there are none for the bytes it maps."""
+    path = getattr(mapped, 'path', None)
+    if not path:
+        return None
+    target = path + SUFFIXES[encoding]
+    try:
+        source, stat = os.stat(path), os.stat(target)
+    except FileNotFoundError:
+        return None
+    replaced = (source.st_ino, source.st_mtime_ns, source.st_size) != mapped.identity
+    if replaced or stat.st_mtime_ns < source.st_mtime_ns:
+        # the file was rebuilt since it was mapped, or rebuilt without
+        # its compressed copies
+        return None
+    # a rebuild replaces the copies too, so the mapping is keyed by the
+    # file on disk, not its name
+    key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _mapped_lock:
+        cached = _mapped.get(target)
+        if cached is None or cached[0] != key:
+            cached = _mapped[target] = (key, MappedFile(target))
+    return cached[1].raw
+
+
+def disk_cached(path, make, root=None, max_bytes=None):
+    """Bytes from a cache file, making and storing them on a miss. Writes are
+    atomic, so concurrent workers making the same file just race to an
+    identical one. With `max_bytes`, the folder `root` the file lives under
+    is pruned back to that size now and then (see prune_cache)."""
+    try:
+        with open(path, 'rb') as fh:
+            return fh.read()
+    except FileNotFoundError:
+        pass
+    body = make()
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(body)
+        os.replace(tmp, path)
+    except OSError:
+        # a read-only or full disk only costs the cache
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+        return body
+    if max_bytes:
+        _note_write(root, len(body), max_bytes)
+    return body
+
+
+def _note_write(root, size, max_bytes):
+    # walking the folder per write would cost more than the write, so it is
+    # pruned each time another 1/16 of the cap has been written here
+    with _written_lock:
+        _written[root] = _written.get(root, 0) + size
+        if _written[root] < max_bytes // 16:
+            return
+        _written[root] = 0
+    prune_cache(root, max_bytes)
+
+
+def prune_cache(root, max_bytes):
+    """Delete the least recently written files under `root` until it holds
+    at most `max_bytes`."""
+    files = []
+    for folder, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(folder, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cached_compressed(key, encoding, body_fn):
+    """Compressed bytes of an immutable body from the disk cache; `key`
+    must change whenever the body does (a content hash or fingerprint)."""
+    name = hashlib.sha256(key.encode()).hexdigest()[:32]
+    path = os.path.join(COMPRESS_CACHE_DIR, name[:2], name + SUFFIXES[encoding])
+    return disk_cached(path, lambda: compress(body_fn(), encoding))
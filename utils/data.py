@@ -1,9 +1,512 @@
-
-from utils.data_loader import load_all_data
-
-# load base data
-gdf_lsoa, geojson_lsoa, gdf_lad, geojson_lad, df_mismatch = load_all_data()
-
-# preserve full, unfiltered datasets
-gdf_lsoa_full = gdf_lsoa.copy()
-gdf_lad_full = gdf_lad.copy()
+import hashlib
+import itertools
+import logging
+import os
+import signal
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+from flask import g, has_request_context
+
+from utils.data_loader import (
+    ARTIFACT_DIR, artifact_version,
+    load_lsoa, load_lad, load_ward, load_mismatch, load_lsoa_columns, load_lsoa_edges, load_lad_outlines,
+    load_geometry_level, load_topology_level,
+)
+from utils.geometry import BOUNDS_COLS, BoxIndex, LadPartitions, PYRAMID_TOLERANCES, union_outline
+from utils.hexgrid import HEX_SIZES, MISMATCH_DECILES, HexGrid
+from utils.indicators import LsoaGroups
+from utils.narratives import layer_narratives
+from utils.shared_data import resident_nbytes
+from utils.profiling import phase, log_phase, log_startup_report, set_meta
+from utils.constants import LAD_ID, LAD_NAME, LSOA_ID, PPFI_LSOA_DOMAIN_LABELS, IMD_LSOA_DOMAIN_LABELS
+
+logger = logging.getLogger('ppfi.data')
+
+# each dataset is loaded on first use, so the about/mismatch views never pay
+# for geometry and a worker that only serves LAD maps never holds LSOAs.
+# PPFI_PRELOAD=lsoa,lad,mismatch (or "all") loads them at import instead,
+# e.g. to share them across workers with gunicorn --preload.
+#
+# everything hangs off a DataSnapshot for one data version. reload_data()
+# builds the next snapshot off to the side and swaps it in atomically; a
+# request keeps the snapshot it started with until it finishes.
+
+_source_generation = itertools.count(1)
+
+
+class DataSnapshot:
+    # lsoa/lad entries are (frame, geojson, matrix): descriptive columns, the
+    # pre-serialised geojson (memory-mapped with an artifact) and the deciles
+    # geometry_<geo>@<level> is one level of the simplified map geometry,
+    # topojson_<geo>@<level> the same level as quantised topojson; hex@<k> is
+    # the hex grid at HEX_SIZES[k], whose polygons are geometry_hex@<k>.
+    # 'ward' is (frame, geojson) without a matrix, or None when the ward
+    # lookup had no ward codes; ward_groups maps the lsoas onto it
+    NAMES = ('lsoa', 'lad', 'ward', 'mismatch', 'lsoa_domains', 'lsoa_edges', 'lad_partitions', 'lsoa_index',
+             'ward_groups',
+             *(f'{kind}_{geo}@{level}' for kind in ('geometry', 'topojson') for geo in ('lsoa', 'lad', 'ward')
+               for level in range(len(PYRAMID_TOLERANCES) + 1)),
+             *(f'hex@{k}' for k in range(len(HEX_SIZES))),
+             *(f'geometry_hex@{k}' for k in range(len(HEX_SIZES))))
+
+    def __init__(self, artifact_dir=ARTIFACT_DIR):
+        self.artifact_dir = artifact_dir
+        pinned = artifact_version(artifact_dir)
+        self._pinned = pinned
+        # without an artifact every reload re-reads the sources, so number them
+        self.version = pinned or f'geojson-{next(_source_generation)}'
+        self._locks = {name: threading.Lock() for name in self.NAMES}
+        self._cache = {}
+        # per-snapshot results of snapshot_cache() functions
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+        # called after each lazy load, e.g. to enforce a memory budget
+        self.on_load = None
+
+    def __repr__(self):
+        return f'DataSnapshot({self.version!r}, loaded={self.loaded})'
+
+    @property
+    def pinned(self):
+        # the artifact version, None when loaded from the source files
+        return self._pinned
+
+    @property
+    def loaded(self):
+        return [name for name in self.NAMES if name in self._cache]
+
+    def get(self, name):
+        # double-checked so the hot path never takes the lock
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        with self._locks[name]:
+            if name not in self._cache:
+                with phase(f'lazy.{name}') as record:
+                    self._cache[name] = self._load(name)
+                log_phase(record)
+                loaded = True
+            else:
+                loaded = False
+        if loaded and self.on_load is not None:
+            self.on_load(self)
+        return self._cache[name]
+
+    def peek(self, name):
+        # what get() would return if it is loaded, else None; never loads
+        return self._cache.get(name)
+
+    def memory(self):
+        # {id(obj): bytes} for everything loaded, so callers can count objects
+        # shared between snapshots (same-boundary geometry) only once
+        objects = {}
+        for value in list(self._cache.values()):
+            for obj in (value if isinstance(value, tuple) else (value,)):
+                objects[id(obj)] = _nbytes(obj)
+        return objects
+
+    def derived(self, key):
+        with self._derived_lock:
+            return self._derived.setdefault(key, (OrderedDict(), threading.Lock()))
+
+    def _load(self, name):
+        where = {'artifact_dir': self.artifact_dir, 'version': self._pinned}
+        if name == 'lsoa':
+            return load_lsoa(**where)
+        if name == 'lad':
+            return load_lad(**where)
+        if name == 'ward':
+            # from source files the wards are dissolved from the loaded lsoas
+            return load_ward(None if self._pinned else self.get('lsoa')[0], **where)
+        if name == 'mismatch':
+            return load_mismatch(**where)
+        if name == 'lsoa_domains':
+            return self._load_lsoa_domains(where)
+        if name == 'lsoa_edges':
+            return load_lsoa_edges(self.get('lsoa')[0], **where)
+        if name == 'lad_partitions':
+            with phase('lad_partitions.build'):
+                return LadPartitions(self.get('lsoa')[0], outlines=load_lad_outlines(**where))
+        if name == 'lsoa_index':
+            with phase('lsoa_index.build'):
+                return BoxIndex(self.get('lsoa')[0][BOUNDS_COLS].to_numpy())
+        if name == 'ward_groups':
+            wards = self.get('ward')
+            if wards is None:
+                return None
+            with phase('ward_groups.build'):
+                return LsoaGroups.from_codes(self.get('lsoa')[0]['ward_cd'], wards[0]['id'])
+        if name.startswith('hex@'):
+            with phase(f'{name}.build'):
+                lad = self.get('lad')[0]
+                names = dict(zip(lad[LAD_ID].astype(str), lad[LAD_NAME].astype(str))) \
+                    if LAD_ID in lad.columns and LAD_NAME in lad.columns else None
+                return HexGrid(self.get('lsoa')[0], HEX_SIZES[int(name[4:])], lad_names=names)
+        if name.startswith('geometry_hex@'):
+            return self.get(name[len('geometry_'):]).geojson
+        if name.startswith(('geometry_', 'topojson_')):
+            kind, _, rest = name.partition('_')
+            geography, level = rest.split('@')
+            load = load_geometry_level if kind == 'geometry' else load_topology_level
+            return load(geography, int(level), **where)
+        raise KeyError(name)
+
+    def _load_lsoa_domains(self, where):
+        columns = [LSOA_ID] + [c for c, _ in PPFI_LSOA_DOMAIN_LABELS] + [c for c, _ in IMD_LSOA_DOMAIN_LABELS]
+        if 'lsoa' not in self._cache:
+            domains = load_lsoa_columns(columns, **where)
+            if domains is not None:
+                return domains
+        gdf_lsoa, _, matrix = self.get('lsoa')
+        domains = matrix.frame(columns[1:])
+        domains.insert(0, LSOA_ID, gdf_lsoa[LSOA_ID].to_numpy())
+        return domains
+
+
+_current = DataSnapshot()
+_swap_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_reload_status = {'state': 'idle'}
+
+
+def current_snapshot():
+    """The snapshot serving data. Inside a request the first call pins it,
+    so one callback never mixes frames from two versions."""
+    if has_request_context():
+        snap = g.get('ppfi_snapshot')
+        if snap is None:
+            snap = g.ppfi_snapshot = _current
+        return snap
+    return _current
+
+
+def default_snapshot():
+    # the reloadable default release, regardless of what this request pinned
+    return _current
+
+
+def _get(name):
+    return current_snapshot().get(name)
+
+
+def reload_data(artifact_dir=None, *, wait=False):
+    """Load the data again (e.g. after `python -m utils.build_data` wrote a new
+    release) and swap it in. Returns False if a reload is already running."""
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    worker = threading.Thread(
+        target=_reload, args=(artifact_dir or _current.artifact_dir,), name='ppfi-reload', daemon=True
+    )
+    _reload_status.update(state='running', error=None)
+    worker.start()
+    if wait:
+        worker.join()
+    return True
+
+
+def _reload(artifact_dir):
+    global _current
+    try:
+        old = _current
+        new = DataSnapshot(artifact_dir)
+        new.on_load = old.on_load
+        if new.version == old.version and artifact_dir == old.artifact_dir:
+            _reload_status.update(state='unchanged', version=old.version)
+            return
+        # warm what the old snapshot already serves so the swap is not a cold start
+        with phase(f'reload.{new.version}'):
+            for name in old.loaded:
+                new.get(name)
+        with _swap_lock:
+            _current = new
+        set_meta(data_version=new.version)
+        _reload_status.update(state='swapped', version=new.version, previous=old.version)
+        logger.info('data snapshot %s replaced %s', new.version, old.version)
+    except Exception as exc:
+        _reload_status.update(state='failed', error=repr(exc))
+        logger.exception('data reload from %s failed, still serving %s', artifact_dir, _current.version)
+    finally:
+        _reload_lock.release()
+
+
+def reload_status():
+    snap = _current
+    return {'version': snap.version, 'artifact_dir': snap.artifact_dir, 'loaded': snap.loaded, **_reload_status}
+
+
+RELOAD_SIGNAL = signal.SIGUSR2
+
+
+def _on_reload_signal(signum, frame):
+    reload_data()
+
+
+def install_reload_signal():
+    # SIGUSR2 reloads this process in the background. only the serving
+    # entry points install it (gunicorn.conf.py per worker, index.py for the
+    # dev server), never an import, so the build and the gunicorn master keep
+    # their own handlers
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(RELOAD_SIGNAL, _on_reload_signal)
+
+
+def reload_signal_installed():
+    return signal.getsignal(RELOAD_SIGNAL) is _on_reload_signal
+
+
+def snapshot_cache(maxsize=128, key=None):
+    """lru_cache for values derived from the data. Entries live on the
+    snapshot they were computed from, so they go when it is replaced.
+    `key` maps the arguments to a hashable key, for unhashable arguments."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            entries, lock = current_snapshot().derived(wrapper)
+            entry_key = key(*args, **kwargs) if key is not None else (args, tuple(sorted(kwargs.items())))
+            with lock:
+                if entry_key in entries:
+                    entries.move_to_end(entry_key)
+                    return entries[entry_key]
+            value = fn(*args, **kwargs)
+            with lock:
+                entries[entry_key] = value
+                if len(entries) > maxsize:
+                    entries.popitem(last=False)
+            return value
+        return wrapper
+    return decorate
+
+
+def _nbytes(obj):
+    # private memory only: memory-mapped artifact data is shared page cache
+    if isinstance(obj, (pd.DataFrame, np.ndarray)):
+        return resident_nbytes(obj)
+    if isinstance(obj, dict):
+        return sum(_nbytes(v) for v in obj.values())
+    return getattr(obj, 'nbytes', 0)
+
+
+def get_lsoa():
+    """(gdf_lsoa, geojson_lsoa), loaded on first call."""
+    frame, geojson, _ = _get('lsoa')
+    return frame, geojson.data
+
+
+def get_lad():
+    """(gdf_lad, geojson_lad), loaded on first call."""
+    frame, geojson, _ = _get('lad')
+    return frame, geojson.data
+
+
+def get_frame(geography):
+    """Descriptive columns (ids, names, bounds) without parsing any geojson."""
+    return _get(geography)[0]
+
+
+def get_geojson(geography):
+    """The layer's serialised geojson (MappedJSON/InMemoryJSON): .raw bytes,
+    .fingerprint, and .data parsed on demand."""
+    return _get(geography)[1]
+
+
+def get_geometry(geography, level=0):
+    """Map geometry at one level of the simplification pyramid (0 = full
+    detail), in the same form as get_geojson(). Without a pyramid every level
+    is the layer's geojson."""
+    geojson = _get(f'geometry_{geography}@{level}')
+    return geojson if geojson is not None else get_geojson(geography)
+
+
+def get_topology(geography, level=0):
+    """The quantised topojson of a pyramid level (MappedFile), or None
+    without an artifact."""
+    if geography == 'hex':
+        return None
+    return _get(f'topojson_{geography}@{level}')
+
+
+def pyramid_levels(geography):
+    """Number of simplification levels available for this geography (for
+    hexes, the grid resolutions)."""
+    if geography == 'hex':
+        return len(HEX_SIZES)
+    return len(PYRAMID_TOLERANCES) + 1 if _get(f'geometry_{geography}@0') is not None else 1
+
+
+def get_lsoa_matrix():
+    """IndicatorMatrix of LSOA deciles, row-aligned with get_lsoa()[0]."""
+    return _get('lsoa')[2]
+
+
+def get_lad_matrix():
+    """IndicatorMatrix of LAD ranks, row-aligned with get_lad()[0]."""
+    return _get('lad')[2]
+
+
+def get_matrix(geography):
+    return get_lsoa_matrix() if geography == 'lsoa' else get_lad_matrix()
+
+
+def get_mismatch():
+    """Mismatch table with ward names, loaded on first call."""
+    return _get('mismatch')
+
+
+def get_lsoa_domains():
+    """LSOA code plus PPFI/IMD domain deciles, without geometry."""
+    return _get('lsoa_domains')
+
+
+def get_lsoa_edges():
+    """Shared-edge table used to outline filtered LSOAs."""
+    return _get('lsoa_edges')
+
+
+def get_lad_partitions():
+    """LadPartitions over the LSOA layer: rows, bounds and outline per LAD."""
+    return _get('lad_partitions')
+
+
+# filtered outlines are traced per request otherwise; a national decile
+# filter is thousands of lsoas, so keep the last few per snapshot
+OUTLINE_CACHE_SIZE = int(os.environ.get('PPFI_OUTLINE_CACHE', '32'))
+
+
+def get_lad_outline(lad_id):
+    """Boundary of a LAD (GeoJSON MultiLineString), prebuilt in the artifact
+    or traced once from the LSOA edges."""
+    partitions = get_lad_partitions()
+    return partitions.outline(lad_id, None if partitions.has_outlines else get_lsoa_edges())
+
+
+def _outline_key(rows, lad_id=None):
+    # (LAD, filter signature): the digest of the selected rows, whichever
+    # filters picked them
+    rows = np.ascontiguousarray(rows, dtype=np.int64)
+    return lad_id, hashlib.blake2b(rows.tobytes(), digest_size=16).hexdigest()
+
+
+@snapshot_cache(maxsize=OUTLINE_CACHE_SIZE, key=_outline_key)
+def get_lsoa_outline(rows, lad_id=None):
+    """Boundary of the union of LSOA rows (GeoJSON MultiLineString, None
+    when empty); a LAD's whole partition is its LAD boundary."""
+    rows = np.asarray(rows, dtype=np.int64)
+    partitions = get_lad_partitions()
+    if lad_id in partitions and len(rows) == len(partitions.rows(lad_id)):
+        return get_lad_outline(lad_id)
+    return union_outline(get_lsoa_edges(), rows)
+
+
+def get_hex_grid(resolution):
+    """HexGrid at HEX_SIZES[resolution] over the LSOA layer."""
+    return _get(f'hex@{resolution}')
+
+
+def has_wards():
+    """Whether this snapshot has a ward layer (the ward lookup had codes)."""
+    return _get('ward') is not None
+
+
+def get_groups(geography, level=0):
+    """LsoaGroups of an area layer built from LSOAs: the hex grid at
+    resolution `level`, or the wards."""
+    return get_hex_grid(level) if geography == 'hex' else _get('ward_groups')
+
+
+@snapshot_cache(maxsize=8)
+def get_group_frame(geography, level=0):
+    """id, name and lsoa_count of each hex or ward, row-aligned with
+    get_groups(); ward names carry their LAD ("Ward, LAD")."""
+    if geography == 'hex':
+        return get_hex_grid(level).frame
+    wards = get_frame('ward')
+    lad = get_frame('lad')
+    lad_names = pd.Series(lad[LAD_NAME].astype(str).to_numpy(), index=lad[LAD_ID].astype(str)) \
+        if LAD_ID in lad.columns and LAD_NAME in lad.columns else pd.Series(dtype=object)
+    in_lad = wards['lad_cd'].map(lad_names)
+    names = wards['ward_name'].astype(str).where(in_lad.isna(), wards['ward_name'].astype(str) + ', ' + in_lad)
+    return pd.DataFrame({
+        'id': wards['id'].to_numpy(),
+        'name': names.to_numpy(),
+        'lsoa_count': get_groups('ward').counts,
+    })
+
+
+@snapshot_cache(maxsize=64)
+def get_group_values(geography, level, column):
+    """(mean, modal) decile of an LSOA indicator per hex or ward, cached
+    per domain."""
+    return get_groups(geography, level).aggregate(get_lsoa_matrix().column(column))
+
+
+@snapshot_cache(maxsize=8)
+def get_group_mismatch(geography, level=0):
+    """Share of each hex's or ward's LSOAs whose PPFI and IMD combined
+    deciles are MISMATCH_DECILES or more apart."""
+    groups = get_groups(geography, level)
+    matrix = get_lsoa_matrix()
+    if 'pp_dec_combined' not in matrix or 'imd_decile' not in matrix:
+        return np.full(len(groups), np.nan)
+    with np.errstate(invalid='ignore'):
+        diff = np.abs(matrix.column('pp_dec_combined').astype(float) - matrix.column('imd_decile').astype(float))
+    return groups.share(diff >= MISMATCH_DECILES)
+
+
+@snapshot_cache(maxsize=4)
+def get_hover_narratives(geography):
+    """Single-map hover narrative of every LSOA or LAD, row-aligned with
+    get_matrix(geography); worded once per snapshot."""
+    return layer_narratives(get_matrix(geography), geography)
+
+
+def get_hover_narrative(geography, area_id):
+    """Hover narrative of one LSOA or LAD by id ('' for an unknown id)."""
+    k = get_matrix(geography).rows_for_ids([area_id])[0]
+    return get_hover_narratives(geography)[k] if k >= 0 else ''
+
+
+def get_lsoa_index():
+    """BoxIndex over the LSOA bounding boxes, for viewport queries."""
+    return _get('lsoa_index')
+
+
+def preload(names):
+    snap = current_snapshot()
+    for name in names:
+        snap.get(name)
+    log_startup_report()
+
+
+_preload = os.environ.get('PPFI_PRELOAD', '').strip()
+if _preload:
+    preload(['lsoa', 'lad', 'mismatch'] if _preload == 'all' else
+            [n.strip() for n in _preload.split(',') if n.strip() in DataSnapshot.NAMES])
+
+
+def _wide(name):
+    # the old wide layout (descriptive columns + float indicator columns), built on demand
+    frame, _, matrix = _get(name)
+    return frame.join(matrix.frame(list(matrix.columns)))
+
+
+# old module globals, resolved lazily
+_LEGACY = {
+    'gdf_lsoa':      lambda: _wide('lsoa'),
+    'gdf_lsoa_full': lambda: _wide('lsoa'),
+    'geojson_lsoa':  lambda: get_lsoa()[1],
+    'gdf_lad':       lambda: _wide('lad'),
+    'gdf_lad_full':  lambda: _wide('lad'),
+    'geojson_lad':   lambda: get_lad()[1],
+    'df_mismatch':   get_mismatch,
+}
+
+
+def __getattr__(name):
+    if name in _LEGACY:
+        return _LEGACY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,80 +1,564 @@
-# utils/data_loader.py
-
-import json
-import pandas as pd
-import geopandas as gpd
-
-
-def load_all_data():
-    # read files
-    gdf_lsoa = gpd.read_file('data/ppfi_imd_lsoa_england.geojson')
-    gdf_lad  = gpd.read_file('data/ppfi_imd_lad_england.geojson')
-
-    df_mismatch = pd.read_csv('data/imd_ppfi_mismatch.csv')
-
-    # fix crs for it to work with plotly
-    gdf_lsoa = gdf_lsoa.set_crs(27700, allow_override=True).to_crs(4326)
-    gdf_lad  = gdf_lad.set_crs(27700, allow_override=True).to_crs(4326)
-
-    # normalise keys (strip whitespace, force uppercase)
-    gdf_lsoa = gdf_lsoa.copy()
-    df_mismatch = df_mismatch.copy()
-
-    gdf_lsoa['LSOA21CD'] = gdf_lsoa['LSOA21CD'].astype(str).str.strip().str.upper()
-    df_mismatch['lsoa21cd'] = df_mismatch['lsoa21cd'].astype(str).str.strip().str.upper()
-    df_mismatch['lad24cd'] = df_mismatch['lad24cd'].astype(str).str.strip().str.upper()
-
-    lsoa_to_lad = (
-        df_mismatch[['lsoa21cd', 'lad24cd']]
-        .dropna(subset=['lsoa21cd', 'lad24cd'])
-        .drop_duplicates(subset=['lsoa21cd'])
-        .rename(columns={'lsoa21cd': 'LSOA21CD', 'lad24cd': 'lad_cd'})
-    )
-
-    gdf_lsoa = gdf_lsoa.merge(lsoa_to_lad, on='LSOA21CD', how='left')
-
-    # numeric coercion
-    for col in gdf_lsoa.columns:
-        if col.startswith(('pp_', 'imd_')):
-            gdf_lsoa[col] = pd.to_numeric(gdf_lsoa[col], errors='coerce')
-
-    for col in gdf_lad.columns:
-        if col.startswith(('combined', 'domain_', 'imd_', 'income_', 'employment_',
-                           'education_', 'health_', 'crime_', 'barriers_', 'living_')):
-            gdf_lad[col] = pd.to_numeric(gdf_lad[col], errors='coerce')
-
-    # add id columns for plotly (must match geojson properties.id)
-    gdf_lsoa['id'] = gdf_lsoa['LSOA21CD'].astype(str)
-    gdf_lad['id'] = gdf_lad['LAD24CD'].astype(str).str.strip().str.upper()
-
-    # convert to json
-    geojson_lsoa = json.loads(gdf_lsoa.to_json(drop_id=True))
-    geojson_lad  = json.loads(gdf_lad.to_json(drop_id=True))
-
-    # sanity checking
-    assert set(gdf_lsoa['id']) == {f['properties']['id'] for f in geojson_lsoa['features']}
-    assert set(gdf_lad['id'])  == {f['properties']['id'] for f in geojson_lad['features']}
-
-    # mismatch prep
-    df_mismatch['abs_diff'] = df_mismatch['ppfi_imd_diff'].abs()
-    df_mismatch.sort_values('abs_diff', ascending=False, inplace=True)
-
-    # join ward names
-    try:
-        ward_lookup = pd.read_csv('data/lsoa21_ward_lookup.csv')
-        ward_col = next((c for c in ward_lookup.columns if 'LSOA' in c.upper()), None)
-        name_col = next((c for c in ward_lookup.columns if 'WD' in c.upper() and 'NM' in c.upper()), None)
-        if ward_col and name_col:
-            ward_lookup = (
-                ward_lookup[[ward_col, name_col]]
-                .rename(columns={ward_col: '_lsoa_key', name_col: 'ward_name'})
-            )
-            ward_lookup['_lsoa_key'] = ward_lookup['_lsoa_key'].astype(str).str.strip().str.upper()
-            ward_lookup = ward_lookup.drop_duplicates('_lsoa_key')
-            df_mismatch = df_mismatch.merge(
-                ward_lookup, left_on='lsoa21cd', right_on='_lsoa_key', how='left'
-            ).drop(columns=['_lsoa_key'])
-    except FileNotFoundError:
-        df_mismatch['ward_name'] = ''
-
-    return gdf_lsoa, geojson_lsoa, gdf_lad, geojson_lad, df_mismatch
+# utils/data_loader.py
+
+import hashlib
+import json
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from utils.geometry import PYRAMID_TOLERANCES
+from utils.indicators import (
+    IndicatorMatrix, LSOA_INDICATORS, LAD_INDICATORS, split_indicators,
+)
+from utils.profiling import phase, set_meta
+from utils.shared_data import InMemoryJSON, MappedFile, MappedJSON, load_array, load_table
+
+
+# source files
+LSOA_GEOJSON = 'data/ppfi_imd_lsoa_england.geojson'
+LAD_GEOJSON  = 'data/ppfi_imd_lad_england.geojson'
+MISMATCH_CSV = 'data/imd_ppfi_mismatch.csv'
+WARD_LOOKUP  = 'data/lsoa21_ward_lookup.csv'
+SOURCE_FILES = (LSOA_GEOJSON, LAD_GEOJSON, MISMATCH_CSV, WARD_LOOKUP)
+
+# polygon layers built from the sources; wards only when the ward lookup
+# has ward codes, so their artifact files are optional
+MAP_LAYERS = ('lsoa', 'lad', 'ward')
+
+# prebuilt artifact (see utils/build_data.py)
+ARTIFACT_DIR     = os.environ.get('PPFI_ARTIFACT_DIR', 'data/build')
+ARTIFACT_FORMAT  = 8
+MANIFEST_NAME    = 'manifest.json'
+EDGE_ARRAYS      = ('vertices', 'edges', 'lsoa_offsets', 'lsoa_edges')
+ARTIFACT_FILES   = {
+    'lsoa':            'lsoa.parquet',
+    'lad':             'lad.parquet',
+    'ward':            'ward.parquet',
+    'mismatch':        'mismatch.arrow',
+    'geojson_lsoa':    'lsoa.geojson',
+    'geojson_lad':     'lad.geojson',
+    'geojson_ward':    'ward.geojson',
+    # per-feature [start, end) byte spans into the geojson, for subsets
+    'geojson_lsoa.spans': 'lsoa.geojson.spans.npy',
+    'geojson_lad.spans':  'lad.geojson.spans.npy',
+    'geojson_ward.spans': 'ward.geojson.spans.npy',
+    # each LAD's boundary traced from the lsoa edges, in LadPartitions order
+    'lad_outlines':       'lad_outlines.geojson',
+    'lad_outlines.spans': 'lad_outlines.geojson.spans.npy',
+    # raw arrays, memory-mapped read-only so workers share them
+    'lsoa_indicators': 'lsoa_indicators.npy',
+    'lad_indicators':  'lad_indicators.npy',
+    **{f'lsoa_edges.{k}': f'lsoa_edges.{k}.npy' for k in EDGE_ARRAYS},
+    # map geometry per simplification level, properties cut down to the id
+    **{f'geometry_{geo}@{level}{key}': f'{geo}.z{level}.geojson{ext}'
+       for geo in MAP_LAYERS
+       for level in range(len(PYRAMID_TOLERANCES) + 1)
+       for key, ext in (('', ''), ('.spans', '.spans.npy'))},
+    # the same levels as quantised topojson, decoded by assets/topojson.js
+    **{f'topojson_{geo}@{level}': f'{geo}.z{level}.topojson'
+       for geo in MAP_LAYERS
+       for level in range(len(PYRAMID_TOLERANCES) + 1)},
+}
+
+
+class ArtifactError(RuntimeError):
+    pass
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _geopandas():
+    # geopandas is a build-time dependency; the serving image only has the artifact
+    try:
+        import geopandas
+    except ImportError as exc:
+        raise ArtifactError(
+            f'no data artifact in {ARTIFACT_DIR} and geopandas is not installed to build one '
+            'from the source files; run `python -m utils.build_data`'
+        ) from exc
+    return geopandas
+
+
+# source phases -- each read is independent; the finish steps only need their own inputs
+def _read_lsoa(path=LSOA_GEOJSON):
+    gpd = _geopandas()
+    with phase('lsoa.read'):
+        gdf_lsoa = gpd.read_file(path)
+
+    # fix crs for it to work with plotly
+    with phase('lsoa.to_crs'):
+        gdf_lsoa = gdf_lsoa.set_crs(27700, allow_override=True).to_crs(4326)
+
+    # normalise keys (strip whitespace, force uppercase)
+    with phase('lsoa.normalise_keys'):
+        gdf_lsoa = gdf_lsoa.copy()
+        gdf_lsoa['LSOA21CD'] = gdf_lsoa['LSOA21CD'].astype(str).str.strip().str.upper()
+
+    # numeric coercion
+    with phase('lsoa.numeric'):
+        for col in gdf_lsoa.columns:
+            if col.startswith(('pp_', 'imd_')):
+                gdf_lsoa[col] = pd.to_numeric(gdf_lsoa[col], errors='coerce')
+
+    return gdf_lsoa
+
+
+def _read_lad(path=LAD_GEOJSON):
+    gpd = _geopandas()
+    with phase('lad.read'):
+        gdf_lad = gpd.read_file(path)
+    with phase('lad.to_crs'):
+        gdf_lad = gdf_lad.set_crs(27700, allow_override=True).to_crs(4326)
+
+    with phase('lad.numeric'):
+        for col in gdf_lad.columns:
+            if col.startswith(('combined', 'domain_', 'imd_', 'income_', 'employment_',
+                               'education_', 'health_', 'crime_', 'barriers_', 'living_')):
+                gdf_lad[col] = pd.to_numeric(gdf_lad[col], errors='coerce')
+
+    # add id column for plotly (must match geojson properties.id)
+    gdf_lad['id'] = gdf_lad['LAD24CD'].astype(str).str.strip().str.upper()
+    return gdf_lad
+
+
+def _read_mismatch(path=MISMATCH_CSV):
+    with phase('mismatch.read'):
+        df_mismatch = pd.read_csv(path)
+    df_mismatch['lsoa21cd'] = df_mismatch['lsoa21cd'].astype(str).str.strip().str.upper()
+    df_mismatch['lad24cd'] = df_mismatch['lad24cd'].astype(str).str.strip().str.upper()
+    return df_mismatch
+
+
+def _read_ward_lookup(path=WARD_LOOKUP):
+    try:
+        with phase('ward.read'):
+            ward_lookup = pd.read_csv(path)
+    except FileNotFoundError:
+        return None
+    ward_col = next((c for c in ward_lookup.columns if 'LSOA' in c.upper()), None)
+    name_col = next((c for c in ward_lookup.columns if 'WD' in c.upper() and 'NM' in c.upper()), None)
+    code_col = next((c for c in ward_lookup.columns if 'WD' in c.upper() and 'CD' in c.upper()), None)
+    if not (ward_col and name_col):
+        return None
+    columns = {ward_col: '_lsoa_key', name_col: 'ward_name'}
+    if code_col:
+        # the ward code makes wards a map layer (see _finish_ward)
+        columns[code_col] = 'ward_cd'
+    ward_lookup = ward_lookup[list(columns)].rename(columns=columns)
+    ward_lookup['_lsoa_key'] = ward_lookup['_lsoa_key'].astype(str).str.strip().str.upper()
+    if code_col:
+        ward_lookup['ward_cd'] = ward_lookup['ward_cd'].astype(str).str.strip().str.upper()
+    return ward_lookup.drop_duplicates('_lsoa_key')
+
+
+def _finish_lsoa(gdf_lsoa, df_mismatch, ward_lookup=None):
+    lsoa_to_lad = (
+        df_mismatch[['lsoa21cd', 'lad24cd']]
+        .dropna(subset=['lsoa21cd', 'lad24cd'])
+        .drop_duplicates(subset=['lsoa21cd'])
+        .rename(columns={'lsoa21cd': 'LSOA21CD', 'lad24cd': 'lad_cd'})
+    )
+    with phase('lsoa.merge'):
+        gdf_lsoa = gdf_lsoa.merge(lsoa_to_lad, on='LSOA21CD', how='left')
+        gdf_lsoa['id'] = gdf_lsoa['LSOA21CD'].astype(str)
+
+    # rows grouped by LAD, so each LAD's LSOAs are one contiguous range (see LadPartitions)
+    with phase('lsoa.sort'):
+        gdf_lsoa = gdf_lsoa.sort_values(['lad_cd', 'LSOA21CD'], na_position='last', kind='stable')
+        gdf_lsoa = gdf_lsoa.reset_index(drop=True)
+
+    # convert to json
+    with phase('lsoa.to_json'):
+        geojson_lsoa = json.loads(gdf_lsoa.to_json(drop_id=True))
+
+    # sanity checking
+    with phase('lsoa.asserts'):
+        assert set(gdf_lsoa['id']) == {f['properties']['id'] for f in geojson_lsoa['features']}
+
+    # per-lsoa bbox so serving code can bound any subset without shapely,
+    # and a point inside each lsoa for the national dot view
+    from utils.geometry_build import add_bounds_columns, add_point_columns
+    with phase('lsoa.bounds'):
+        gdf_lsoa = add_point_columns(add_bounds_columns(gdf_lsoa))
+
+    # ward of each lsoa, kept out of the geojson like the bounds
+    if ward_lookup is not None and 'ward_cd' in ward_lookup.columns:
+        with phase('lsoa.ward_join'):
+            wards = ward_lookup.set_index('_lsoa_key')['ward_cd']
+            gdf_lsoa['ward_cd'] = gdf_lsoa['LSOA21CD'].map(wards)
+    return gdf_lsoa, geojson_lsoa
+
+
+def _finish_ward(gdf_lsoa, ward_lookup):
+    """Ward layer dissolved from the LSOAs: (GeoDataFrame, geojson), or
+    (None, None) when the lookup has no ward codes.
+
+    Wards are sorted by LAD like the LSOAs, so a LAD's wards are one
+    contiguous run of rows and of geojson bytes.
+    """
+    if ward_lookup is None or 'ward_cd' not in gdf_lsoa.columns:
+        return None, None
+    with phase('ward.dissolve'):
+        members = gdf_lsoa[gdf_lsoa['ward_cd'].notna()]
+        gdf_ward = members[['ward_cd', 'geometry']].dissolve(by='ward_cd').reset_index()
+        # wards nest in LADs; take the LAD most of the ward's LSOAs are in
+        lad = members.groupby('ward_cd')['lad_cd'].agg(lambda s: s.mode().iat[0] if s.notna().any() else None)
+        names = ward_lookup.drop_duplicates('ward_cd').set_index('ward_cd')['ward_name']
+        gdf_ward['lad_cd'] = gdf_ward['ward_cd'].map(lad)
+        gdf_ward['ward_name'] = gdf_ward['ward_cd'].map(names).fillna(gdf_ward['ward_cd'])
+        gdf_ward['id'] = gdf_ward['ward_cd']
+        gdf_ward = gdf_ward.sort_values(['lad_cd', 'ward_cd'], na_position='last', kind='stable')
+        gdf_ward = gdf_ward.reset_index(drop=True)
+
+    with phase('ward.to_json'):
+        geojson_ward = json.loads(gdf_ward.to_json(drop_id=True))
+
+    from utils.geometry_build import add_bounds_columns, add_center_zoom_columns
+    with phase('ward.bounds'):
+        gdf_ward = add_center_zoom_columns(add_bounds_columns(gdf_ward))
+    return gdf_ward, geojson_ward
+
+
+def prepare_wards(gdf_lsoa, source_dir=None):
+    """Ward layer for a prepared LSOA frame (see prepare_source_data)."""
+    return _finish_ward(gdf_lsoa, _read_ward_lookup(source_paths(source_dir)[3]))
+
+
+def _finish_lad(gdf_lad):
+    with phase('lad.to_json'):
+        geojson_lad = json.loads(gdf_lad.to_json(drop_id=True))
+    with phase('lad.asserts'):
+        assert set(gdf_lad['id']) == {f['properties']['id'] for f in geojson_lad['features']}
+
+    from utils.geometry_build import add_bounds_columns, add_center_zoom_columns
+    with phase('lad.bounds'):
+        gdf_lad = add_center_zoom_columns(add_bounds_columns(gdf_lad))
+    return gdf_lad, geojson_lad
+
+
+def _finish_mismatch(df_mismatch, ward_lookup):
+    with phase('mismatch.prep'):
+        df_mismatch = df_mismatch.copy()
+        df_mismatch['abs_diff'] = df_mismatch['ppfi_imd_diff'].abs()
+        df_mismatch.sort_values('abs_diff', ascending=False, inplace=True)
+
+    # join ward names
+    if ward_lookup is None:
+        df_mismatch['ward_name'] = ''
+        return df_mismatch
+    with phase('mismatch.ward_join'):
+        return df_mismatch.merge(
+            ward_lookup[['_lsoa_key', 'ward_name']], left_on='lsoa21cd', right_on='_lsoa_key', how='left'
+        ).drop(columns=['_lsoa_key'])
+
+
+def _loader_workers():
+    try:
+        return max(1, int(os.environ.get('PPFI_LOADER_WORKERS', '4')))
+    except ValueError:
+        return 4
+
+
+def _after(pool, fn, *deps):
+    # schedule fn on the results of earlier futures. deps are always submitted
+    # first, so by the time this task gets a thread they are running or done
+    return pool.submit(lambda: fn(*(d.result() for d in deps)))
+
+
+def _read_sources(*reads):
+    # the independent reads a runtime load needs (e.g. lsoa, mismatch and the
+    # ward lookup for load_lsoa), run on a loader pool like prepare_source_data
+    with ThreadPoolExecutor(max_workers=min(len(reads), _loader_workers()), thread_name_prefix='data-load') as pool:
+        futures = [pool.submit(read) for read in reads]
+        return [f.result() for f in futures]
+
+
+def source_paths(source_dir=None):
+    # another release keeps the same file names in its own directory
+    if source_dir is None:
+        return SOURCE_FILES
+    return tuple(os.path.join(source_dir, os.path.basename(p)) for p in SOURCE_FILES)
+
+
+def prepare_source_data(workers=None, source_dir=None):
+    # the four reads run concurrently (pyogrio, pyproj and read_csv release the
+    # gil); each finish step starts as soon as its own inputs are ready, so cold
+    # start is bounded by the slowest chain rather than the sum of all of them
+    workers = workers or _loader_workers()
+    lsoa_path, lad_path, mismatch_path, ward_path = source_paths(source_dir)
+    set_meta(source='geojson', data_version=None)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='data-load') as pool:
+        f_lsoa     = pool.submit(_read_lsoa, lsoa_path)
+        f_lad      = pool.submit(_read_lad, lad_path)
+        f_mismatch = pool.submit(_read_mismatch, mismatch_path)
+        f_ward     = pool.submit(_read_ward_lookup, ward_path)
+
+        f_lad_done      = _after(pool, _finish_lad, f_lad)
+        f_mismatch_done = _after(pool, _finish_mismatch, f_mismatch, f_ward)
+        f_lsoa_done     = _after(pool, _finish_lsoa, f_lsoa, f_mismatch, f_ward)
+
+        gdf_lsoa, geojson_lsoa = f_lsoa_done.result()
+        gdf_lad, geojson_lad   = f_lad_done.result()
+        df_mismatch            = f_mismatch_done.result()
+
+    return gdf_lsoa, geojson_lsoa, gdf_lad, geojson_lad, df_mismatch
+
+
+def read_manifest(artifact_dir=ARTIFACT_DIR):
+    path = os.path.join(artifact_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def verify_artifact(artifact_dir, manifest, *, checksums=False):
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ArtifactError(
+            f"artifact format {manifest.get('format')} != expected {ARTIFACT_FORMAT}, rebuild with "
+            "`python -m utils.build_data`"
+        )
+    for name, entry in manifest['files'].items():
+        path = os.path.join(artifact_dir, name)
+        if not os.path.exists(path):
+            raise ArtifactError(f'artifact file missing: {path}')
+        if os.path.getsize(path) != entry['bytes']:
+            raise ArtifactError(f'artifact file size mismatch: {path}')
+        if checksums and file_sha256(path) != entry['sha256']:
+            raise ArtifactError(f'artifact checksum mismatch: {path}')
+
+
+def open_artifact(artifact_dir=ARTIFACT_DIR, *, checksums=None):
+    manifest = read_manifest(artifact_dir)
+    if manifest is None:
+        raise ArtifactError(f'no artifact manifest in {artifact_dir}')
+
+    # sizes are always checked, full sha256 only on request (it reads every byte)
+    if checksums is None:
+        checksums = os.environ.get('PPFI_VERIFY_ARTIFACT', '') == '1'
+    with phase('artifact.verify'):
+        verify_artifact(artifact_dir, manifest, checksums=checksums)
+    set_meta(source='artifact', data_version=manifest.get('version'))
+    return manifest
+
+
+def _artifact_path(artifact_dir, key):
+    return os.path.join(artifact_dir, ARTIFACT_FILES[key])
+
+
+def _read_artifact_table(artifact_dir, key, columns=None):
+    path = _artifact_path(artifact_dir, key)
+    with phase(f'{key}.read'):
+        if columns is None:
+            # attribute columns only, geometry stays on disk (it is served from the geojson)
+            schema = pq.read_schema(path)
+            geo = json.loads((schema.metadata or {}).get(b'geo', b'{}'))
+            skip = set(geo.get('columns', {}))
+            columns = [c for c in schema.names if c not in skip and not c.startswith('__index_level_')]
+        return pd.read_parquet(path, columns=columns).reset_index(drop=True)
+
+
+def _map_artifact_array(artifact_dir, key):
+    with phase(f'{key}.map'):
+        return load_array(_artifact_path(artifact_dir, key))
+
+
+def _map_artifact_json(artifact_dir, key):
+    with phase(f'{key}.map'):
+        spans = load_array(_artifact_path(artifact_dir, f'{key}.spans')) if f'{key}.spans' in ARTIFACT_FILES else None
+        return MappedJSON(_artifact_path(artifact_dir, key), spans)
+
+
+def _map_artifact_table(artifact_dir, key):
+    with phase(f'{key}.map'):
+        return load_table(_artifact_path(artifact_dir, key))
+
+
+class EdgeTable(dict):
+    # plain dicts cannot be weakly referenced
+    pass
+
+
+# releases built on the same boundaries (same manifest 'geometry'
+# fingerprint) share one loaded frame, geojson and edge table. the pool only
+# holds weak references, so a layer goes once no loaded release uses it
+_geometry_pool = weakref.WeakValueDictionary()
+_geometry_lock = threading.Lock()
+
+
+def _shared_geometry(manifest, geography, kind, load):
+    fingerprint = (manifest.get('geometry') or {}).get(geography)
+    if fingerprint is None:
+        return load()
+    with _geometry_lock:
+        shared = _geometry_pool.get((kind, fingerprint))
+        if shared is None:
+            shared = _geometry_pool[(kind, fingerprint)] = load()
+    return shared
+
+
+def _load_artifact_layer(artifact_dir, manifest, geography):
+    # the fingerprint covers ids in row order, so the matrix of any release
+    # sharing the geometry is row-aligned with the shared frame
+    meta = manifest['indicators'][geography]
+    frame = _shared_geometry(manifest, geography, f'{geography}.frame', lambda: _read_artifact_table(
+        artifact_dir, geography, columns=meta['frame_columns'],
+    ))
+    geojson = _shared_geometry(manifest, geography, f'{geography}.geojson', lambda: _map_artifact_json(
+        artifact_dir, f'geojson_{geography}',
+    ))
+    matrix = IndicatorMatrix(
+        _map_artifact_array(artifact_dir, f'{geography}_indicators'),
+        meta['columns'], frame['id'].to_numpy(), meta['float_columns'],
+    )
+    return frame, geojson, matrix
+
+
+def _has_artifact(artifact_dir=ARTIFACT_DIR):
+    return os.path.exists(os.path.join(artifact_dir, MANIFEST_NAME))
+
+
+# per-geography loaders, used by the lazy accessors in utils/data.py. each
+# returns (frame, geojson, IndicatorMatrix): the frame holds ids, names and
+# bounds, the geojson is a MappedJSON/InMemoryJSON and the matrix the deciles.
+# `version` pins the artifact a snapshot was created from, so a lazy load can
+# never mix in files from an artifact rebuilt underneath it.
+def _split_layer(frame, geojson, columns):
+    with phase('indicators.split'):
+        frame, matrix = split_indicators(frame, columns)
+    return frame, InMemoryJSON(geojson), matrix
+
+
+def _open_pinned(artifact_dir, version):
+    manifest = open_artifact(artifact_dir)
+    if version is not None and manifest.get('version') != version:
+        raise ArtifactError(
+            f"artifact in {artifact_dir} is now {manifest.get('version')}, snapshot expects {version}; "
+            'reload the data'
+        )
+    return manifest
+
+
+def artifact_version(artifact_dir=ARTIFACT_DIR):
+    manifest = read_manifest(artifact_dir)
+    return manifest.get('version') if manifest else None
+
+
+def load_lsoa(artifact_dir=ARTIFACT_DIR, version=None):
+    if _has_artifact(artifact_dir):
+        manifest = _open_pinned(artifact_dir, version)
+        return _load_artifact_layer(artifact_dir, manifest, 'lsoa')
+    set_meta(source='geojson', data_version=None)
+    gdf_lsoa, df_mismatch, ward_lookup = _read_sources(_read_lsoa, _read_mismatch, _read_ward_lookup)
+    return _split_layer(*_finish_lsoa(gdf_lsoa, df_mismatch, ward_lookup), LSOA_INDICATORS)
+
+
+def load_lad(artifact_dir=ARTIFACT_DIR, version=None):
+    if _has_artifact(artifact_dir):
+        manifest = _open_pinned(artifact_dir, version)
+        return _load_artifact_layer(artifact_dir, manifest, 'lad')
+    set_meta(source='geojson', data_version=None)
+    return _split_layer(*_finish_lad(_read_lad()), LAD_INDICATORS)
+
+
+def load_ward(gdf_lsoa=None, artifact_dir=ARTIFACT_DIR, version=None):
+    # (frame, geojson) of the ward layer, None when there are no wards.
+    # without an artifact the wards are dissolved from the lsoa layer's
+    # frame (load_lsoa), read from the sources only when it isn't given
+    if _has_artifact(artifact_dir):
+        manifest = _open_pinned(artifact_dir, version)
+        if 'ward' not in manifest['rows']:
+            return None
+        frame = _shared_geometry(manifest, 'ward', 'ward.frame', lambda: _read_artifact_table(artifact_dir, 'ward'))
+        geojson = _shared_geometry(manifest, 'ward', 'ward.geojson', lambda: _map_artifact_json(
+            artifact_dir, 'geojson_ward',
+        ))
+        return frame, geojson
+    set_meta(source='geojson', data_version=None)
+    if gdf_lsoa is None:
+        lsoa, df_mismatch, ward_lookup = _read_sources(_read_lsoa, _read_mismatch, _read_ward_lookup)
+        gdf_lsoa = _finish_lsoa(lsoa, df_mismatch, ward_lookup)[0]
+    else:
+        ward_lookup = _read_ward_lookup()
+        gdf_lsoa = _geopandas().GeoDataFrame(gdf_lsoa, geometry='geometry', crs=4326)
+    gdf_ward, geojson_ward = _finish_ward(gdf_lsoa, ward_lookup)
+    if gdf_ward is None:
+        return None
+    return pd.DataFrame(gdf_ward.drop(columns='geometry')), InMemoryJSON(geojson_ward)
+
+
+def load_mismatch(artifact_dir=ARTIFACT_DIR, version=None):
+    if _has_artifact(artifact_dir):
+        _open_pinned(artifact_dir, version)
+        return _map_artifact_table(artifact_dir, 'mismatch')
+    set_meta(source='geojson', data_version=None)
+    return _finish_mismatch(*_read_sources(_read_mismatch, _read_ward_lookup))
+
+
+def load_lsoa_columns(columns, artifact_dir=ARTIFACT_DIR, version=None):
+    # attribute columns only; with an artifact this never touches geometry
+    if _has_artifact(artifact_dir):
+        _open_pinned(artifact_dir, version)
+        available = set(pq.read_schema(_artifact_path(artifact_dir, 'lsoa')).names)
+        return _read_artifact_table(
+            artifact_dir, 'lsoa', columns=[c for c in columns if c in available]
+        )
+    # no artifact: the caller has to derive them from the full lsoa load
+    return None
+
+
+def load_geometry_level(geography, level, artifact_dir=ARTIFACT_DIR, version=None):
+    # one level of the simplification pyramid; None without an artifact (the
+    # pyramid needs shapely to build), callers then use the layer's geojson
+    if not _has_artifact(artifact_dir):
+        return None
+    manifest = _open_pinned(artifact_dir, version)
+    if geography not in manifest['rows']:
+        return None
+    key = f'geometry_{geography}@{level}'
+    return _shared_geometry(manifest, geography, key, lambda: _map_artifact_json(artifact_dir, key))
+
+
+def load_topology_level(geography, level, artifact_dir=ARTIFACT_DIR, version=None):
+    # the topojson of a pyramid level, served as is; None without an artifact
+    if not _has_artifact(artifact_dir):
+        return None
+    manifest = _open_pinned(artifact_dir, version)
+    if geography not in manifest['rows']:
+        return None
+    key = f'topojson_{geography}@{level}'
+
+    def load():
+        with phase(f'{key}.map'):
+            return MappedFile(_artifact_path(artifact_dir, key))
+    return _shared_geometry(manifest, geography, key, load)
+
+
+def load_lad_outlines(artifact_dir=ARTIFACT_DIR, version=None):
+    # prebuilt LAD boundaries (see LadPartitions); None without an artifact
+    if not _has_artifact(artifact_dir):
+        return None
+    manifest = _open_pinned(artifact_dir, version)
+    return _shared_geometry(manifest, 'lsoa', 'lad_outlines', lambda: _map_artifact_json(artifact_dir, 'lad_outlines'))
+
+
+def load_lsoa_edges(gdf_lsoa=None, artifact_dir=ARTIFACT_DIR, version=None):
+    # shared-edge table behind the filtered-lsoa outline (utils.geometry.union_outline)
+    if _has_artifact(artifact_dir):
+        manifest = _open_pinned(artifact_dir, version)
+        return _shared_geometry(manifest, 'lsoa', 'lsoa_edges', lambda: EdgeTable(
+            {k: _map_artifact_array(artifact_dir, f'lsoa_edges.{k}') for k in EDGE_ARRAYS}
+        ))
+    from utils.geometry_build import build_edge_topology
+    with phase('lsoa_edges.build'):
+        return build_edge_topology(gdf_lsoa.geometry.values)
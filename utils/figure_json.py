@@ -0,0 +1,81 @@
+# utils/figure_json.py
+#
+# map figures as plain dicts the response serialiser can dump in one pass:
+# numeric arrays (choropleth values, dot positions and colours) become
+# base64 typed arrays, which plotly.js decodes natively ({dtype, bdata,
+# shape}), and object arrays (hover customdata, ids) become lists. a response
+# holding only these types goes straight through orjson, without plotly's
+# per-value cleaning pass. tests/test_figure_json.py checks the responses
+# decode to the same figures; benchmarks/figure_json.py times the encoders.
+
+import base64
+import os
+
+import numpy as np
+
+# numpy dtype -> plotly.js typed array dtype; int64 has no JS counterpart
+TYPED_DTYPES = {
+    'int8': 'i1', 'uint8': 'u1', 'int16': 'i2', 'uint16': 'u2',
+    'int32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8',
+}
+
+
+def typed_arrays_enabled():
+    return os.environ.get('PPFI_TYPED_ARRAYS', '1').strip().lower() not in ('0', 'false', 'no')
+
+
+def _narrow(values):
+    # 64-bit ints to the smallest JS int type that holds them, else float64
+    if values.dtype.kind == 'b':
+        return values.astype(np.uint8)
+    if values.dtype.name in TYPED_DTYPES:
+        return values
+    if values.dtype.kind in 'iu' and values.size:
+        lo, hi = values.min(), values.max()
+        for dtype in (np.int8, np.int16, np.int32):
+            if np.iinfo(dtype).min <= lo and hi <= np.iinfo(dtype).max:
+                return values.astype(dtype)
+    return values.astype(np.float64)
+
+
+def typed_array(values):
+    """plotly.js typed array spec of a numeric array."""
+    values = _narrow(np.asarray(values))
+    raw = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<')).tobytes()
+    spec = {'dtype': TYPED_DTYPES[values.dtype.name], 'bdata': base64.b64encode(raw).decode('ascii')}
+    if values.ndim > 1:
+        spec['shape'] = ','.join(str(n) for n in values.shape)
+    return spec
+
+
+def _encode(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in 'biuf' and value.size:
+            return typed_array(value)
+        return value.tolist()
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    # traces and layers are lists of dicts; other lists (coordinates) are
+    # already plain
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _figure_dict(fig):
+    # to_plotly_json() deep-copies every array first; _encode only reads and
+    # builds new containers, so it can walk the figure's own dicts
+    try:
+        data, layout = fig._data, fig._layout
+    except AttributeError:
+        return _encode(fig.to_plotly_json())
+    return {'data': _encode(list(data)), 'layout': _encode(layout)}
+
+
+def encode_figure(fig):
+    """The figure as a dict with typed arrays; with PPFI_TYPED_ARRAYS=0 the
+    figure itself."""
+    if not typed_arrays_enabled() or not hasattr(fig, 'to_plotly_json'):
+        return fig
+    return _figure_dict(fig)
+
@@ -0,0 +1,42 @@
+# utils/figure_skeletons.py
+#
+# map figures cloned from a base figure instead of going through plotly
+# express per render. the base (trace type, colour scale, colour axis, map
+# layout) is built and validated by px once per key and kept as plotly json;
+# a render clones it without re-validating (the template alone costs ~15 ms
+# to validate) and sets only what differs per call: the locations or points,
+# the values, customdata, hover template, title and colour range.
+# PPFI_FIGURE_SKELETONS=0 builds every figure through px as before.
+# tests/test_figure_skeletons.py checks both give the same figures;
+# benchmarks/figure_skeletons.py times them.
+
+import os
+import threading
+
+import plotly.graph_objects as go
+
+_skeletons = {}
+_skeletons_lock = threading.Lock()
+
+
+def skeletons_enabled():
+    return os.environ.get('PPFI_FIGURE_SKELETONS', '1').strip().lower() not in ('0', 'false', 'no')
+
+
+def from_skeleton(key, build):
+    """A new figure cloned from the one build() returns, which is built once
+    per key. Only the cloning skips validation; later updates are validated
+    as on any figure."""
+    base = _skeletons.get(key)
+    if base is None:
+        base = build().to_plotly_json()
+        with _skeletons_lock:
+            base = _skeletons.setdefault(key, base)
+    # compound values are rebuilt per figure; plain values (colour scales)
+    # are shared with the skeleton, which is never modified
+    fig = go.Figure(base, _validate=False)
+    fig._validate = fig.layout._validate = True
+    for trace in fig.data:
+        trace._validate = True
+    return fig
+
@@ -1,441 +1,505 @@
-# utils/figures.py
-import geopandas as gpd
-from shapely.geometry import mapping
-
-import plotly.express as px
-
-from utils.constants import (
-    PPFI_DOMAINS_LSOA, IMD_DOMAINS_LSOA,
-    PPFI_DOMAINS_LAD,  IMD_DOMAINS_LAD,
-    PPFI_LSOA_PALETTE, IMD_LSOA_PALETTE,
-    PPFI_LAD_PALETTE,  IMD_LAD_PALETTE,
-    LSOA_NAME, LAD_NAME,
-    PPFI_LSOA_DOMAIN_LABELS,
-    IMD_LSOA_DOMAIN_LABELS,
-)
-
-from utils.data import gdf_lsoa_full, gdf_lad_full
-
-
-# helpers
-def get_domains_for_single(geo: str, dataset: str):
-    if geo == "lsoa" and dataset == "ppfi":
-        return PPFI_DOMAINS_LSOA
-    if geo == "lsoa" and dataset == "imd":
-        return IMD_DOMAINS_LSOA
-    if geo == "lad" and dataset == "ppfi":
-        return PPFI_DOMAINS_LAD
-    return IMD_DOMAINS_LAD
-
-
-def get_domains_for_compare(geo: str):
-    if geo == "lsoa":
-        keys = set(PPFI_DOMAINS_LSOA.keys()) | set(IMD_DOMAINS_LSOA.keys())
-    else:
-        keys = set(PPFI_DOMAINS_LAD.keys()) | set(IMD_DOMAINS_LAD.keys())
-    return {k: k for k in sorted(keys)}
-
-
-def _pick_palette(geo: str, dataset: str):
-    if geo == "lsoa":
-        return PPFI_LSOA_PALETTE if dataset == "ppfi" else IMD_LSOA_PALETTE
-    return PPFI_LAD_PALETTE if dataset == "ppfi" else IMD_LAD_PALETTE
-
-
-def _pretty_domain(domain_key: str):
-    return domain_key.replace("_", " ").strip().title()
-
-
-def _first_existing_col(gdf, candidates):
-    for c in candidates:
-        if c in getattr(gdf, "columns", []):
-            return c
-    return None
-
-
-def _safe_series(gdf, col_name, default=""):
-    if col_name and col_name in gdf.columns:
-        return gdf[col_name]
-    return default
-
-
-def _safe(gdf, col):
-    return gdf[col] if col and col in gdf.columns else None
-
-
-def _join_labels(labels):
-    if len(labels) == 1: return f"'{labels[0]}'"
-    if len(labels) == 2: return f"'{labels[0]}' and '{labels[1]}'"
-    return ', '.join(f"'{l}'" for l in labels[:-1]) + f" and '{labels[-1]}'"
-
-
-def _hover_narrative(row, geography: str, n_lad: int = 0) -> str:
-    """Plain-text divergence/alignment narrative for single-map hover tooltips.
-    Returns <br>-joined sentences for Plotly rendering.
-    LSOA: decile scale (1 = most deprived / highest priority, 10 = least).
-    LAD:  rank scale  (1 = most deprived / highest priority, higher = less)."""
-    try:
-        diff     = float(row.get('diff') or 0)
-        ppfi_val = row.get('ppfi_combined')
-        imd_val  = row.get('imd_combined')
-    except (TypeError, ValueError):
-        return ''
-    if ppfi_val is None or imd_val is None:
-        return ''
-
-    ppfi_int = int(ppfi_val)
-    imd_int  = int(imd_val)
-    abs_diff = abs(diff)
-    lines    = []
-
-    if geography == 'lsoa':
-        # ── LSOA: decile thresholds (1–10) ────────────────────────────────────
-        # diff = ppfi_decile − imd_decile
-        # diff > 0 → ppfi_decile larger (lower food priority) + imd_decile smaller (more deprived)
-        #           → IMD shows greater deprivation than PPFI shows food priority
-        # diff < 0 → ppfi_decile smaller (higher food priority) + imd_decile larger (less deprived)
-        #           → PPFI shows greater food vulnerability than IMD shows deprivation
-        if diff > 3:
-            lines.append(
-                f'IMD decile {imd_int} (1 = most deprived) indicates significantly greater '
-                f'deprivation than PPFI decile {ppfi_int} (1 = highest priority) indicates '
-                'food vulnerability for this area.'
-            )
-            ppfi_vals = {col: row[col] for col, _ in PPFI_LSOA_DOMAIN_LABELS if row.get(col) is not None}
-            if ppfi_vals:
-                best2  = sorted(ppfi_vals.items(), key=lambda x: -x[1])[:2]
-                labels = [lbl for col, lbl in PPFI_LSOA_DOMAIN_LABELS if col in dict(best2)]
-                if labels:
-                    lines.append(
-                        f'Relatively better PPFI performance on {_join_labels(labels)} '
-                        'may be cushioning the overall PPFI food priority score.'
-                    )
-            imd_vals = {col: row[col] for col, _ in IMD_LSOA_DOMAIN_LABELS if row.get(col) is not None}
-            if imd_vals:
-                worst = [lbl for col, lbl in IMD_LSOA_DOMAIN_LABELS
-                         if imd_vals.get(col) is not None and imd_vals[col] <= 3]
-                if not worst:
-                    top2  = sorted(imd_vals.items(), key=lambda x: x[1])[:2]
-                    worst = [lbl for col, lbl in IMD_LSOA_DOMAIN_LABELS if col in dict(top2)]
-                if worst:
-                    lines.append(
-                        f'IMD score driven primarily by {_join_labels(worst)}, '
-                        'which are distinct from food access indicators.'
-                    )
-
-        elif diff < -3:
-            lines.append(
-                f'PPFI decile {ppfi_int} (1 = highest priority) indicates significantly '
-                f'greater food vulnerability than IMD decile {imd_int} (1 = most deprived) '
-                'indicates general deprivation for this area.'
-            )
-            ppfi_vals = {col: row[col] for col, _ in PPFI_LSOA_DOMAIN_LABELS if row.get(col) is not None}
-            if ppfi_vals:
-                worst = [lbl for col, lbl in PPFI_LSOA_DOMAIN_LABELS
-                         if ppfi_vals.get(col) is not None and ppfi_vals[col] <= 3]
-                if not worst:
-                    top2  = sorted(ppfi_vals.items(), key=lambda x: x[1])[:2]
-                    worst = [lbl for col, lbl in PPFI_LSOA_DOMAIN_LABELS if col in dict(top2)]
-                if worst:
-                    lines.append(
-                        f'PPFI score particularly driven by {_join_labels(worst)}, '
-                        'reflecting food access challenges not captured by IMD.'
-                    )
-
-        elif abs_diff <= 1:
-            lines.append(
-                f'IMD decile {imd_int} and PPFI decile {ppfi_int} closely agree for this area '
-                '(decile 1 = most deprived / highest priority). Both indices tell a consistent story.'
-            )
-
-        else:
-            if diff > 0:
-                lines.append(
-                    f'IMD decile {imd_int} (1 = most deprived) indicates more deprivation than '
-                    f'PPFI decile {ppfi_int} (1 = highest priority) indicates food vulnerability '
-                    f'({abs_diff:.0f} decile gap).'
-                )
-            else:
-                lines.append(
-                    f'PPFI decile {ppfi_int} (1 = highest priority) indicates greater food '
-                    f'vulnerability than IMD decile {imd_int} (1 = most deprived) indicates '
-                    f'general deprivation ({abs_diff:.0f} decile gap).'
-                )
-
-    else:
-        # ── LAD: rank scale ────────────────────────────────────────────────────
-        # diff = ppfi_rank − imd_rank
-        # diff > 0 → ppfi_rank larger (lower food priority) + imd_rank smaller (more deprived)
-        #           → IMD ranks area as more deprived than PPFI ranks it as a food priority
-        # diff < 0 → ppfi_rank smaller (higher food priority) + imd_rank larger (less deprived)
-        #           → PPFI ranks area as higher food priority than IMD ranks it as deprived
-        slight_thr   = max(1, int(round(0.10 * n_lad))) if n_lad else 10
-        moderate_thr = max(slight_thr + 1, int(round(0.25 * n_lad))) if n_lad else 25
-
-        if diff > moderate_thr:
-            lines.append(
-                f'IMD rank {imd_int} (1 = most deprived) indicates significantly greater '
-                f'deprivation than PPFI rank {ppfi_int} (1 = highest priority) indicates '
-                'food vulnerability for this local authority.'
-            )
-        elif diff < -moderate_thr:
-            lines.append(
-                f'PPFI rank {ppfi_int} (1 = highest priority) indicates significantly greater '
-                f'food vulnerability than IMD rank {imd_int} (1 = most deprived) indicates '
-                'general deprivation for this local authority.'
-            )
-        elif abs_diff <= slight_thr:
-            lines.append(
-                f'IMD rank {imd_int} and PPFI rank {ppfi_int} closely agree for this local authority '
-                '(rank 1 = most deprived / highest priority).'
-            )
-        else:
-            if diff > 0:
-                lines.append(
-                    f'IMD rank {imd_int} (1 = most deprived) indicates more deprivation than '
-                    f'PPFI rank {ppfi_int} (1 = highest priority) indicates food vulnerability.'
-                )
-            else:
-                lines.append(
-                    f'PPFI rank {ppfi_int} (1 = highest priority) indicates greater food '
-                    f'vulnerability than IMD rank {imd_int} (1 = most deprived) indicates '
-                    'general deprivation.'
-                )
-
-    return '<br>'.join(lines)
-
-
-def _alignment_band(mismatch_value, geography: str, n_lad: int):
-    if mismatch_value is None:
-        return ""
-
-    try:
-        m = int(mismatch_value)
-    except Exception:
-        return ""
-
-    if m > 0:
-        direction = "General deprivation (IMD) is higher than food-related vulnerability (PPFI) for this area."
-    elif m < 0:
-        direction = "Food-related vulnerability (PPFI) is higher than general deprivation (IMD) for this area."
-    else:
-        return "Alignment: Both indices closely agree for this area."
-
-    a = abs(m)
-
-    if geography == "lsoa":
-        if a == 1:
-            return f"Slightly misaligned: {direction}"
-        elif a in (2, 3):
-            return f"Moderately misaligned: {direction}"
-        else:
-            return f"Strongly misaligned: {direction}"
-
-    slight_thr = max(1, int(round(0.10 * n_lad)))
-    moderate_thr = max(slight_thr + 1, int(round(0.25 * n_lad)))
-
-    if a <= slight_thr:
-        return f"Slightly misaligned: {direction}"
-    elif a <= moderate_thr:
-        return f"Moderately misaligned: {direction}"
-    else:
-        return f"Strongly misaligned: {direction}"
-
-
-# one boundary around filtered lsoas
-def add_union_outline_layer(fig, gdf_lsoa_subset, width=3):
-    if gdf_lsoa_subset is None or getattr(gdf_lsoa_subset, "empty", True):
-        return fig
-
-    try:
-        union_geom = gdf_lsoa_subset.geometry.unary_union
-        boundary = union_geom.boundary
-
-        outline_geojson = {
-            "type": "FeatureCollection",
-            "features": [{
-                "type": "Feature",
-                "properties": {},
-                "geometry": mapping(boundary),
-            }],
-        }
-
-        layer = {
-            "sourcetype": "geojson",
-            "source": outline_geojson,
-            "type": "line",
-            "color": "#24226f", 
-            "line": {"width": width},
-            "below": "",
-        }
-
-        existing = list(getattr(fig.layout.mapbox, "layers", []) or [])
-        fig.update_layout(mapbox_layers=existing + [layer])
-
-    except Exception:
-        pass
-
-    return fig
-
-
-# build the map
-def make_map(
-    geography: str,
-    dataset: str,
-    domain: str,
-    gdf_lsoa, geojson_lsoa,
-    gdf_lad, geojson_lad,
-    *,
-    compact_hover: bool = False,
-    selected_lad: dict | None = None,
-):
-
-    pretty = _pretty_domain(domain)
-    metric = "Decile" if geography == "lsoa" else "Rank"
-
-    if geography == "lsoa":
-        gdf = gdf_lsoa.copy()
-        geojson = geojson_lsoa
-        dom_ppfi = PPFI_DOMAINS_LSOA.get(domain)
-        dom_imd  = IMD_DOMAINS_LSOA.get(domain)
-        range_color = (1, 10)
-        colorbar_title = "Decile"
-        name_col = _first_existing_col(
-            gdf, [LSOA_NAME, "LSOA21NM", "LSOA11NM", "lsoa_name", "name"]
-        )
-    else:
-        gdf = gdf_lad.copy()
-        geojson = geojson_lad
-        dom_ppfi = PPFI_DOMAINS_LAD.get(domain)
-        dom_imd  = IMD_DOMAINS_LAD.get(domain)
-
-        full_max = None
-        if dom_ppfi and dom_ppfi in gdf_lad_full.columns:
-            full_max = gdf_lad_full[dom_ppfi].max()
-
-        range_color = (1, full_max) if full_max else None
-        colorbar_title = "Rank"
-        name_col = _first_existing_col(
-            gdf, [LAD_NAME, "LAD24NM", "LAD23NM", "lad_name", "NAME", "name"]
-        )
-
-    color_col = dom_ppfi if dataset == "ppfi" else dom_imd
-    colorscale = _pick_palette(geography, dataset)
-
-    gdf["name"] = _safe_series(gdf, name_col, "")
-
-    if compact_hover:
-        # compact hover (compare maps)
-        gdf["ppfi_val"] = _safe(gdf, dom_ppfi)
-        gdf["imd_val"]  = _safe(gdf, dom_imd)
-
-        customdata = gdf[["name", "ppfi_val", "imd_val"]].values
-
-        if domain == "combined":
-            hovertemplate = (
-                "<b>%{customdata[0]}</b><br>"
-                f"Combined {metric}<br>"
-                "PPFI: %{customdata[1]}<br>"
-                "IMD: %{customdata[2]}<br>"
-                "<extra></extra>"
-            )
-        else:
-            if dataset == "ppfi":
-                hovertemplate = (
-                    "<b>%{customdata[0]}</b><br>"
-                    f"{pretty} {metric}<br>"
-                    "PPFI: %{customdata[1]}<br>"
-                    "<extra></extra>"
-                )
-            else:
-                hovertemplate = (
-                    "<b>%{customdata[0]}</b><br>"
-                    f"{pretty} {metric}<br>"
-                    "IMD: %{customdata[2]}<br>"
-                    "<extra></extra>"
-                )
-    else:
-        if geography == "lsoa":
-            ppfi_comb = _safe(gdf, "pp_dec_combined")
-            imd_comb  = _safe(gdf, "imd_decile")
-        else:
-            ppfi_comb = _safe(gdf, "combined")
-            imd_comb  = _safe(gdf, "imd_rank")
-
-        gdf["ppfi_combined"] = ppfi_comb
-        gdf["imd_combined"]  = imd_comb
-        if ppfi_comb is not None and imd_comb is not None:
-            gdf["diff"] = gdf["ppfi_combined"] - gdf["imd_combined"]
-        else:
-            gdf["diff"] = None
-
-        if domain != "combined" and color_col in gdf.columns:
-            gdf["domain_line"] = f"{pretty} {metric} ({dataset.upper()}): " + gdf[color_col].astype(str)
-        else:
-            gdf["domain_line"] = ""
-
-        gdf["narrative"] = gdf.apply(
-            lambda r: _hover_narrative(r.to_dict(), geography, len(gdf_lad_full)), axis=1
-        )
-
-        customdata = gdf[[
-            "name",          # 0
-            "ppfi_combined", # 1
-            "imd_combined",  # 2
-            "diff",          # 3
-            "domain_line",   # 4
-            "narrative",     # 5
-        ]].values
-
-        hovertemplate = (
-            "<b>%{customdata[0]}</b><br>"
-            "PPFI combined: %{customdata[1]}<br>"
-            "IMD combined: %{customdata[2]}<br>"
-            "Difference (PPFI \u2212 IMD): %{customdata[3]}<br>"
-            "%{customdata[4]}<br>"
-            "%{customdata[5]}<br>"
-            "<extra></extra>"
-        )
-
-    fig = px.choropleth_mapbox(
-        gdf,
-        geojson=geojson,
-        locations="id",
-        featureidkey="properties.id",
-        color=color_col,
-        range_color=range_color,
-        color_continuous_scale=colorscale,
-        opacity=0.85,
-    )
-
-    fig.update_traces(
-        customdata=customdata,
-        hovertemplate=hovertemplate,
-        marker_line_width=0.3,
-    )
-
-    fig.update_layout(
-        mapbox=dict(
-            style="carto-positron",
-            zoom=5.3,
-            center={"lat": 53.7, "lon": -1.5},
-        ),
-        margin=dict(l=0, r=0, t=40, b=0),
-        uirevision="keep",
-        clickmode="event",
-        coloraxis_colorbar=dict(
-            title=colorbar_title,
-            thickness=12,
-            len=0.5,
-        ),
-        title={"text": f"{dataset.upper()} – {pretty} ({geography.upper()})", "x": 0.5},
-    )
-
-    if geography == "lsoa" and len(gdf) < len(gdf_lsoa_full):
-        fig = add_union_outline_layer(fig, gdf, width=3)
-
-    return fig
-
-
-def add_highlight_outline(fig, gdf, geojson, feature_id: str):
-    return fig
+# utils/figures.py
+import numpy as np
+import pandas as pd
+import plotly.colors as pc
+import plotly.express as px
+
+from utils.constants import (
+    PPFI_DOMAINS_LSOA, IMD_DOMAINS_LSOA,
+    PPFI_DOMAINS_LAD,  IMD_DOMAINS_LAD,
+    PPFI_LSOA_PALETTE, IMD_LSOA_PALETTE,
+    PPFI_LAD_PALETTE,  IMD_LAD_PALETTE,
+    LSOA_NAME, LAD_NAME,
+)
+
+from utils.data import (
+    get_matrix, get_lad_matrix, get_lad_partitions, get_lsoa_matrix, get_lad_outline, get_lsoa_outline,
+    get_group_frame, get_group_values, get_group_mismatch,
+)
+from utils.figure_skeletons import from_skeleton, skeletons_enabled
+from utils.geometry import MAX_ROWS_TOKEN, area_points, encode_rows
+from utils.tiles import TILE_CLASSES, tile_url
+
+# marker diameter (px) of an lsoa drawn as a dot
+POINT_SIZE = 4
+
+# geographies whose values are lsoa deciles (hexes and wards aggregate them)
+LSOA_BASED = ("lsoa", "hex", "ward")
+
+
+# helpers
+def get_domains_for_single(geo: str, dataset: str):
+    # hexes and wards aggregate the lsoa deciles, so they offer the lsoa domains
+    if geo in LSOA_BASED and dataset == "ppfi":
+        return PPFI_DOMAINS_LSOA
+    if geo in LSOA_BASED and dataset == "imd":
+        return IMD_DOMAINS_LSOA
+    if geo == "lad" and dataset == "ppfi":
+        return PPFI_DOMAINS_LAD
+    return IMD_DOMAINS_LAD
+
+
+def get_domains_for_compare(geo: str):
+    if geo in LSOA_BASED:
+        keys = set(PPFI_DOMAINS_LSOA.keys()) | set(IMD_DOMAINS_LSOA.keys())
+    else:
+        keys = set(PPFI_DOMAINS_LAD.keys()) | set(IMD_DOMAINS_LAD.keys())
+    return {k: k for k in sorted(keys)}
+
+
+def _pick_palette(geo: str, dataset: str):
+    if geo in LSOA_BASED:
+        return PPFI_LSOA_PALETTE if dataset == "ppfi" else IMD_LSOA_PALETTE
+    return PPFI_LAD_PALETTE if dataset == "ppfi" else IMD_LAD_PALETTE
+
+
+def _pretty_domain(domain_key: str):
+    return domain_key.replace("_", " ").strip().title()
+
+
+def _first_existing_col(gdf, candidates):
+    for c in candidates:
+        if c in getattr(gdf, "columns", []):
+            return c
+    return None
+
+
+def _safe_series(gdf, col_name, default=""):
+    if col_name and col_name in gdf.columns:
+        return gdf[col_name]
+    return default
+
+
+def _safe(gdf, col):
+    return gdf[col] if col and col in gdf.columns else None
+
+
+def _alignment_band(mismatch_value, geography: str, n_lad: int):
+    if mismatch_value is None:
+        return ""
+
+    try:
+        m = int(mismatch_value)
+    except Exception:
+        return ""
+
+    if m > 0:
+        direction = "General deprivation (IMD) is higher than food-related vulnerability (PPFI) for this area."
+    elif m < 0:
+        direction = "Food-related vulnerability (PPFI) is higher than general deprivation (IMD) for this area."
+    else:
+        return "Alignment: Both indices closely agree for this area."
+
+    a = abs(m)
+
+    if geography == "lsoa":
+        if a == 1:
+            return f"Slightly misaligned: {direction}"
+        elif a in (2, 3):
+            return f"Moderately misaligned: {direction}"
+        else:
+            return f"Strongly misaligned: {direction}"
+
+    slight_thr = max(1, int(round(0.10 * n_lad)))
+    moderate_thr = max(slight_thr + 1, int(round(0.25 * n_lad)))
+
+    if a <= slight_thr:
+        return f"Slightly misaligned: {direction}"
+    elif a <= moderate_thr:
+        return f"Moderately misaligned: {direction}"
+    else:
+        return f"Strongly misaligned: {direction}"
+
+
+def _selected_lad_id(selected_lad):
+    return selected_lad.get("lad_id") if isinstance(selected_lad, dict) else None
+
+
+def _add_line_layer(fig, boundary, width, dash=None):
+    outline_geojson = {
+        "type": "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "properties": {},
+            "geometry": boundary,
+        }],
+    }
+
+    line = {"width": width}
+    if dash:
+        line["dash"] = dash
+    layer = {
+        "sourcetype": "geojson",
+        "source": outline_geojson,
+        "type": "line",
+        "color": "#24226f", 
+        "line": line,
+        "below": "",
+    }
+
+    existing = list(getattr(fig.layout.mapbox, "layers", []) or [])
+    fig.update_layout(mapbox_layers=existing + [layer])
+    return fig
+
+
+# one boundary around filtered lsoas
+def add_union_outline_layer(fig, gdf_lsoa_subset, width=3, lad_id=None):
+    if gdf_lsoa_subset is None or getattr(gdf_lsoa_subset, "empty", True):
+        return fig
+
+    try:
+        # subset index = row positions in the full lsoa frame; the outline is
+        # cached per (LAD, filter), and a LAD's whole partition is prebuilt
+        boundary = get_lsoa_outline(gdf_lsoa_subset.index.to_numpy(), lad_id)
+        if boundary is not None:
+            fig = _add_line_layer(fig, boundary, width)
+    except Exception:
+        pass
+
+    return fig
+
+
+def _class_colours(colorscale, n):
+    # the colour plotly gives each class's value on the trace's colourscale
+    if isinstance(colorscale, str):
+        scale = pc.get_colorscale(colorscale)
+    else:
+        # validate_colors converts the list in place, so hand it a copy
+        scale = pc.make_colorscale(pc.validate_colors(list(colorscale), "rgb"))
+    return pc.sample_colorscale(scale, [k / (n - 1) for k in range(n)])
+
+
+# fills from vector tiles instead of geojson
+def add_tile_layers(fig, geography, gdf, color_col, range_color, colorscale):
+    if geography not in TILE_CLASSES or not range_color or not color_col:
+        return fig
+    rows = "all"
+    if len(gdf) < len(get_matrix(geography)):
+        rows = encode_rows(gdf.index.to_numpy())
+        if len(rows) > MAX_ROWS_TOKEN:
+            # too long for a url, keep the geojson
+            return fig
+
+    url = tile_url(geography, color_col, range_color, rows)
+    n = TILE_CLASSES[geography]
+    layers = [
+        {
+            "sourcetype": "vector",
+            "source": [url],
+            "sourcelayer": f"c{k}",
+            "type": "fill",
+            "color": colour,
+            "opacity": 0.85,
+            "below": "traces",
+        }
+        for k, colour in enumerate(_class_colours(colorscale, n))
+    ]
+
+    # the trace keeps its colourbar but draws nothing
+    fig.update_traces(
+        geojson={"type": "FeatureCollection", "features": []},
+        customdata=None,
+        hovertemplate=None,
+        hoverinfo="skip",
+    )
+    existing = list(getattr(fig.layout.mapbox, "layers", []) or [])
+    fig.update_layout(mapbox_layers=existing + layers)
+    return fig
+
+
+def uses_tiles(fig):
+    return any(layer.sourcetype == "vector" for layer in (fig.layout.mapbox.layers or []))
+
+
+def _map_layout(fig, colorbar_title, title):
+    fig.update_layout(
+        mapbox=dict(
+            style="carto-positron",
+            zoom=5.3,
+            center={"lat": 53.7, "lon": -1.5},
+        ),
+        margin=dict(l=0, r=0, t=40, b=0),
+        uirevision="keep",
+        clickmode="event",
+        coloraxis_colorbar=dict(
+            title=colorbar_title,
+            thickness=12,
+            len=0.5,
+        ),
+        title={"text": title, "x": 0.5},
+    )
+    return fig
+
+
+def map_range(geography, domain):
+    """Colour range of the single map of a domain: deciles for lsoas, ranks
+    up to the PPFI domain's highest for LADs (None without one)."""
+    if geography == "lsoa":
+        return (1, 10)
+    dom_ppfi = PPFI_DOMAINS_LAD.get(domain)
+    lad_matrix = get_lad_matrix()
+    full_max = None
+    if dom_ppfi and dom_ppfi in lad_matrix:
+        full_max = lad_matrix.max(dom_ppfi)
+        full_max = float(full_max) if full_max is not None else None
+    return (1, full_max) if full_max else None
+
+
+def _px_map(kind, gdf, geojson, color_col, range_color, colorscale, colorbar_title, title):
+    # the plotly express figure a map is drawn on
+    if kind == "points":
+        fig = px.scatter_mapbox(
+            gdf,
+            lon="point_lon",
+            lat="point_lat",
+            color=color_col,
+            range_color=range_color,
+            color_continuous_scale=colorscale,
+            opacity=0.85,
+        )
+        fig.update_traces(marker_size=POINT_SIZE)
+    else:
+        fig = px.choropleth_mapbox(
+            gdf,
+            geojson=geojson,
+            locations="id",
+            featureidkey="properties.id",
+            color=color_col,
+            range_color=range_color,
+            color_continuous_scale=colorscale,
+            opacity=0.85,
+        )
+        fig.update_traces(marker_line_width=0.3)
+    return _map_layout(fig, colorbar_title, title)
+
+
+def _base_map(kind, key, gdf, geojson, color_col, range_color, colorscale, colorbar_title, title):
+    # _px_map, or a clone of it built once per key (utils/figure_skeletons.py)
+    # with this render's areas, values, title and colour range swapped in
+    if not skeletons_enabled() or color_col not in gdf.columns:
+        return _px_map(kind, gdf, geojson, color_col, range_color, colorscale, colorbar_title, title)
+    empty = pd.DataFrame({"id": [], "point_lon": [], "point_lat": [], "value": []})
+    fig = from_skeleton(
+        (kind, *key), lambda: _px_map(kind, empty, None, "value", None, colorscale, colorbar_title, None),
+    )
+    values = gdf[color_col].to_numpy()
+    if kind == "points":
+        fig.update_traces(lon=gdf["point_lon"].to_numpy(), lat=gdf["point_lat"].to_numpy(), marker_color=values)
+    else:
+        fig.update_traces(geojson=geojson, locations=gdf["id"].to_numpy(), z=values)
+    if range_color:
+        fig.update_layout(coloraxis_cmin=range_color[0], coloraxis_cmax=range_color[1])
+    fig.update_layout(title={"text": title, "x": 0.5})
+    return fig
+
+
+# build the map
+def make_map(
+    geography: str,
+    dataset: str,
+    domain: str,
+    gdf_lsoa, geojson_lsoa,
+    gdf_lad, geojson_lad,
+    *,
+    compact_hover: bool = False,
+    selected_lad: dict | None = None,
+    vector_tiles: bool = False,
+    outline_gdf=None,
+    points: bool = False,
+):
+
+    pretty = _pretty_domain(domain)
+    metric = "Decile" if geography == "lsoa" else "Rank"
+
+    if geography == "lsoa":
+        gdf = gdf_lsoa.copy()
+        geojson = geojson_lsoa
+        dom_ppfi = PPFI_DOMAINS_LSOA.get(domain)
+        dom_imd  = IMD_DOMAINS_LSOA.get(domain)
+        range_color = map_range(geography, domain)
+        colorbar_title = "Decile"
+        name_col = _first_existing_col(
+            gdf, [LSOA_NAME, "LSOA21NM", "LSOA11NM", "lsoa_name", "name"]
+        )
+    else:
+        gdf = gdf_lad.copy()
+        geojson = geojson_lad
+        dom_ppfi = PPFI_DOMAINS_LAD.get(domain)
+        dom_imd  = IMD_DOMAINS_LAD.get(domain)
+
+        range_color = map_range(geography, domain)
+        colorbar_title = "Rank"
+        name_col = _first_existing_col(
+            gdf, [LAD_NAME, "LAD24NM", "LAD23NM", "lad_name", "NAME", "name"]
+        )
+
+    color_col = dom_ppfi if dataset == "ppfi" else dom_imd
+    colorscale = _pick_palette(geography, dataset)
+
+    # pull just the indicator columns this figure uses out of the matrix
+    needed = [dom_ppfi, dom_imd]
+    if not compact_hover:
+        if geography == "lsoa":
+            needed += ["pp_dec_combined", "imd_decile"]
+        else:
+            needed += ["combined", "imd_rank"]
+    needed = [c for c in dict.fromkeys(needed) if c]
+    gdf = gdf.join(get_matrix(geography).frame(needed, rows=gdf.index.to_numpy()))
+
+    gdf["name"] = _safe_series(gdf, name_col, "")
+
+    if compact_hover:
+        # compact hover (compare maps)
+        gdf["ppfi_val"] = _safe(gdf, dom_ppfi)
+        gdf["imd_val"]  = _safe(gdf, dom_imd)
+
+        customdata = gdf[["name", "ppfi_val", "imd_val"]].values
+
+        if domain == "combined":
+            hovertemplate = (
+                "<b>%{customdata[0]}</b><br>"
+                f"Combined {metric}<br>"
+                "PPFI: %{customdata[1]}<br>"
+                "IMD: %{customdata[2]}<br>"
+                "<extra></extra>"
+            )
+        else:
+            if dataset == "ppfi":
+                hovertemplate = (
+                    "<b>%{customdata[0]}</b><br>"
+                    f"{pretty} {metric}<br>"
+                    "PPFI: %{customdata[1]}<br>"
+                    "<extra></extra>"
+                )
+            else:
+                hovertemplate = (
+                    "<b>%{customdata[0]}</b><br>"
+                    f"{pretty} {metric}<br>"
+                    "IMD: %{customdata[2]}<br>"
+                    "<extra></extra>"
+                )
+    else:
+        if geography == "lsoa":
+            ppfi_comb = _safe(gdf, "pp_dec_combined")
+            imd_comb  = _safe(gdf, "imd_decile")
+        else:
+            ppfi_comb = _safe(gdf, "combined")
+            imd_comb  = _safe(gdf, "imd_rank")
+
+        gdf["ppfi_combined"] = ppfi_comb
+        gdf["imd_combined"]  = imd_comb
+        if ppfi_comb is not None and imd_comb is not None:
+            gdf["diff"] = gdf["ppfi_combined"] - gdf["imd_combined"]
+        else:
+            gdf["diff"] = None
+
+        # the narrative is not shipped per feature; the hover-detail panel
+        # fetches it for the one area under the cursor
+        columns = ["name", "ppfi_combined", "imd_combined", "diff"]
+        hovertemplate = (
+            "<b>%{customdata[0]}</b><br>"
+            "PPFI combined: %{customdata[1]}<br>"
+            "IMD combined: %{customdata[2]}<br>"
+            "Difference (PPFI \u2212 IMD): %{customdata[3]}<br>"
+        )
+        if domain != "combined" and color_col in gdf.columns:
+            columns.append(color_col)
+            hovertemplate += f"{pretty} {metric} ({dataset.upper()}): %{{customdata[4]}}<br>"
+        customdata = gdf[columns].values
+        hovertemplate += "<extra></extra>"
+
+    title = f"{dataset.upper()} – {pretty} ({geography.upper()})"
+    key = (geography, dataset, colorbar_title)
+    if points and geography == "lsoa":
+        # one webgl dot per lsoa instead of its polygon; same colours, hover
+        # and customdata, and the point's id stands in for the location
+        gdf["point_lon"], gdf["point_lat"] = area_points(gdf)
+        fig = _base_map("points", key, gdf, None, color_col, range_color, colorscale, colorbar_title, title)
+        fig.update_traces(
+            ids=gdf["id"].to_numpy(),
+            customdata=customdata,
+            hovertemplate=hovertemplate,
+        )
+    else:
+        fig = _base_map("choropleth", key, gdf, geojson, color_col, range_color, colorscale, colorbar_title, title)
+        fig.update_traces(
+            customdata=customdata,
+            hovertemplate=hovertemplate,
+        )
+
+    if vector_tiles:
+        fig = add_tile_layers(fig, geography, gdf, color_col, range_color, colorscale)
+
+    # a viewport cut draws part of the filtered lsoas; the outline is still theirs
+    outline = gdf if outline_gdf is None else outline_gdf
+    lad_id = _selected_lad_id(selected_lad)
+    if geography == "lsoa" and len(outline) < len(get_matrix("lsoa")):
+        fig = add_union_outline_layer(fig, outline, width=3, lad_id=lad_id)
+        # when a filter (or a ward) cuts the drilldown down, keep the LAD in view
+        rows = get_lad_partitions().rows(lad_id) if lad_id else None
+        if rows is not None and len(outline) != len(rows):
+            fig = add_highlight_outline(fig, lad_id, width=1.5, dash=[3, 2])
+
+    return fig
+
+
+# hex grid / ward map: lsoa deciles aggregated per area
+def make_group_map(geography: str, dataset: str, domain: str, level: int, geojson, cells=None, selected_lad=None):
+    pretty = _pretty_domain(domain)
+    frame = get_group_frame(geography, level)
+    rows = slice(None) if cells is None else cells
+    gdf = frame.iloc[rows].copy()
+
+    matrix = get_lsoa_matrix()
+    for prefix, col in (("ppfi", PPFI_DOMAINS_LSOA.get(domain)), ("imd", IMD_DOMAINS_LSOA.get(domain))):
+        if col and col in matrix:
+            mean, mode = get_group_values(geography, level, col)
+        else:
+            mean = mode = np.full(len(frame), np.nan)
+        gdf[f"{prefix}_mean"] = np.round(mean, 1)[rows]
+        gdf[f"{prefix}_mode"] = mode[rows]
+    gdf["mismatch_share"] = get_group_mismatch(geography, level)[rows]
+
+    customdata = gdf[[
+        "name",            # 0
+        "lsoa_count",      # 1
+        "ppfi_mean",       # 2
+        "ppfi_mode",       # 3
+        "imd_mean",        # 4
+        "imd_mode",        # 5
+        "mismatch_share",  # 6
+    ]].values
+    hovertemplate = (
+        "<b>%{customdata[0]}</b><br>"
+        "LSOAs: %{customdata[1]}<br>"
+        f"{pretty} Decile<br>"
+        "PPFI: mean %{customdata[2]}, most common %{customdata[3]}<br>"
+        "IMD: mean %{customdata[4]}, most common %{customdata[5]}<br>"
+        "Mismatched LSOAs: %{customdata[6]:.0%}<br>"
+        "<extra></extra>"
+    )
+
+    title = f"{dataset.upper()} – {pretty} ({geography.upper()})"
+    fig = _base_map("choropleth", (geography, dataset, "Mean decile"), gdf, geojson, f"{dataset}_mean", (1, 10),
+                    _pick_palette(geography, dataset), "Mean decile", title)
+    fig.update_traces(
+        customdata=customdata,
+        hovertemplate=hovertemplate,
+    )
+
+    # the wards of one LAD are drawn inside its outline
+    lad_id = _selected_lad_id(selected_lad)
+    if lad_id:
+        fig = add_highlight_outline(fig, lad_id, width=3)
+    return fig
+
+
+# boundary of the selected LAD, from the prebuilt (or once-traced) outlines
+def add_highlight_outline(fig, lad_id: str, width=3, dash=None):
+    try:
+        boundary = get_lad_outline(lad_id)
+        if boundary is not None:
+            fig = _add_line_layer(fig, boundary, width, dash)
+    except Exception:
+        pass
+    return fig
@@ -0,0 +1,289 @@
+# utils/geometry.py
+#
+# serve-time geometry helpers. numpy only -- everything that needs shapely is
+# precomputed by utils/geometry_build.py at build time.
+
+import base64
+import json
+import math
+import threading
+import zlib
+
+import numpy as np
+
+BOUNDS_COLS = ['minx', 'miny', 'maxx', 'maxy']
+# a point inside each polygon, for drawing areas as dots
+POINT_COLS = ['point_lon', 'point_lat']
+
+# simplification pyramid (utils/geometry_build.py): level k > 0 is simplified
+# with PYRAMID_TOLERANCES[k - 1] degrees, level 0 is full resolution
+PYRAMID_TOLERANCES = (0.0001, 0.0005, 0.002, 0.008)
+NATIONAL_ZOOM = 5.3
+
+
+def center_zoom_from_bounds(bounds):
+    minx, miny, maxx, maxy = bounds
+    center = {'lon': (minx + maxx) / 2, 'lat': (miny + maxy) / 2}
+    span = max(maxx - minx, maxy - miny)
+    if span <= 0:
+        zoom = 9.5
+    else:
+        zoom = 8.5 - math.log(span + 1e-9, 2)
+    zoom = max(5.3, min(10.5, zoom))
+    return center, zoom
+
+
+def pyramid_level(zoom, n_levels=len(PYRAMID_TOLERANCES)):
+    """Coarsest pyramid level whose tolerance stays under half a screen
+    pixel at this mapbox zoom (512px tiles)."""
+    zoom = NATIONAL_ZOOM if zoom is None else zoom
+    half_pixel = 360 / (512 * 2 ** zoom) / 2
+    level = 0
+    for k, tolerance in enumerate(PYRAMID_TOLERANCES[:n_levels], 1):
+        if tolerance <= half_pixel:
+            level = k
+    return level
+
+
+def area_points(frame):
+    """(lon, lat) arrays of each row's point; bbox centres for artifacts
+    built before the point columns existed."""
+    if all(c in frame.columns for c in POINT_COLS):
+        return frame[POINT_COLS[0]].to_numpy(), frame[POINT_COLS[1]].to_numpy()
+    b = frame[BOUNDS_COLS].to_numpy()
+    return (b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2
+
+
+def subset_bounds(frame):
+    # equivalent of GeoDataFrame.total_bounds from the precomputed bbox columns
+    b = frame[BOUNDS_COLS].to_numpy()
+    return b[:, 0].min(), b[:, 1].min(), b[:, 2].max(), b[:, 3].max()
+
+
+def _gather_ranges(offsets, rows):
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    # arange over the concatenation of [start, start + length) for every row
+    shift = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return shift + np.arange(total)
+
+
+def _chain_segments(segments):
+    # join boundary segments that share a vertex into polylines
+    adjacency = {}
+    for k, (a, b) in enumerate(segments):
+        adjacency.setdefault(a, []).append(k)
+        adjacency.setdefault(b, []).append(k)
+
+    used = [False] * len(segments)
+    lines = []
+    for k, (a, b) in enumerate(segments):
+        if used[k]:
+            continue
+        used[k] = True
+        line, cur = [a, b], b
+        while True:
+            nxt = next((e for e in adjacency[cur] if not used[e]), None)
+            if nxt is None:
+                break
+            used[nxt] = True
+            a2, b2 = segments[nxt]
+            cur = b2 if a2 == cur else a2
+            line.append(cur)
+        lines.append(line)
+    return lines
+
+
+def union_outline(edges, rows):
+    """Boundary of the union of the given LSOA rows as a GeoJSON MultiLineString.
+
+    An edge shared by two selected polygons is interior to the union, so the
+    boundary is every edge used an odd number of times by the selection.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if rows.size == 0:
+        return None
+
+    # unique over the selection's own edges keeps this O(selection), not O(England)
+    members = edges['lsoa_edges'][_gather_ranges(edges['lsoa_offsets'], rows)]
+    edge_ids, counts = np.unique(members, return_counts=True)
+    boundary = edges['edges'][edge_ids[counts % 2 == 1]]
+    if len(boundary) == 0:
+        return None
+
+    vertices = edges['vertices']
+    lines = _chain_segments([tuple(s) for s in boundary.tolist()])
+    return {
+        'type': 'MultiLineString',
+        'coordinates': [vertices[line].tolist() for line in lines],
+    }
+
+
+class LadPartitions:
+    """LAD -> LSOA rows, so a drilldown only touches the LSOAs of one LAD.
+
+    The build sorts LSOAs by LAD, which makes every partition a contiguous
+    row range (and its geometry one contiguous slice of the geojson bytes);
+    an older artifact still works through the sort order kept here.
+    `outlines` is the artifact's prebuilt LAD boundaries, one feature per
+    LAD in `ids` order; without them boundaries are traced on first use.
+    """
+
+    def __init__(self, lsoa_frame, lad_col='lad_cd', outlines=None):
+        codes = lsoa_frame[lad_col].fillna('').astype(str).to_numpy()
+        rows = np.flatnonzero(codes != '')
+        self.order = rows[np.argsort(codes[rows], kind='stable')]
+        ids, starts, counts = np.unique(codes[self.order], return_index=True, return_counts=True)
+        self.ids = ids
+        self.starts, self.stops = starts, starts + counts
+        self._index = {lad_id: k for k, lad_id in enumerate(ids.tolist())}
+
+        b = lsoa_frame[BOUNDS_COLS].to_numpy()[self.order]
+        self.bounds = np.column_stack((
+            np.minimum.reduceat(b[:, 0], starts), np.minimum.reduceat(b[:, 1], starts),
+            np.maximum.reduceat(b[:, 2], starts), np.maximum.reduceat(b[:, 3], starts),
+        )) if len(starts) else np.empty((0, 4))
+        self._center_zoom = [center_zoom_from_bounds(bb) for bb in self.bounds.tolist()]
+
+        self._prebuilt = outlines if outlines is not None and len(outlines.spans) == len(ids) else None
+        self._outlines = {}
+        self._lock = threading.Lock()
+
+    @property
+    def has_outlines(self):
+        return self._prebuilt is not None
+
+    def __contains__(self, lad_id):
+        return lad_id in self._index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, lad_id):
+        k = self._index.get(lad_id)
+        if k is None:
+            return None
+        return self.order[self.starts[k]:self.stops[k]]
+
+    def center_zoom(self, lad_id):
+        return self._center_zoom[self._index[lad_id]]
+
+    def outline(self, lad_id, edges=None):
+        # the LAD boundary, traced from the same LSOA edges the filtered
+        # outline uses so the two always line up; read from the prebuilt
+        # outlines or computed once per LAD
+        try:
+            return self._outlines[lad_id]
+        except KeyError:
+            pass
+        k = self._index.get(lad_id)
+        if k is None:
+            return None
+        if self._prebuilt is not None:
+            boundary = json.loads(self._prebuilt.subset([k]))['features'][0]['geometry']
+        else:
+            boundary = union_outline(edges, self.rows(lad_id))
+        with self._lock:
+            self._outlines[lad_id] = boundary
+        return boundary
+
+
+class BoxIndex:
+    """Packed R-tree (Sort-Tile-Recursive) over row bounding boxes.
+
+    Rows are sorted into vertical slices by x centre and, within a slice, by
+    y centre, then grouped into nodes of `node_size`; a window query tests
+    the node boxes first and only the rows of the nodes it hits.
+    """
+
+    def __init__(self, bounds, node_size=32):
+        b = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        # rows without geometry have nan bounds and are never visible
+        rows = np.flatnonzero(np.isfinite(b).all(axis=1))
+        cx, cy = (b[rows, 0] + b[rows, 2]) / 2, (b[rows, 1] + b[rows, 3]) / 2
+        n_nodes = -(-len(rows) // node_size)
+        per_slice = max(1, math.ceil(math.sqrt(n_nodes))) * node_size
+        by_x = np.argsort(cx, kind='stable')
+        slices = np.empty(len(rows), dtype=np.int64)
+        slices[by_x] = np.arange(len(rows)) // per_slice
+        self.order = rows[np.lexsort((cy, slices))]
+        self.bounds = b
+
+        # slices hold whole nodes, so fixed-size chunks never straddle two
+        starts = np.arange(0, len(rows), node_size)
+        nb = b[self.order]
+        self.offsets = np.append(starts, len(rows))
+        self.node_bounds = np.column_stack((
+            np.minimum.reduceat(nb[:, 0], starts), np.minimum.reduceat(nb[:, 1], starts),
+            np.maximum.reduceat(nb[:, 2], starts), np.maximum.reduceat(nb[:, 3], starts),
+        )) if len(starts) else np.empty((0, 4))
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.bounds.nbytes + self.offsets.nbytes + self.node_bounds.nbytes
+
+    def query(self, box):
+        """Sorted rows whose bounding box intersects (minx, miny, maxx, maxy)."""
+        minx, miny, maxx, maxy = box
+        nb = self.node_bounds
+        nodes = np.flatnonzero((nb[:, 0] <= maxx) & (nb[:, 2] >= minx) & (nb[:, 1] <= maxy) & (nb[:, 3] >= miny))
+        rows = self.order[_gather_ranges(self.offsets, nodes)]
+        b = self.bounds[rows]
+        hit = (b[:, 0] <= maxx) & (b[:, 2] >= minx) & (b[:, 1] <= maxy) & (b[:, 3] >= miny)
+        return np.sort(rows[hit])
+
+
+# gunicorn rejects request lines over 4094 bytes, so row tokens in urls stay under this
+MAX_ROWS_TOKEN = 3072
+
+
+def encode_rows(rows):
+    """Compact, url-safe token for a set of row numbers (sorted deltas, zlib)."""
+    rows = np.unique(np.asarray(rows, dtype=np.int64))
+    deltas = np.diff(rows, prepend=0)
+    width = next(w for w in (1, 2, 4) if deltas.size == 0 or deltas.max() < 256 ** w)
+    packed = bytes([width]) + deltas.astype(f'<u{width}').tobytes()
+    return base64.urlsafe_b64encode(zlib.compress(packed, 9)).rstrip(b'=').decode()
+
+
+def decode_rows(token):
+    try:
+        packed = zlib.decompress(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except zlib.error as exc:
+        raise ValueError('bad row token') from exc
+    width = packed[0] if packed else 0
+    if width not in (1, 2, 4) or (len(packed) - 1) % width:
+        raise ValueError('bad row token')
+    return np.cumsum(np.frombuffer(packed, dtype=f'<u{width}', offset=1).astype(np.int64))
+
+
+def decode_topojson(raw):
+    """{id: GeoJSON geometry} from utils.geometry_build.encode_topojson()
+    output; the same steps as the browser decoder in assets/topojson.js."""
+    topo = json.loads(raw)
+    scale = np.asarray(topo['transform']['scale'])
+    translate = np.asarray(topo['transform']['translate'])
+    arcs = [np.cumsum(np.asarray(arc, dtype=np.int64), axis=0) * scale + translate for arc in topo['arcs']]
+
+    def ring(refs):
+        points = []
+        for k in refs:
+            arc = arcs[~k][::-1] if k < 0 else arcs[k]
+            points.extend(arc.tolist() if not points else arc[1:].tolist())
+        return points
+
+    out = {}
+    for obj in topo['objects'].values():
+        for geometry in obj['geometries']:
+            if geometry['type'] == 'Polygon':
+                coords = [ring(r) for r in geometry['arcs']]
+            else:
+                coords = [[ring(r) for r in polygon] for polygon in geometry['arcs']]
+            out[geometry['properties']['id']] = {'type': geometry['type'], 'coordinates': coords}
+    return out
@@ -0,0 +1,263 @@
+# utils/geometry_build.py
+#
+# build-time geometry products. this is the only module besides the source
+# readers in utils/data_loader.py that needs shapely; the app serves from the
+# precomputed results via utils/geometry.py.
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from utils.geometry import BOUNDS_COLS, POINT_COLS, center_zoom_from_bounds
+
+# vertices closer than this (degrees, ~1cm) are treated as the same point
+EDGE_PRECISION = 1e-7
+
+# topojson grid (degrees) for full-detail geometry, ~1m; simplified levels
+# use a tenth of their tolerance
+TOPOJSON_STEP = 1e-5
+
+
+def add_bounds_columns(gdf):
+    gdf[BOUNDS_COLS] = shapely.bounds(gdf.geometry.values)
+    return gdf
+
+
+def add_point_columns(gdf):
+    # point_on_surface rather than the centroid, which can fall outside a
+    # concave area (and so be drawn in its neighbour)
+    points = shapely.point_on_surface(gdf.geometry.values)
+    gdf[POINT_COLS[0]] = shapely.get_x(points)
+    gdf[POINT_COLS[1]] = shapely.get_y(points)
+    return gdf
+
+
+def add_center_zoom_columns(gdf):
+    cz = [center_zoom_from_bounds(b) for b in gdf[BOUNDS_COLS].to_numpy()]
+    gdf['center_lon'] = [c['lon'] for c, _ in cz]
+    gdf['center_lat'] = [c['lat'] for c, _ in cz]
+    gdf['zoom'] = [z for _, z in cz]
+    return gdf
+
+
+def build_edge_topology(geoms, precision=EDGE_PRECISION):
+    """Shared-edge table for a polygon layer.
+
+    Returns arrays for utils.geometry.union_outline: unique vertices, unique
+    undirected edges (vertex index pairs) and, per polygon, the ids of the
+    edges on its rings in CSR form (lsoa_offsets / lsoa_edges).
+    """
+    geoms = np.asarray(geoms)
+    parts, part_geom = shapely.get_parts(geoms, return_index=True)
+    rings, ring_part = shapely.get_rings(parts, return_index=True)
+    coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+
+    # consecutive coordinates on the same ring form an edge (rings are closed)
+    same_ring = coord_ring[:-1] == coord_ring[1:]
+    start = np.flatnonzero(same_ring)
+
+    quantised = np.round(coords / precision).astype(np.int64)
+    uniq, vertex_id = np.unique(quantised, axis=0, return_inverse=True)
+    vertex_id = vertex_id.ravel()
+
+    a, b = vertex_id[start], vertex_id[start + 1]
+    keep = a != b
+    a, b, start = a[keep], b[keep], start[keep]
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+
+    key = lo * len(uniq) + hi
+    edge_keys, edge_id = np.unique(key, return_inverse=True)
+    edges = np.column_stack((edge_keys // len(uniq), edge_keys % len(uniq)))
+
+    owner = part_geom[ring_part[coord_ring[start]]]
+    order = np.argsort(owner, kind='stable')
+    counts = np.bincount(owner, minlength=len(geoms))
+
+    return {
+        'vertices': (uniq * precision).astype(np.float64),
+        'edges': edges.astype(np.int32),
+        'lsoa_offsets': np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        'lsoa_edges': edge_id.ravel()[order].astype(np.int32),
+    }
+
+
+def geometry_fingerprint(frame, geoms):
+    """Hash of a layer's shapes and descriptive columns (ids, names, bounds).
+
+    Releases built on the same boundaries get the same fingerprint, so the app
+    can share one copy of the geometry between them.
+    """
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    for wkb in shapely.to_wkb(np.asarray(geoms)):
+        h.update(wkb)
+    return h.hexdigest()[:12]
+
+
+def build_arcs(geoms, precision=EDGE_PRECISION):
+    """Split a polygon layer's rings into shared arcs (TopoJSON style).
+
+    Arcs break at junctions, vertices with other than two neighbours, so a
+    boundary shared by two polygons is one arc used by both. Returns the
+    arcs (vertex-index paths into `vertices`), every ring as a list of
+    (arc, reversed) pairs, and the ring -> part -> geometry structure.
+    """
+    geoms = np.asarray(geoms)
+    parts, part_geom = shapely.get_parts(geoms, return_index=True)
+    rings, ring_part = shapely.get_rings(parts, return_index=True)
+    coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+
+    quantised = np.round(coords / precision).astype(np.int64)
+    uniq, vertex_id = np.unique(quantised, axis=0, return_inverse=True)
+    vertex_id = vertex_id.ravel()
+
+    # neighbour count of every vertex over the unique undirected edges
+    same_ring = coord_ring[:-1] == coord_ring[1:]
+    a, b = vertex_id[:-1][same_ring], vertex_id[1:][same_ring]
+    keep = a != b
+    lo, hi = np.minimum(a[keep], b[keep]), np.maximum(a[keep], b[keep])
+    pairs = np.unique(lo * len(uniq) + hi)
+    degree = np.bincount(np.concatenate((pairs // len(uniq), pairs % len(uniq))), minlength=len(uniq))
+    junction = degree != 2
+
+    arcs, arc_index, ring_arcs = [], {}, []
+    bounds = np.flatnonzero(np.diff(coord_ring, prepend=-1, append=len(rings)))
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        ring = vertex_id[start:stop - 1]  # drop the closing vertex
+        ring = ring[np.concatenate(([True], ring[1:] != ring[:-1]))]
+        if len(ring) > 1 and ring[0] == ring[-1]:
+            ring = ring[:-1]
+        cuts = np.flatnonzero(junction[ring])
+        if cuts.size == 0:
+            # a ring touching nothing else (island, enclave): one closed arc,
+            # rotated to a canonical start so both sides of an enclave agree
+            first = int(np.argmin(ring))
+            ring = np.concatenate((ring[first:], ring[:first]))
+            paths = [np.concatenate((ring, ring[:1]))]
+        else:
+            ring = np.concatenate((ring[cuts[0]:], ring[:cuts[0]]))
+            cuts = np.append(cuts - cuts[0], len(ring))
+            closed = np.concatenate((ring, ring[:1]))
+            paths = [closed[c0:c1 + 1] for c0, c1 in zip(cuts[:-1], cuts[1:])]
+
+        refs = []
+        for path in paths:
+            fwd, rev = tuple(path.tolist()), tuple(path[::-1].tolist())
+            key = min(fwd, rev)
+            k = arc_index.get(key)
+            if k is None:
+                k = arc_index[key] = len(arcs)
+                arcs.append(np.asarray(key, dtype=np.int64))
+            refs.append((k, key != fwd))
+        ring_arcs.append(refs)
+
+    return {
+        'vertices': uniq * precision,
+        'arcs': arcs,
+        'ring_arcs': ring_arcs,
+        'ring_part': ring_part,
+        'part_geom': part_geom,
+        'n_geoms': len(geoms),
+    }
+
+
+def _ring_coords(refs, arc_coords):
+    pieces = []
+    for k, reverse in refs:
+        c = arc_coords[k][::-1] if reverse else arc_coords[k]
+        pieces.append(c if not pieces else c[1:])
+    return np.concatenate(pieces)
+
+
+def simplify_arcs(topology, tolerance):
+    """Douglas-Peucker on every shared arc; a list of (n, 2) coordinate arrays.
+
+    Neighbours simplify their common boundary identically, so the result
+    has no gaps or slivers between them. Rings that would collapse keep
+    their arcs at full resolution.
+    """
+    vertices = topology['vertices']
+    full = [vertices[arc] for arc in topology['arcs']]
+    if not tolerance:
+        return full
+    lengths = [len(arc) for arc in topology['arcs']]
+    lines = shapely.linestrings(
+        vertices[np.concatenate(topology['arcs'])], indices=np.repeat(np.arange(len(lengths)), lengths),
+    )
+    simplified = [shapely.get_coordinates(g) for g in shapely.simplify(lines, tolerance, preserve_topology=False)]
+
+    for _ in range(3):
+        collapsed = [refs for refs in topology['ring_arcs'] if len(_ring_coords(refs, simplified)) < 4]
+        if not collapsed:
+            break
+        for refs in collapsed:
+            for k, _ in refs:
+                simplified[k] = full[k]
+    return simplified
+
+
+def _geometry_parts(topology):
+    # [[ring indices of each part] for each geometry]; first ring of a part is its shell
+    ring_part, part_geom = topology['ring_part'], topology['part_geom']
+    part_rings = [[] for _ in range(len(part_geom))]
+    for ring, part in enumerate(ring_part.tolist()):
+        part_rings[part].append(ring)
+    geom_parts = [[] for _ in range(topology['n_geoms'])]
+    for part, g in enumerate(part_geom.tolist()):
+        geom_parts[g].append(part_rings[part])
+    return geom_parts
+
+
+def simplify_topology(topology, tolerance):
+    """Polygons rebuilt from simplify_arcs(), one per input geometry."""
+    return polygons_from_arcs(topology, simplify_arcs(topology, tolerance))
+
+
+def polygons_from_arcs(topology, arc_coords):
+    rings = [shapely.linearrings(_ring_coords(refs, arc_coords)) for refs in topology['ring_arcs']]
+    out = []
+    for parts in _geometry_parts(topology):
+        polygons = [shapely.polygons(rings[idx[0]], [rings[i] for i in idx[1:]] or None) for idx in parts]
+        out.append(polygons[0] if len(polygons) == 1 else shapely.multipolygons(polygons))
+    return np.asarray(out, dtype=object)
+
+
+def encode_topojson(topology, arc_coords, ids, name, step):
+    """Serialise polygons as quantised TopoJSON (compact json bytes).
+
+    Shared boundaries are stored once as arcs, snapped to a grid of `step`
+    degrees and delta-encoded, so most coordinates are small integers. Each
+    geometry carries {'id': ...} like the geojson features plotly joins on.
+    """
+    flat = np.concatenate(arc_coords)
+    translate = flat.min(axis=0)
+    arcs = []
+    for coords in arc_coords:
+        q = np.round((coords - translate) / step).astype(np.int64)
+        # drop points the grid merged, keeping both ends
+        keep = np.concatenate(([True], (q[1:] != q[:-1]).any(axis=1)))
+        keep[-1] = True
+        q = q[keep]
+        arcs.append(np.concatenate((q[:1], np.diff(q, axis=0))).tolist())
+
+    def ref(k, reverse):
+        return ~k if reverse else k
+
+    ring_refs = [[ref(k, rev) for k, rev in refs] for refs in topology['ring_arcs']]
+    geometries = []
+    for fid, parts in zip(ids, _geometry_parts(topology)):
+        polygons = [[ring_refs[i] for i in idx] for idx in parts]
+        geometry = {'type': 'Polygon', 'arcs': polygons[0]} if len(polygons) == 1 else \
+            {'type': 'MultiPolygon', 'arcs': polygons}
+        geometries.append({**geometry, 'properties': {'id': fid}})
+
+    topo = {
+        'type': 'Topology',
+        'transform': {'scale': [step, step], 'translate': translate.tolist()},
+        'objects': {name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': arcs,
+    }
+    return json.dumps(topo, separators=(',', ':')).encode()
@@ -0,0 +1,132 @@
+# utils/hexgrid.py
+#
+# regular hexagon grids over the LSOA layer, a middle ground between LAD
+# ranks and 33k LSOA polygons. hexes are regular in web mercator, so they look
+# regular on the map; each LSOA belongs to the hex holding its point
+# (utils.geometry.area_points), and hex values are aggregated from the LSOA
+# deciles (utils.indicators.LsoaGroups). numpy only, built lazily per snapshot.
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from utils.geometry import NATIONAL_ZOOM, area_points
+from utils.indicators import LsoaGroups
+from utils.shared_data import InMemoryJSON
+
+# hex circumradius per resolution, web mercator metres (~0.6x that on the
+# ground in England), coarsest first
+HEX_SIZES = (24000, 12000, 6000)
+
+# finest resolution whose hexes are at least this many pixels across (radius)
+HEX_MIN_PX = 8
+
+# LSOAs whose PPFI and IMD combined deciles differ by this much or more count
+# as mismatched (moderately or strongly misaligned)
+MISMATCH_DECILES = 2
+
+EARTH_RADIUS = 6378137.0
+SQRT3 = math.sqrt(3)
+
+
+def hex_resolution(zoom):
+    """Index into HEX_SIZES for a mapbox zoom (512px tiles)."""
+    zoom = NATIONAL_ZOOM if zoom is None else zoom
+    metres_per_px = 2 * math.pi * EARTH_RADIUS / (512 * 2 ** zoom)
+    resolution = 0
+    for k, size in enumerate(HEX_SIZES):
+        if size / metres_per_px >= HEX_MIN_PX:
+            resolution = k
+    return resolution
+
+
+def _to_mercator(lon, lat):
+    x = np.radians(lon) * EARTH_RADIUS
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * EARTH_RADIUS
+    return x, y
+
+
+def _from_mercator(x, y):
+    lon = np.degrees(x / EARTH_RADIUS)
+    lat = np.degrees(2 * np.arctan(np.exp(y / EARTH_RADIUS)) - np.pi / 2)
+    return lon, lat
+
+
+def _axial(x, y, size):
+    # pointy-top axial coordinates of the hex holding each point (cube rounding)
+    qf = (SQRT3 / 3 * x - y / 3) / size
+    rf = (2 / 3 * y) / size
+    sf = -qf - rf
+    q, r, s = np.rint(qf), np.rint(rf), np.rint(sf)
+    dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s - sf)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    q = np.where(fix_q, -r - s, q)
+    r = np.where(fix_r, -q - s, r)
+    return q.astype(np.int64), r.astype(np.int64)
+
+
+def _hex_rings(q, r, size):
+    # (n, 7, 2) closed lon/lat rings of the hexes at axial (q, r)
+    cx = size * SQRT3 * (q + r / 2)
+    cy = size * 1.5 * r
+    angles = np.radians(30 + 60 * np.arange(7))
+    x = cx[:, None] + size * np.cos(angles)[None, :]
+    y = cy[:, None] + size * np.sin(angles)[None, :]
+    lon, lat = _from_mercator(x, y)
+    return np.stack((lon, lat), axis=-1)
+
+
+class HexGrid(LsoaGroups):
+    """One hex resolution: LSOA -> cell, per-cell frame and geometry.
+
+    Only cells holding at least one LSOA exist. `frame` has the id plotly
+    joins on, a name (the LAD most of the cell's LSOAs are in) and the LSOA
+    count; `geojson` is their polygons in the same form as get_geojson().
+    """
+
+    def __init__(self, lsoa_frame, size, lad_names=None, lad_col='lad_cd'):
+        self.size = size
+        lon, lat = area_points(lsoa_frame)
+        ok = np.isfinite(lon) & np.isfinite(lat)
+        q, r = _axial(*_to_mercator(lon[ok], lat[ok]), size)
+        cells, inverse = np.unique(np.column_stack((q, r)), axis=0, return_inverse=True)
+        cell = np.full(len(lsoa_frame), -1, dtype=np.int64)
+        cell[ok] = inverse.ravel()
+        super().__init__(cell, len(cells))
+
+        # majority LAD of each cell, for its label
+        names = [''] * len(cells)
+        if lad_col in lsoa_frame.columns:
+            codes, lads = pd.factorize(lsoa_frame[lad_col].to_numpy()[ok])
+            if len(lads):
+                known = codes >= 0
+                pairs, votes = np.unique(self.group[ok][known] * len(lads) + codes[known], return_counts=True)
+                order = np.lexsort((-votes, pairs // len(lads)))
+                top = pairs[order]
+                first = np.concatenate(([True], top[1:] // len(lads) != top[:-1] // len(lads)))
+                lad_names = lad_names or {}
+                for key in top[first].tolist():
+                    lad = lads[key % len(lads)]
+                    names[key // len(lads)] = str(lad_names.get(lad, lad))
+
+        km = f'{size / 1000:g}km'
+        ids = [f'{km}_{a}_{b}' for a, b in cells.tolist()]
+        self.frame = pd.DataFrame({
+            'id': ids,
+            'name': [f'Area around {n}' if n else 'Hex area' for n in names],
+            'lsoa_count': self.counts,
+        })
+        rings = np.round(_hex_rings(cells[:, 0], cells[:, 1], size), 6).tolist()
+        self.geojson = InMemoryJSON({
+            'type': 'FeatureCollection',
+            'features': [
+                {'type': 'Feature', 'properties': {'id': fid}, 'geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+                for fid, ring in zip(ids, rings)
+            ],
+        })
+
+    @property
+    def nbytes(self):
+        return super().nbytes + int(self.frame.memory_usage(deep=True).sum())
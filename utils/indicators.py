@@ -0,0 +1,166 @@
+# utils/indicators.py
+#
+# compact storage for the ppfi/imd decile and rank columns: one small-int
+# matrix per geography (rows = areas, columns = indicators) instead of a wide
+# float64 frame. missing values are stored as 0, which no decile or rank uses.
+
+import numpy as np
+import pandas as pd
+
+from utils.constants import (
+    PPFI_DOMAINS_LSOA, IMD_DOMAINS_LSOA,
+    PPFI_DOMAINS_LAD,  IMD_DOMAINS_LAD,
+)
+from utils.geometry import BOUNDS_COLS, POINT_COLS
+from utils.shared_data import resident_nbytes
+
+MISSING = 0
+
+# column order follows the domain dicts, so lookups stay in sync with them
+LSOA_INDICATORS = list(dict.fromkeys([*PPFI_DOMAINS_LSOA.values(), *IMD_DOMAINS_LSOA.values()]))
+LAD_INDICATORS  = list(dict.fromkeys([*PPFI_DOMAINS_LAD.values(), *IMD_DOMAINS_LAD.values()]))
+
+
+def _smallest_int_dtype(max_value):
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class IndicatorMatrix:
+    def __init__(self, values, columns, ids, float_columns=None):
+        self.values = values
+        self.columns = {col: j for j, col in enumerate(columns)}
+        self.ids = np.asarray(ids, dtype=object)
+        self._index = pd.Index(self.ids)
+        # integer columns without gaps come back as ints, like pandas loaded them.
+        # a prebuilt artifact passes the list so the (mapped) values are not scanned
+        if float_columns is None:
+            float_columns = [c for c, j in self.columns.items() if (values[:, j] == MISSING).any()]
+        self._as_float = np.isin(list(self.columns), list(float_columns))
+
+    @classmethod
+    def from_frame(cls, frame, columns, id_col='id'):
+        columns = [c for c in columns if c in frame.columns]
+        raw = frame[columns].to_numpy(dtype=np.float64, na_value=np.nan) if columns else np.empty((len(frame), 0))
+        top = np.nanmax(raw) if np.isfinite(raw).any() else 0
+        values = np.where(np.isfinite(raw), np.rint(raw), MISSING).astype(_smallest_int_dtype(top))
+        float_columns = [
+            c for j, c in enumerate(columns)
+            if frame[c].dtype.kind == 'f' or (values[:, j] == MISSING).any()
+        ]
+        return cls(np.ascontiguousarray(values), columns, frame[id_col].to_numpy(), float_columns)
+
+    def __contains__(self, col):
+        return col in self.columns
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        return resident_nbytes(self.values)
+
+    @property
+    def float_columns(self):
+        return [c for c, j in self.columns.items() if self._as_float[j]]
+
+    def raw(self, col, rows=None):
+        v = self.values[:, self.columns[col]]
+        return v if rows is None else v[rows]
+
+    def column(self, col, rows=None):
+        # int64, or float64 with nan when the column has gaps -- the same
+        # dtypes pd.to_numeric gave the old wide frame
+        v = self.raw(col, rows)
+        if not self._as_float[self.columns[col]]:
+            return v.astype(np.int64)
+        return np.where(v == MISSING, np.nan, v.astype(np.float64))
+
+    def isin(self, col, allowed, rows=None):
+        return np.isin(self.raw(col, rows), [a for a in allowed if a != MISSING])
+
+    def at_most(self, col, limit, rows=None):
+        v = self.raw(col, rows)
+        return (v != MISSING) & (v <= limit)
+
+    def max(self, col, rows=None):
+        v = self.raw(col, rows)
+        v = v[v != MISSING]
+        return int(v.max()) if v.size else None
+
+    def rows_for_ids(self, ids):
+        return self._index.get_indexer(ids)
+
+    def frame(self, cols, rows=None):
+        index = rows if rows is not None else np.arange(len(self))
+        return pd.DataFrame({c: self.column(c, rows) for c in cols if c in self}, index=index)
+
+
+def split_indicators(frame, columns):
+    """Move indicator columns into an IndicatorMatrix and keep only the
+    descriptive columns (ids, names, lad code, bounds) in the frame."""
+    matrix = IndicatorMatrix.from_frame(frame, columns)
+    numeric = frame.select_dtypes(include='number').columns
+    keep = [
+        c for c in frame.columns
+        if c not in matrix and (c not in numeric or c in (*BOUNDS_COLS, *POINT_COLS, 'center_lon', 'center_lat', 'zoom'))
+    ]
+    slim = pd.DataFrame(frame[keep]).reset_index(drop=True)
+    return slim, matrix
+
+
+class LsoaGroups:
+    """Assignment of LSOA rows to coarser areas (hexes, wards), with the
+    per-area reductions of LSOA deciles done as bincounts.
+
+    `group` is row-aligned with the LSOA layer, -1 for rows in no area.
+    """
+
+    def __init__(self, group, n_groups):
+        self.group = np.asarray(group, dtype=np.int64)
+        self.n_groups = int(n_groups)
+        member = self.group >= 0
+        self.counts = np.bincount(self.group[member], minlength=self.n_groups)
+        rows = np.flatnonzero(member)
+        self._order = rows[np.argsort(self.group[rows], kind='stable')]
+        self._offsets = np.concatenate(([0], np.cumsum(self.counts)))
+
+    @classmethod
+    def from_codes(cls, codes, ids):
+        """Groups from each LSOA's area code and the area layer's ids."""
+        index = pd.Index(np.asarray(ids, dtype=object))
+        return cls(index.get_indexer(pd.Series(codes, dtype=object).fillna('').astype(str)), len(index))
+
+    def __len__(self):
+        return self.n_groups
+
+    @property
+    def nbytes(self):
+        return self.group.nbytes + self.counts.nbytes + self._order.nbytes + self._offsets.nbytes
+
+    def rows(self, k):
+        """LSOA rows of area k."""
+        return self._order[self._offsets[k]:self._offsets[k + 1]]
+
+    def aggregate(self, values):
+        """(mean, modal) decile per area of an LSOA-aligned decile column;
+        nan where an area has no value. Ties go to the lower decile."""
+        values = np.asarray(values, dtype=np.float64)
+        ok = (self.group >= 0) & np.isfinite(values)
+        group, v = self.group[ok], values[ok]
+        m = self.n_groups
+        n = np.bincount(group, minlength=m)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.bincount(group, weights=v, minlength=m) / n
+        deciles = np.clip(np.rint(v).astype(np.int64), 0, 10)
+        table = np.bincount(group * 11 + deciles, minlength=m * 11).reshape(m, 11)
+        mode = np.where(n > 0, table.argmax(axis=1), np.nan)
+        return mean, mode
+
+    def share(self, mask):
+        """Share of each area's LSOAs for which the LSOA-aligned mask holds."""
+        hits = np.bincount(self.group[(self.group >= 0) & np.asarray(mask, dtype=bool)], minlength=self.n_groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return hits / self.counts
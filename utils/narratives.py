@@ -0,0 +1,249 @@
+# utils/narratives.py
+#
+# the divergence/alignment narrative of the single-map hover. hover_narrative
+# words it for one area; layer_narratives gives every area of a layer at
+# once: the diff band is classified with np.select and the domains each
+# sentence names are picked by argsort, which turns every area into a small
+# key. only one area per distinct key is worded, so a national LSOA layer
+# takes a few thousand sentences instead of 33k row dicts. data.py caches the
+# result per snapshot. tests/test_narratives.py checks the words match
+# hover_narrative row by row; benchmarks/narratives.py times both.
+
+import numpy as np
+
+from utils.constants import PPFI_LSOA_DOMAIN_LABELS, IMD_LSOA_DOMAIN_LABELS
+
+# lsoa diff bands (diff = ppfi decile - imd decile)
+IMD_FAR_WORSE, PPFI_FAR_WORSE, AGREE, IMD_WORSE, PPFI_WORSE = range(5)
+
+# a domain decile this low counts as a driver of the score
+DRIVER_DECILE = 3
+
+COMBINED_COLUMNS = {'lsoa': ('pp_dec_combined', 'imd_decile'), 'lad': ('combined', 'imd_rank')}
+
+
+def _join_labels(labels):
+    if len(labels) == 1: return f"'{labels[0]}'"
+    if len(labels) == 2: return f"'{labels[0]}' and '{labels[1]}'"
+    return ', '.join(f"'{l}'" for l in labels[:-1]) + f" and '{labels[-1]}'"
+
+
+def hover_narrative(row, geography: str, n_lad: int = 0) -> str:
+    """Plain-text divergence/alignment narrative for single-map hover tooltips.
+    Returns <br>-joined sentences for Plotly rendering.
+    LSOA: decile scale (1 = most deprived / highest priority, 10 = least).
+    LAD:  rank scale  (1 = most deprived / highest priority, higher = less)."""
+    try:
+        diff     = float(row.get('diff') or 0)
+        ppfi_val = row.get('ppfi_combined')
+        imd_val  = row.get('imd_combined')
+    except (TypeError, ValueError):
+        return ''
+    if ppfi_val is None or imd_val is None:
+        return ''
+
+    ppfi_int = int(ppfi_val)
+    imd_int  = int(imd_val)
+    abs_diff = abs(diff)
+    lines    = []
+
+    if geography == 'lsoa':
+        # ── LSOA: decile thresholds (1–10) ────────────────────────────────────
+        # diff = ppfi_decile − imd_decile
+        # diff > 0 → ppfi_decile larger (lower food priority) + imd_decile smaller (more deprived)
+        #           → IMD shows greater deprivation than PPFI shows food priority
+        # diff < 0 → ppfi_decile smaller (higher food priority) + imd_decile larger (less deprived)
+        #           → PPFI shows greater food vulnerability than IMD shows deprivation
+        if diff > 3:
+            lines.append(
+                f'IMD decile {imd_int} (1 = most deprived) indicates significantly greater '
+                f'deprivation than PPFI decile {ppfi_int} (1 = highest priority) indicates '
+                'food vulnerability for this area.'
+            )
+            ppfi_vals = {col: row[col] for col, _ in PPFI_LSOA_DOMAIN_LABELS if row.get(col) is not None}
+            if ppfi_vals:
+                best2  = sorted(ppfi_vals.items(), key=lambda x: -x[1])[:2]
+                labels = [lbl for col, lbl in PPFI_LSOA_DOMAIN_LABELS if col in dict(best2)]
+                if labels:
+                    lines.append(
+                        f'Relatively better PPFI performance on {_join_labels(labels)} '
+                        'may be cushioning the overall PPFI food priority score.'
+                    )
+            imd_vals = {col: row[col] for col, _ in IMD_LSOA_DOMAIN_LABELS if row.get(col) is not None}
+            if imd_vals:
+                worst = [lbl for col, lbl in IMD_LSOA_DOMAIN_LABELS
+                         if imd_vals.get(col) is not None and imd_vals[col] <= 3]
+                if not worst:
+                    top2  = sorted(imd_vals.items(), key=lambda x: x[1])[:2]
+                    worst = [lbl for col, lbl in IMD_LSOA_DOMAIN_LABELS if col in dict(top2)]
+                if worst:
+                    lines.append(
+                        f'IMD score driven primarily by {_join_labels(worst)}, '
+                        'which are distinct from food access indicators.'
+                    )
+
+        elif diff < -3:
+            lines.append(
+                f'PPFI decile {ppfi_int} (1 = highest priority) indicates significantly '
+                f'greater food vulnerability than IMD decile {imd_int} (1 = most deprived) '
+                'indicates general deprivation for this area.'
+            )
+            ppfi_vals = {col: row[col] for col, _ in PPFI_LSOA_DOMAIN_LABELS if row.get(col) is not None}
+            if ppfi_vals:
+                worst = [lbl for col, lbl in PPFI_LSOA_DOMAIN_LABELS
+                         if ppfi_vals.get(col) is not None and ppfi_vals[col] <= 3]
+                if not worst:
+                    top2  = sorted(ppfi_vals.items(), key=lambda x: x[1])[:2]
+                    worst = [lbl for col, lbl in PPFI_LSOA_DOMAIN_LABELS if col in dict(top2)]
+                if worst:
+                    lines.append(
+                        f'PPFI score particularly driven by {_join_labels(worst)}, '
+                        'reflecting food access challenges not captured by IMD.'
+                    )
+
+        elif abs_diff <= 1:
+            lines.append(
+                f'IMD decile {imd_int} and PPFI decile {ppfi_int} closely agree for this area '
+                '(decile 1 = most deprived / highest priority). Both indices tell a consistent story.'
+            )
+
+        else:
+            if diff > 0:
+                lines.append(
+                    f'IMD decile {imd_int} (1 = most deprived) indicates more deprivation than '
+                    f'PPFI decile {ppfi_int} (1 = highest priority) indicates food vulnerability '
+                    f'({abs_diff:.0f} decile gap).'
+                )
+            else:
+                lines.append(
+                    f'PPFI decile {ppfi_int} (1 = highest priority) indicates greater food '
+                    f'vulnerability than IMD decile {imd_int} (1 = most deprived) indicates '
+                    f'general deprivation ({abs_diff:.0f} decile gap).'
+                )
+
+    else:
+        # ── LAD: rank scale ────────────────────────────────────────────────────
+        # diff = ppfi_rank − imd_rank
+        # diff > 0 → ppfi_rank larger (lower food priority) + imd_rank smaller (more deprived)
+        #           → IMD ranks area as more deprived than PPFI ranks it as a food priority
+        # diff < 0 → ppfi_rank smaller (higher food priority) + imd_rank larger (less deprived)
+        #           → PPFI ranks area as higher food priority than IMD ranks it as deprived
+        slight_thr   = max(1, int(round(0.10 * n_lad))) if n_lad else 10
+        moderate_thr = max(slight_thr + 1, int(round(0.25 * n_lad))) if n_lad else 25
+
+        if diff > moderate_thr:
+            lines.append(
+                f'IMD rank {imd_int} (1 = most deprived) indicates significantly greater '
+                f'deprivation than PPFI rank {ppfi_int} (1 = highest priority) indicates '
+                'food vulnerability for this local authority.'
+            )
+        elif diff < -moderate_thr:
+            lines.append(
+                f'PPFI rank {ppfi_int} (1 = highest priority) indicates significantly greater '
+                f'food vulnerability than IMD rank {imd_int} (1 = most deprived) indicates '
+                'general deprivation for this local authority.'
+            )
+        elif abs_diff <= slight_thr:
+            lines.append(
+                f'IMD rank {imd_int} and PPFI rank {ppfi_int} closely agree for this local authority '
+                '(rank 1 = most deprived / highest priority).'
+            )
+        else:
+            if diff > 0:
+                lines.append(
+                    f'IMD rank {imd_int} (1 = most deprived) indicates more deprivation than '
+                    f'PPFI rank {ppfi_int} (1 = highest priority) indicates food vulnerability.'
+                )
+            else:
+                lines.append(
+                    f'PPFI rank {ppfi_int} (1 = highest priority) indicates greater food '
+                    f'vulnerability than IMD rank {imd_int} (1 = most deprived) indicates '
+                    'general deprivation.'
+                )
+
+    return '<br>'.join(lines)
+
+
+def _domain_values(matrix, labels):
+    # (n, k) float, nan where the domain is missing (or not in the data)
+    columns = [matrix.column(col).astype(np.float64) if col in matrix else np.full(len(matrix), np.nan)
+               for col, _ in labels]
+    return np.column_stack(columns) if columns else np.empty((len(matrix), 0))
+
+
+def _pick_mask(order, values, n=2):
+    # bitmask (bit j = domain j) of the first n domains in `order` that have a value
+    picked = order[:, :n]
+    present = np.isfinite(np.take_along_axis(values, picked, axis=1))
+    return ((1 << picked) * present).sum(axis=1)
+
+
+def _best_mask(values):
+    # the two highest deciles; a stable sort breaks ties by domain order, like sorted()
+    key = np.where(np.isfinite(values), -values, np.inf)
+    return _pick_mask(np.argsort(key, axis=1, kind='stable'), values)
+
+
+def _driver_mask(values):
+    # domains at DRIVER_DECILE or below, else the two lowest deciles
+    low = np.isfinite(values) & (values <= DRIVER_DECILE)
+    drivers = (low * (1 << np.arange(values.shape[1]))).sum(axis=1)
+    key = np.where(np.isfinite(values), values, np.inf)
+    return np.where(drivers > 0, drivers, _pick_mask(np.argsort(key, axis=1, kind='stable'), values))
+
+
+def _lsoa_keys(ppfi, imd, matrix):
+    diff = ppfi - imd
+    band = np.select(
+        [diff > 3, diff < -3, np.abs(diff) <= 1, diff > 0],
+        [IMD_FAR_WORSE, PPFI_FAR_WORSE, AGREE, IMD_WORSE],
+        default=PPFI_WORSE,
+    )
+    ppfi_domains = _domain_values(matrix, PPFI_LSOA_DOMAIN_LABELS)
+    imd_domains = _domain_values(matrix, IMD_LSOA_DOMAIN_LABELS)
+    # which domains the second and third sentences name; 0 where a band has none
+    first = np.zeros(len(ppfi), dtype=np.int64)
+    second = np.zeros(len(ppfi), dtype=np.int64)
+    far_imd, far_ppfi = band == IMD_FAR_WORSE, band == PPFI_FAR_WORSE
+    first[far_imd] = _best_mask(ppfi_domains[far_imd])
+    second[far_imd] = _driver_mask(imd_domains[far_imd])
+    first[far_ppfi] = _driver_mask(ppfi_domains[far_ppfi])
+    return np.column_stack([band, ppfi, imd, first, second])
+
+
+def _row(columns, i):
+    # the row dict hover_narrative takes, missing values left out
+    row = {col: values[i] for col, values in columns.items() if values[i] == values[i]}
+    row['diff'] = row['ppfi_combined'] - row['imd_combined']
+    return row
+
+
+def layer_narratives(matrix, geography):
+    """hover_narrative of every area of a layer, row-aligned with its
+    IndicatorMatrix (object array, '' where a combined value is missing)."""
+    ppfi_col, imd_col = COMBINED_COLUMNS[geography]
+    out = np.full(len(matrix), '', dtype=object)
+    if ppfi_col not in matrix or imd_col not in matrix:
+        return out
+    ppfi = matrix.column(ppfi_col).astype(np.float64)
+    imd = matrix.column(imd_col).astype(np.float64)
+    valid = np.flatnonzero(np.isfinite(ppfi) & np.isfinite(imd))
+    if not valid.size:
+        return out
+
+    # areas with the same key get the same words
+    keys = _lsoa_keys(ppfi, imd, matrix)[valid] if geography == 'lsoa' else np.column_stack([ppfi, imd])[valid]
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    columns = {'ppfi_combined': ppfi, 'imd_combined': imd}
+    if geography == 'lsoa':
+        for col, _ in PPFI_LSOA_DOMAIN_LABELS + IMD_LSOA_DOMAIN_LABELS:
+            if col in matrix:
+                columns[col] = matrix.column(col).astype(np.float64)
+    n_lad = len(matrix) if geography == 'lad' else 0
+    # python floats index and compare far faster than numpy scalars
+    columns = {col: values.tolist() for col, values in columns.items()}
+    texts = np.array([hover_narrative(_row(columns, i), geography, n_lad) for i in valid[first].tolist()],
+                     dtype=object)
+    out[valid] = texts[inverse.ravel()]
+    return out
+
@@ -0,0 +1,151 @@
+# utils/profiling.py
+#
+# lightweight startup instrumentation. wrap a block in `phase(name)` to record
+# wall time, cpu time of the running thread and the process rss delta. the
+# report keeps the first MAX_PHASES records, which covers startup; data
+# loaded lazily much later (pyramid levels, releases, reloads) only counts
+# past that, so a long-lived worker doesn't grow it.
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('ppfi.startup')
+
+MAX_PHASES = 1000
+
+_lock = threading.Lock()
+_phases = []
+_dropped = 0
+_meta = {}
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@contextmanager
+def phase(name):
+    rss0  = _rss_bytes()
+    wall0 = time.perf_counter()
+    cpu0  = time.thread_time()
+    start = time.time()
+    record = {}
+    try:
+        yield record
+    finally:
+        rss1 = _rss_bytes()
+        record.update({
+            'phase': name,
+            'thread': threading.current_thread().name,
+            'start': round(start, 4),
+            'wall_s': round(time.perf_counter() - wall0, 4),
+            'cpu_s': round(time.thread_time() - cpu0, 4),
+            # process-wide, so phases running concurrently see each other's allocations
+            'rss_delta_bytes': (rss1 - rss0) if rss0 is not None and rss1 is not None else None,
+        })
+        global _dropped
+        with _lock:
+            if len(_phases) < MAX_PHASES:
+                _phases.append(record)
+            else:
+                _dropped += 1
+
+
+def set_meta(**kwargs):
+    with _lock:
+        _meta.update(kwargs)
+
+
+def startup_report():
+    with _lock:
+        phases = sorted(_phases, key=lambda r: r['start'])
+        meta = dict(_meta)
+        dropped = _dropped
+
+    total_wall = None
+    if phases:
+        total_wall = round(max(r['start'] + r['wall_s'] for r in phases) - phases[0]['start'], 4)
+
+    return {
+        'pid': os.getpid(),
+        **meta,
+        'total_wall_s': total_wall,
+        'rss_bytes': _rss_bytes(),
+        'peak_rss_bytes': _peak_rss_bytes(),
+        'phases': phases,
+        'dropped_phases': dropped,
+    }
+
+
+def process_memory(pid='self'):
+    """rss, pss and uss (private pages) of a process, in bytes.
+
+    uss is what the process would free on exit -- the number to watch per
+    gunicorn worker, since memory-mapped artifact pages show up in every
+    worker's rss but only once in the sum of their uss.
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) >= 3 and parts[1].isdigit():
+                    fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    except OSError:
+        return {'pid': pid, 'rss_bytes': _rss_bytes() if pid == 'self' else None}
+    return {
+        'pid': os.getpid() if pid == 'self' else int(pid),
+        'rss_bytes': fields.get('Rss'),
+        'pss_bytes': fields.get('Pss'),
+        'uss_bytes': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        'shared_bytes': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+    }
+
+
+def child_pids(pid):
+    children = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as fh:
+            children += [int(c) for c in fh.read().split()]
+    return children
+
+
+def log_phase(record):
+    # one line for one phase, e.g. a lazy load after startup
+    logger.info('phase %s', json.dumps(record, separators=(',', ':')))
+
+
+def log_startup_report():
+    report = startup_report()
+    logger.info('startup_report %s', json.dumps(report, separators=(',', ':')))
+    return report
+
+
+if __name__ == '__main__':
+    # per-worker memory of a running gunicorn: python -m utils.profiling <master pid>
+    master = int(sys.argv[1]) if len(sys.argv) > 1 else os.getpid()
+    rows = [process_memory(master)] + [process_memory(p) for p in child_pids(master)]
+    for row in rows:
+        print(json.dumps(row))
+    workers = rows[1:]
+    if workers:
+        total_uss = sum(r.get('uss_bytes') or 0 for r in workers)
+        total_pss = sum(r.get('pss_bytes') or 0 for r in workers)
+        print(f'{len(workers)} workers: uss {total_uss / 2**20:.1f} MiB total, '
+              f'{total_uss / len(workers) / 2**20:.1f} MiB per worker; pss {total_pss / 2**20:.1f} MiB total')
@@ -0,0 +1,141 @@
+# utils/releases.py
+#
+# registry of data releases (e.g. IMD 2019 vs 2025, PPFI v2.0 vs v2.1). the
+# default release is the artifact in data/build (utils.data, reloadable);
+# each folder under data/releases/ holding a built artifact is another one.
+# releases load lazily and stay in an lru under a byte budget. releases on the
+# same boundaries share their geometry (see _shared_geometry in
+# utils/data_loader.py), so switching mostly swaps the indicator matrices.
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from flask import g, has_request_context
+
+from utils import data
+from utils.data_loader import read_manifest
+
+logger = logging.getLogger('ppfi.releases')
+
+RELEASES_DIR    = os.environ.get('PPFI_RELEASES_DIR', 'data/releases')
+DEFAULT_RELEASE = 'default'
+
+
+def _budget_bytes():
+    try:
+        return int(float(os.environ.get('PPFI_RELEASE_BUDGET_MB', '2048')) * 2**20)
+    except ValueError:
+        return 2048 * 2**20
+
+
+class ReleaseRegistry:
+    def __init__(self, releases_dir=RELEASES_DIR, budget_bytes=None):
+        self.releases_dir = releases_dir
+        self.budget_bytes = _budget_bytes() if budget_bytes is None else budget_bytes
+        self._lock = threading.RLock()
+        self._resident = OrderedDict()  # name -> DataSnapshot, least recently used first
+        self._scan_key = None
+        self._manifests = {}
+
+    def _scan(self):
+        # rescanned only when the folder changes (a build swaps whole directories in)
+        try:
+            key = os.stat(self.releases_dir).st_mtime_ns
+        except FileNotFoundError:
+            key = None
+        if key != self._scan_key:
+            manifests = {}
+            if key is not None:
+                for name in sorted(os.listdir(self.releases_dir)):
+                    manifest = read_manifest(os.path.join(self.releases_dir, name))
+                    if manifest is not None and not name.startswith('.'):
+                        manifests[name] = manifest
+            self._manifests, self._scan_key = manifests, key
+        return self._manifests
+
+    def available(self):
+        """[(name, label)], default release first."""
+        with self._lock:
+            manifests = self._scan()
+        default = read_manifest(data.default_snapshot().artifact_dir) or {}
+        options = [(DEFAULT_RELEASE, default.get('release') or 'Current release')]
+        options += [(name, m.get('release') or name) for name, m in manifests.items()]
+        return options
+
+    def manifests(self):
+        """{name: manifest} of every release, default included (None when it
+        was loaded from the source files)."""
+        with self._lock:
+            manifests = dict(self._scan())
+        return {DEFAULT_RELEASE: read_manifest(data.default_snapshot().artifact_dir), **manifests}
+
+    def resident(self):
+        """{name: snapshot} of the releases in memory, default first, without
+        loading any or touching the lru."""
+        with self._lock:
+            return {DEFAULT_RELEASE: data.default_snapshot(), **self._resident}
+
+    def get(self, name):
+        if not name or name == DEFAULT_RELEASE:
+            return data.default_snapshot()
+        with self._lock:
+            manifest = self._scan().get(name)
+            if manifest is None:
+                raise KeyError(f'unknown data release {name!r}')
+            snap = self._resident.get(name)
+            if snap is None or snap.version != manifest.get('version'):
+                snap = data.DataSnapshot(os.path.join(self.releases_dir, name))
+                snap.on_load = self._enforce_budget
+                self._resident[name] = snap
+            self._resident.move_to_end(name)
+            return snap
+
+    def memory_bytes(self, snapshots=None):
+        # shared geometry is one object in several snapshots, count it once
+        objects = {}
+        for snap in snapshots if snapshots is not None else self._snapshots():
+            objects.update(snap.memory())
+        return sum(objects.values())
+
+    def _snapshots(self):
+        return [data.default_snapshot(), *self._resident.values()]
+
+    def _enforce_budget(self, loaded):
+        with self._lock:
+            while self.memory_bytes() > self.budget_bytes:
+                victim = next((n for n, s in self._resident.items() if s is not loaded), None)
+                if victim is None:
+                    break
+                # requests still holding it finish on it; memory goes with the last one
+                del self._resident[victim]
+                logger.info('evicted data release %s (budget %d bytes)', victim, self.budget_bytes)
+
+    def status(self):
+        with self._lock:
+            resident = {name: self.memory_bytes([snap]) for name, snap in self._resident.items()}
+            return {
+                'budget_bytes': self.budget_bytes,
+                'used_bytes': self.memory_bytes(),
+                'resident': resident,
+                'available': [name for name, _ in self.available()],
+            }
+
+
+registry = ReleaseRegistry()
+# loads into the default snapshot count against the budget too; a reload
+# carries the hook over to the snapshot it swaps in
+data.default_snapshot().on_load = registry._enforce_budget
+
+
+def use_release(name):
+    """Serve the rest of this request from the given release. Unknown names
+    (e.g. a release removed since the page loaded) fall back to the default."""
+    try:
+        snap = registry.get(name)
+    except KeyError:
+        snap = registry.get(DEFAULT_RELEASE)
+    if has_request_context():
+        g.ppfi_snapshot = snap
+    return snap
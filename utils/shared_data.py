@@ -0,0 +1,216 @@
+# utils/shared_data.py
+#
+# read-only memory-mapped artifact data. pages of a file mapped read-only are
+# backed by the page cache, so every gunicorn worker mapping the same artifact
+# shares one physical copy instead of holding its own.
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# python objects from json.loads take roughly this many times the text size
+# (measured on the lsoa geojson, where nearly everything is a float)
+PARSED_JSON_FACTOR = 2.5
+
+
+def encode_feature_collection(collection):
+    """Serialise a FeatureCollection exactly as json.dumps(compact) would,
+    plus a (n, 2) array of each feature's [start, end) byte span."""
+    shell = json.dumps({**collection, 'features': []}, separators=(',', ':')).encode()
+    head, tail = shell.split(b'"features":[]', 1)
+    head += b'"features":['
+    tail = b']' + tail
+
+    parts, spans, pos = [head], [], len(head)
+    for k, feature in enumerate(collection['features']):
+        if k:
+            parts.append(b',')
+            pos += 1
+        encoded = json.dumps(feature, separators=(',', ':')).encode()
+        parts.append(encoded)
+        spans.append((pos, pos + len(encoded)))
+        pos += len(encoded)
+    parts.append(tail)
+    return b''.join(parts), np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+
+
+class _FeatureBytes:
+    # subset FeatureCollections are cut from the serialised bytes, so no
+    # coordinates are ever encoded per request
+    spans = None
+
+    def subset(self, rows):
+        raw, spans = self.raw, self.spans
+        if len(spans) == 0:
+            return bytes(raw)
+        rows = np.asarray(rows, dtype=np.int64)
+        head = raw[:spans[0, 0]]
+        tail = raw[spans[-1, 1]:]
+        if rows.size and (np.diff(rows) == 1).all():
+            # a contiguous run (e.g. one LAD's LSOAs) is a single slice, separators included
+            body = raw[spans[rows[0], 0]:spans[rows[-1], 1]]
+        else:
+            body = b','.join([raw[start:end] for start, end in spans[rows].tolist()])
+        return b''.join([head, body, tail])
+
+
+class MappedFile:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fh:
+            stat = os.fstat(fh.fileno())
+            # which file was mapped, should another replace it at `path`
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            # the mapping stays valid after the file object is closed
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if _size(fh) else b''
+
+    @property
+    def raw(self):
+        return memoryview(self._mm)
+
+    def __len__(self):
+        return len(self._mm)
+
+    @property
+    def nbytes(self):
+        # mapped pages are page cache shared by every process, not ours
+        return 0
+
+    @property
+    def fingerprint(self):
+        # content hash, used in immutable urls for the bytes
+        if getattr(self, '_fingerprint', None) is None:
+            self._fingerprint = content_fingerprint(self.raw)
+        return self._fingerprint
+
+
+class MappedJSON(MappedFile, _FeatureBytes):
+    """Pre-serialised JSON on disk; parsed into Python objects on first use only."""
+
+    def __init__(self, path, spans=None):
+        super().__init__(path)
+        self._lock = threading.Lock()
+        self._data = None
+        self.spans = spans
+
+    @property
+    def data(self):
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = json.loads(self._mm[:])
+        return self._data
+
+    @property
+    def nbytes(self):
+        # only the parsed objects are private to this process
+        return int(len(self) * PARSED_JSON_FACTOR) if self._data is not None else 0
+
+
+class InMemoryJSON(_FeatureBytes):
+    """Same interface as MappedJSON for data built in-process (no artifact)."""
+
+    def __init__(self, data):
+        self.data = data
+        self._raw = None
+        self._spans = None
+
+    @property
+    def raw(self):
+        if self._raw is None:
+            if 'features' in self.data:
+                self._raw, self._spans = encode_feature_collection(self.data)
+            else:
+                self._raw = json.dumps(self.data, separators=(',', ':')).encode()
+        return memoryview(self._raw)
+
+    @property
+    def spans(self):
+        self.raw
+        return self._spans
+
+    def __len__(self):
+        return len(self.raw)
+
+    @property
+    def nbytes(self):
+        return int(len(self) * (1 + PARSED_JSON_FACTOR))
+
+    @property
+    def fingerprint(self):
+        if getattr(self, '_fingerprint', None) is None:
+            self._fingerprint = content_fingerprint(self.raw)
+        return self._fingerprint
+
+
+def content_fingerprint(raw):
+    # the fingerprint in a geometry url (routes/geometry_routes.py)
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def _size(fh):
+    fh.seek(0, 2)
+    return fh.tell()
+
+
+def load_array(path):
+    return np.load(path, mmap_mode='r')
+
+
+def load_table(path):
+    # arrow ipc read through a memory map; split_blocks lets numeric columns
+    # without nulls (and arrow-backed strings) stay views over the shared
+    # mapping, anything converted is a per-process copy
+    source = pa.memory_map(path)
+    mapped = source.read_buffer()
+    source.seek(0)
+    frame = feather.read_table(source).to_pandas(split_blocks=True)
+    # remember what the conversion copied out of the mapping
+    lo, hi = mapped.address, mapped.address + mapped.size
+    copied = int(frame.index.memory_usage(deep=True)) + sum(
+        int(column.memory_usage(index=False, deep=True))
+        for _, column in frame.items() if not _within(column.array, lo, hi)
+    )
+    _copied_bytes[id(frame)] = copied
+    weakref.finalize(frame, _copied_bytes.pop, id(frame), None)
+    return frame
+
+
+# id(frame) -> bytes of its own, for frames from load_table
+_copied_bytes = {}
+
+
+def resident_nbytes(obj):
+    """Bytes an array or frame holds privately in this process; views over a
+    memory map count as 0."""
+    if isinstance(obj, pd.DataFrame):
+        copied = _copied_bytes.get(id(obj))
+        return copied if copied is not None else int(obj.memory_usage(index=True, deep=True).sum())
+    base = obj
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return 0
+        base = getattr(base, 'base', None)
+    return obj.nbytes
+
+
+def _within(values, lo, hi):
+    if hasattr(values, '_pa_array'):
+        # arrow-backed column (e.g. strings): every buffer must be in the mapping
+        addresses = [
+            buf.address for chunk in values._pa_array.chunks for buf in chunk.buffers() if buf is not None
+        ]
+    else:
+        values = np.asarray(values)
+        if values.dtype == object:
+            return False
+        addresses = [values.__array_interface__['data'][0]]
+    return all(lo <= address < hi for address in addresses)
@@ -0,0 +1,287 @@
+# utils/tiles.py
+#
+# mapbox vector tiles (MVT 2.1) cut from the loaded map geometry, numpy only.
+# a tile holds one layer per colour class ('c0', 'c1', ...), since plotly's
+# mapbox layers take a single colour each; features carry {'id': <area id>}
+# like the geojson. tiles are rendered on first request and kept on disk
+# under PPFI_TILE_CACHE, keyed by data version, so every worker and restart
+# reuses them.
+
+import math
+import os
+
+import dash
+import numpy as np
+from flask import has_request_context, request
+
+from utils.compression import disk_cached
+from utils.data import current_snapshot, get_frame, get_geometry, get_topology, snapshot_cache
+from utils.geometry import decode_topojson, pyramid_level
+
+TILE_CACHE_DIR = os.environ.get('PPFI_TILE_CACHE', 'data/tiles')
+# the folder is pruned back to this, least recently written tiles first
+TILE_CACHE_BYTES = int(float(os.environ.get('PPFI_TILE_CACHE_MB', '1024')) * 2**20)
+TILE_PATH = '/_tiles/{version}/{geography}/{column}/{lo:g}_{hi:g}/{rows}/{{z}}/{{x}}/{{y}}.mvt'
+EXTENT = 4096
+BUFFER = 64
+# colour classes per geography: deciles map one to one, LAD ranks are binned
+TILE_CLASSES = {'lsoa': 10, 'lad': 20}
+MAX_ZOOM = 22
+
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+_POLYGON = 3
+
+
+def tiles_enabled():
+    return os.environ.get('PPFI_MAP_TILES', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def tile_url(geography, column, range_color, rows='all'):
+    """Url template ({z}/{x}/{y}) of the current snapshot's tiles for one
+    indicator column, coloured over range_color; `rows` is 'all' or an
+    encode_rows() token of the rows to draw."""
+    lo, hi = range_color
+    path = dash.get_relative_path(TILE_PATH.format(
+        version=current_snapshot().version, geography=geography, column=column, lo=lo, hi=hi, rows=rows,
+    ))
+    # mapbox-gl fetches tiles from a web worker, where relative urls do not resolve
+    if has_request_context():
+        return request.host_url.rstrip('/') + path
+    return path
+
+
+def class_values(values, range_color, n_classes):
+    # nearest of n evenly spaced stops over range_color; -1 where there is no value
+    lo, hi = range_color
+    values = np.asarray(values, dtype=np.float64)
+    span = (hi - lo) or 1.0
+    classes = np.rint((values - lo) / span * (n_classes - 1))
+    classes = np.clip(np.nan_to_num(classes, nan=-1), -1, n_classes - 1).astype(np.int64)
+    classes[np.isnan(values)] = -1
+    return classes
+
+
+def _mercator(lonlat):
+    # lon/lat -> world coordinates in [0, 1], y growing southwards
+    lon, lat = lonlat[:, 0], np.clip(lonlat[:, 1], -85.0511, 85.0511)
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / math.pi) / 2.0
+    return np.column_stack((x, y))
+
+
+class TileSource:
+    """One geometry level in world coordinates, in frame row order."""
+
+    def __init__(self, geometries):
+        coords, ring_lengths, ring_shell, feature_rings = [], [], [], []
+        for geometry in geometries:
+            polygons = []
+            if geometry is not None:
+                polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+            n = 0
+            for polygon in polygons:
+                for k, ring in enumerate(polygon):
+                    ring = np.asarray(ring, dtype=np.float64)[:-1]  # drop the closing point
+                    if len(ring) < 3:
+                        continue
+                    coords.append(ring)
+                    ring_lengths.append(len(ring))
+                    ring_shell.append(k == 0)
+                    n += 1
+            feature_rings.append(n)
+
+        self.coords = _mercator(np.concatenate(coords)) if coords else np.empty((0, 2))
+        self.ring_offsets = np.concatenate(([0], np.cumsum(ring_lengths))).astype(np.int64)
+        self.ring_shell = np.asarray(ring_shell, dtype=bool)
+        self.feature_rings = np.concatenate(([0], np.cumsum(feature_rings))).astype(np.int64)
+
+        n_features = len(feature_rings)
+        ring_feature = np.repeat(np.arange(n_features), feature_rings)
+        self.bbox = np.full((n_features, 4), np.nan)
+        if len(ring_lengths):
+            point_feature = np.repeat(ring_feature, ring_lengths)
+            for col, (fn, axis) in enumerate(((np.minimum, 0), (np.minimum, 1), (np.maximum, 0), (np.maximum, 1))):
+                out = np.full(n_features, np.inf if fn is np.minimum else -np.inf)
+                fn.at(out, point_feature, self.coords[:, axis])
+                self.bbox[:, col] = out
+
+    @property
+    def nbytes(self):
+        return self.coords.nbytes + self.ring_offsets.nbytes + self.bbox.nbytes
+
+    def render(self, z, x, y, classes, ids):
+        """MVT bytes for tile z/x/y; `classes` gives each row's colour class
+        (-1 = not drawn), `ids` each row's feature id."""
+        scale = 2.0 ** z
+        pad = BUFFER / EXTENT
+        lo_x, lo_y = (x - pad) / scale, (y - pad) / scale
+        hi_x, hi_y = (x + 1 + pad) / scale, (y + 1 + pad) / scale
+        b = self.bbox
+        hit = (classes >= 0) & (b[:, 2] >= lo_x) & (b[:, 0] <= hi_x) & (b[:, 3] >= lo_y) & (b[:, 1] <= hi_y)
+        features = np.flatnonzero(hit)
+        if features.size == 0:
+            return b''
+        inside = (b[features, 0] >= lo_x) & (b[features, 2] <= hi_x) & (b[features, 1] >= lo_y) & (b[features, 3] <= hi_y)
+
+        rings, ring_owner, ring_shell = [], [], []
+        for f, whole in zip(features.tolist(), inside.tolist()):
+            for r in range(self.feature_rings[f], self.feature_rings[f + 1]):
+                ring = (self.coords[self.ring_offsets[r]:self.ring_offsets[r + 1]] * scale - (x, y)) * EXTENT
+                if not whole:
+                    ring = _clip_ring(ring, -BUFFER, EXTENT + BUFFER)
+                rings.append(ring)
+                ring_owner.append(f)
+                ring_shell.append(self.ring_shell[r])
+
+        return _encode_tile(rings, np.asarray(ring_owner), np.asarray(ring_shell, dtype=bool), classes, ids)
+
+
+def _clip_ring(ring, lo, hi):
+    # sutherland-hodgman against the four sides of the (buffered) tile. a ring
+    # leaving and re-entering gets edges along the buffer's edge, outside the
+    # drawn area, as other tile encoders do
+    for axis, bound, keep_below in ((0, lo, False), (0, hi, True), (1, lo, False), (1, hi, True)):
+        if len(ring) == 0:
+            break
+        v = ring[:, axis]
+        inside = v <= bound if keep_below else v >= bound
+        if inside.all():
+            continue
+        prev = np.roll(ring, 1, axis=0)
+        prev_inside = np.roll(inside, 1)
+        cross = inside != prev_inside
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # only edges that cross are used, the rest may divide by zero
+            t = (bound - prev[:, axis]) / (v - prev[:, axis])
+            crossing = prev + t[:, None] * (ring - prev)
+        # per edge: the crossing point if it crosses, then its end if inside
+        points = np.stack((crossing, ring), axis=1)
+        ring = points[np.column_stack((cross, inside))]
+    return ring
+
+
+def _encode_tile(rings, ring_owner, ring_shell, classes, ids):
+    # quantise, drop repeated points and rings that vanished, then fix winding:
+    # shells positive and holes negative area in tile coordinates (y down)
+    kept_rings, kept_owner = [], []
+    shell_ok = False
+    for ring, owner, shell in zip(rings, ring_owner.tolist(), ring_shell.tolist()):
+        q = np.rint(ring).astype(np.int64) if len(ring) else np.empty((0, 2), dtype=np.int64)
+        if len(q):
+            q = q[np.concatenate(([True], (q[1:] != q[:-1]).any(axis=1)))]
+            if len(q) > 1 and (q[0] == q[-1]).all():
+                q = q[:-1]
+        area = 0
+        if len(q) >= 3:
+            nxt = np.roll(q, -1, axis=0)
+            area = int((q[:, 0] * nxt[:, 1] - nxt[:, 0] * q[:, 1]).sum())
+        if shell:
+            shell_ok = area != 0
+        if area == 0 or not shell_ok:
+            continue
+        if (area > 0) != shell:
+            q = q[::-1]
+        kept_rings.append(q)
+        kept_owner.append(owner)
+    if not kept_rings:
+        return b''
+
+    owners = np.asarray(kept_owner)
+    layers = {}
+    start = 0
+    for stop in list(np.flatnonzero(np.diff(owners)) + 1) + [len(owners)]:
+        feature = int(owners[start])
+        layers.setdefault(int(classes[feature]), []).append((feature, _geometry_commands(kept_rings[start:stop])))
+        start = stop
+
+    return b''.join(
+        _field_bytes(3, _encode_layer(f'c{cls}', features, ids)) for cls, features in sorted(layers.items())
+    )
+
+
+def _geometry_commands(rings):
+    # MoveTo, LineTo(n - 1), ClosePath per ring, zigzag deltas from one cursor
+    points = np.concatenate(rings)
+    deltas = np.diff(points, axis=0, prepend=[[0, 0]])
+    zigzag = (deltas << 1) ^ (deltas >> 63)
+    out = []
+    offset = 0
+    for ring in rings:
+        n = len(ring)
+        out.append([(1 << 3) | _MOVE_TO, *zigzag[offset].tolist(), ((n - 1) << 3) | _LINE_TO])
+        out.append(zigzag[offset + 1:offset + n].ravel().tolist())
+        out.append([(1 << 3) | _CLOSE_PATH])
+        offset += n
+    return _varints(np.fromiter((v for part in out for v in part), dtype=np.uint64))
+
+
+def _encode_layer(name, features, ids):
+    # keys ['id'], one string value per feature
+    body = [_field_bytes(15, _varint(2)), _field_bytes(1, name.encode())]
+    for k, (feature, geometry) in enumerate(features):
+        message = b''.join((
+            _field_varint(1, feature + 1),
+            _field_bytes(2, _varints(np.asarray([0, k], dtype=np.uint64))),
+            _field_varint(3, _POLYGON),
+            _field_bytes(4, geometry),
+        ))
+        body.append(_field_bytes(2, message))
+    body.append(_field_bytes(3, b'id'))
+    for feature, _ in features:
+        body.append(_field_bytes(4, _field_bytes(1, str(ids[feature]).encode())))
+    body.append(_field_varint(5, EXTENT))
+    return b''.join(body)
+
+
+def _varints(values):
+    # protobuf varints for a uint64 array, vectorised
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return b''
+    sizes = np.ones(values.size, dtype=np.int64)
+    for k in range(1, 10):
+        sizes += values >= np.uint64(1 << (7 * k))
+    starts = np.cumsum(sizes) - sizes
+    out = np.empty(int(sizes.sum()), dtype=np.uint8)
+    for k in range(int(sizes.max())):
+        sel = sizes > k
+        byte = (values[sel] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (sizes[sel] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[sel] + k] = (byte | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def _varint(value):
+    return _varints(np.asarray([value], dtype=np.uint64))
+
+
+def _field_varint(field, value):
+    return _varint(field << 3) + _varint(value)
+
+
+def _field_bytes(field, payload):
+    return _varint((field << 3) | 2) + _varint(len(payload)) + payload
+
+
+@snapshot_cache(maxsize=4)
+def tile_source(geography, level):
+    """TileSource for one pyramid level of the current snapshot's geometry."""
+    ids = get_frame(geography)['id'].astype(str).tolist()
+    topology = get_topology(geography, level)
+    if topology is not None:
+        by_id = decode_topojson(bytes(topology.raw))
+    else:
+        by_id = {f['properties']['id']: f['geometry'] for f in get_geometry(geography, level).data['features']}
+    return TileSource([by_id.get(i) for i in ids])
+
+
+def render_tile(geography, z, x, y, classes):
+    level = pyramid_level(z)
+    ids = get_frame(geography)['id'].astype(str).to_numpy()
+    return tile_source(geography, level).render(z, x, y, classes, ids)
+
+
+def cached_tile(key, render):
+    """Tile bytes from the disk cache, rendering and storing them on a miss.
+    `key` is the tile's relative path."""
+    return disk_cached(os.path.join(TILE_CACHE_DIR, *key), render, TILE_CACHE_DIR, TILE_CACHE_BYTES)